@@ -5,22 +5,20 @@ import shutil
 import logging
 
 from app.schemas.request import GenerateAssessmentRequest
-from app.services.content_resolver import ContentResolver
 from app.pipelines.text_pipeline import TextPipeline
-from app.services.llm_assessment_service import LLMAssessmentService
 from app.models.question import Question
 from fastapi import APIRouter, HTTPException
-from app.services.assessment_pipeline_service import AssessmentPipeline
+from app.services.assessment_pipeline_service import get_pipeline
 
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Instantiate shared services
-content_resolver = ContentResolver()
+# Shared process-wide services
+pipeline = get_pipeline()
+content_resolver = pipeline.content_resolver
+llm_service = pipeline.llm_service
 text_pipeline = TextPipeline()
-llm_service = LLMAssessmentService()
-pipeline = AssessmentPipeline()
 
 
 @router.post("/generate-assessment")
@@ -33,7 +31,7 @@ def generate_assessment(payload: dict):
 
 
 @router.post("/generate-assessment")
-async def generate_assessment(
+def generate_assessment(
     request: GenerateAssessmentRequest,
     file: UploadFile = File(None),  # optional, only for direct uploads
 ):
@@ -99,7 +97,12 @@ async def generate_assessment(
     try:
         questions: List[Question] = llm_service.generate_questions(
             sections,
-            questions_per_section=request.total_questions // max(len(sections), 1),
+            questions_per_section=max(
+                request.total_questions // max(len(sections), 1), 1
+            ),
+            max_concurrency=request.max_concurrency,
+            batch=request.batch_sections,
+            use_cache=request.use_cache,
         )
     except Exception as e:
         logger.error(f"LLM question generation failed: {e}")
@@ -132,6 +135,7 @@ async def generate_assessment(
                 "options": q.options,
                 "correct_answer": q.correct_answer,
                 "explanation": q.explanation,
+                "prompt_version": q.prompt_version,
             }
             for q in questions
         ],
@@ -1,37 +1,54 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Body
-from typing import List
+from fastapi import APIRouter, HTTPException, UploadFile, File, Body, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, Iterator, List, Literal, Optional
 import tempfile
 import shutil
 import logging
+import json
+import os
 
+from app.core import settings
+from app.core.metrics import collect_timings, time_stage
 from app.schemas.request import GenerateAssessmentRequest
-from app.services.content_resolver import ContentResolver
 from app.pipelines.text_pipeline import TextPipeline
-from app.services.llm_assessment_service import LLMAssessmentService
-from app.services.asr_service import ASRService
+from app.services.asr_service import get_asr_service
+from app.services.assessment_pipeline_service import get_pipeline
+from app.services.batch_service import get_batch_service, iter_lines
 
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Instantiate shared services
-content_resolver = ContentResolver()
+# Shared process-wide services (Whisper loads on first use via the model registry)
+pipeline = get_pipeline()
+content_resolver = pipeline.content_resolver
+llm_service = pipeline.llm_service
+asr_service = get_asr_service()
 text_pipeline = TextPipeline()
-llm_service = LLMAssessmentService()
-asr_service = ASRService()
 
 
 
 @router.post("/generate-assessment")
-async def generate_assessment(request: GenerateAssessmentRequest):
+def generate_assessment(request: GenerateAssessmentRequest):
     """
     Full assessment generation endpoint (JSON).
     Accepts inline text or URI content.
     """
+    with collect_timings() as timings:
+        response = _generate_assessment(request)
+
+    if request.include_timings:
+        response["metadata"]["timings_ms"] = timings.as_ms()
+
+    return response
+
+
+def _generate_assessment(request: GenerateAssessmentRequest) -> Dict[str, Any]:
     try:
-        resolved_type, payload = content_resolver.resolve(
-            request.content_type, request.content_source
-        )
+        with time_stage("resolve"):
+            resolved_type, payload = content_resolver.resolve(
+                request.content_type, request.content_source
+            )
     except Exception as e:
         logger.error(f"Failed to resolve content: {e}")
         raise HTTPException(status_code=400, detail=f"Failed to fetch content: {e}")
@@ -45,8 +62,14 @@ async def generate_assessment(request: GenerateAssessmentRequest):
             raw_text = payload
 
         elif resolved_type == "video":
-            # NEW: ASR integration
-            raw_text = asr_service.transcribe(payload)
+            # NEW: ASR integration (audio pre-stage, transcript cache checked first)
+            try:
+                with time_stage("extract_audio"):
+                    audio_path, media_hash = pipeline.media.prepare(payload)
+            finally:
+                content_resolver.release(payload)
+            with time_stage("asr"):
+                raw_text = asr_service.transcribe(audio_path, media_hash=media_hash)
 
         else:
             raise HTTPException(status_code=400, detail=f"Unknown content type: {resolved_type}")
@@ -58,17 +81,24 @@ async def generate_assessment(request: GenerateAssessmentRequest):
 
     # Clean text & create sections
     try:
-        sections = text_pipeline.run(raw_text)
+        with time_stage("section"):
+            sections = text_pipeline.run(raw_text)
     except Exception as e:
         logger.error(f"Failed to clean transcript: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to clean transcript: {e}")
 
     # Generate assessment questions
     try:
-        questions = llm_service.generate_questions(
-            sections,
-            questions_per_section=request.total_questions // max(len(sections), 1),
-        )
+        with time_stage("generate"):
+            questions = llm_service.generate_questions(
+                sections,
+                questions_per_section=max(
+                    request.total_questions // max(len(sections), 1), 1
+                ),
+                max_concurrency=request.max_concurrency,
+                batch=request.batch_sections,
+                use_cache=request.use_cache,
+            )
     except Exception as e:
         logger.error(f"LLM question generation failed: {e}")
         raise HTTPException(
@@ -76,38 +106,87 @@ async def generate_assessment(request: GenerateAssessmentRequest):
         )
 
     # Format response
-    response = {
-        "assessment_id": "ASMT-001",
-        "course_id": request.course_id,
-        "module_id": request.module_id,
-        "metadata": {
-            "content_type": request.content_type,
-            "total_questions": len(questions),
-            "generated_at": "2026-01-05T12:00:00Z",
-        },
-        "sections": [
-            {"section_id": s.section_id, "title": s.title, "content": s.content}
-            for s in sections
-        ],
-        "questions": [
-            {
-                "question_id": q.question_id,
-                "section_id": q.section_id,
-                "type": q.type,
-                "question": q.question,
-                "options": q.options,
-                "correct_answer": q.correct_answer,
-                "explanation": q.explanation,
-            }
-            for q in questions
-        ],
-    }
+    with time_stage("assemble"):
+        response = _format_response(
+            request.course_id, request.module_id, request.content_type, sections, questions
+        )
 
     return response
 
 
+@router.post("/generate-assessment/stream")
+def generate_assessment_stream(
+    request: GenerateAssessmentRequest,
+    format: Literal["ndjson", "sse"] = "ndjson",
+):
+    """
+    Streaming assessment generation endpoint.
+    Emits stage events, one event per section as soon as its questions
+    are ready, then a summary event. NDJSON by default, SSE on request.
+    """
+    events = pipeline.stream(request.model_dump(mode="json"))
+
+    if format == "sse":
+        return StreamingResponse(_to_sse(events), media_type="text/event-stream")
+
+    return StreamingResponse(_to_ndjson(events), media_type="application/x-ndjson")
+
+
+def _to_ndjson(events: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for event in events:
+        yield json.dumps(event) + "\n"
+
+
+def _to_sse(events: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+@router.post("/generate-assessment/batch")
+async def generate_assessment_batch(request: Request):
+    """
+    Bulk generation from a JSONL body (one GenerateAssessmentRequest per
+    line). Streams JSONL results in completion order, each tagged with
+    its line index, course_id and module_id; failed lines are reported
+    per item and a summary line closes the stream.
+    Bodies over BATCH_MAX_BYTES are rejected with 413.
+    """
+    # Read the body before responding: the streaming response listens for
+    # client disconnects on the same receive channel
+    body = await _read_body(request, settings.BATCH_MAX_BYTES)
+    results = get_batch_service().stream(iter_lines(body))
+    return StreamingResponse(_to_ndjson_async(results), media_type="application/x-ndjson")
+
+
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Read the request body, failing with 413 as soon as it passes
+    `max_bytes` instead of buffering all of it first.
+    """
+    too_large = HTTPException(
+        status_code=413, detail=f"Request body exceeds the {max_bytes} byte limit"
+    )
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise too_large
+
+    chunks: List[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def _to_ndjson_async(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for event in events:
+        yield json.dumps(event) + "\n"
+
+
 @router.post("/generate-assessment/upload")
-async def generate_assessment_with_file(
+def generate_assessment_with_file(
     file: UploadFile = File(...),
     course_id: str = None,
     module_id: str = None,
@@ -145,6 +224,9 @@ async def generate_assessment_with_file(
     except Exception as e:
         logger.error(f"Failed to process content: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to process content: {e}")
+    finally:
+        # The upload copy is no longer needed once read
+        os.remove(payload)
 
     # Clean text & create sections
     try:
@@ -156,7 +238,8 @@ async def generate_assessment_with_file(
     # Generate assessment questions
     try:
         questions = llm_service.generate_questions(
-            sections, questions_per_section=total_questions // max(len(sections), 1)
+            sections,
+            questions_per_section=max(total_questions // max(len(sections), 1), 1),
         )
     except Exception as e:
         logger.error(f"LLM question generation failed: {e}")
@@ -165,7 +248,18 @@ async def generate_assessment_with_file(
         )
 
     # Format response
-    response = {
+    with time_stage("assemble"):
+        return _format_response(course_id, module_id, content_type, sections, questions)
+
+
+def _format_response(
+    course_id: Optional[str],
+    module_id: Optional[str],
+    content_type: str,
+    sections,
+    questions,
+) -> Dict[str, Any]:
+    return {
         "assessment_id": "ASMT-001",
         "course_id": course_id,
         "module_id": module_id,
@@ -187,9 +281,8 @@ async def generate_assessment_with_file(
                 "options": q.options,
                 "correct_answer": q.correct_answer,
                 "explanation": q.explanation,
+                "prompt_version": q.prompt_version,
             }
             for q in questions
         ],
     }
-
-    return response
@@ -1,5 +1,11 @@
 from fastapi import APIRouter
 
+from app.services.llm_cache import get_llm_cache
+from app.services.llm_client import get_llm_client
+from app.services.llm_router import LLMRouter
+from app.services.model_registry import get_model_registry
+from app.services.transcript_cache import get_transcript_cache
+
 router = APIRouter()
 
 
@@ -7,3 +13,29 @@ router = APIRouter()
 async def health_check():
     """Health check endpoint"""
     return {"status": "ok", "message": "AI Assessment Generator API is running"}
+
+
+@router.get("/health/cache")
+async def cache_stats():
+    """LLM response and transcript cache hit/miss counters"""
+    llm_cache = get_llm_cache()
+    transcript_cache = get_transcript_cache()
+    return {
+        "llm": llm_cache.stats() if llm_cache else {"enabled": False},
+        "transcripts": transcript_cache.stats() if transcript_cache else {"enabled": False},
+    }
+
+
+@router.get("/health/models")
+async def model_status():
+    """Load state and timings of shared models"""
+    return {"asr": get_model_registry().status()}
+
+
+@router.get("/health/llm")
+async def llm_status():
+    """Routing state of each LLM backend (breaker, health, load)"""
+    client = get_llm_client()
+    if isinstance(client, LLMRouter):
+        return {"model": client.model_name, "backends": client.status()}
+    return {"model": client.model_name, "backends": {getattr(client, "host", "default"): {}}}
@@ -1,9 +1,76 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+
+from app.schemas.request import GenerateAssessmentRequest
+from app.services.job_service import COMPLETED, FINAL_STATES, get_job_service
 
 router = APIRouter()
 
 
-@router.post("/ingest")
-async def ingest_content():
-    """Ingest content endpoint"""
-    return {"message": "Ingest content endpoint"}
+def _job_status(job: dict) -> dict:
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "cancel_requested": job["cancel_requested"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+def _get_job_or_404(job_id: str) -> dict:
+    job = get_job_service().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@router.post("/ingest", status_code=202)
+@router.post("/jobs", status_code=202)
+async def ingest_content(request: GenerateAssessmentRequest):
+    """
+    Submit an assessment generation job.
+    Returns immediately with a job id; poll /jobs/{job_id} for progress.
+    """
+    job_id = get_job_service().submit(request.model_dump(mode="json"))
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/v1/jobs/{job_id}",
+        "result_url": f"/api/v1/jobs/{job_id}/result",
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status with per-stage progress"""
+    return _job_status(_get_job_or_404(job_id))
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    Job result.
+    202 while the job is still running, 409 if it failed or was cancelled.
+    """
+    job = _get_job_or_404(job_id)
+
+    if job["status"] == COMPLETED:
+        return job["result"]
+
+    if job["status"] in FINAL_STATES:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job {job_id} {job['status']}: {job['error'] or 'no result'}",
+        )
+
+    return JSONResponse(status_code=202, content=_job_status(job))
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Request cancellation of a queued or running job"""
+    _get_job_or_404(job_id)
+    return _job_status(get_job_service().cancel(job_id))
@@ -1 +1,25 @@
-# For custom exception handing
\ No newline at end of file
+# For custom exception handing
+
+
+class LLMBackendError(RuntimeError):
+    """
+    Raised when an LLM backend call fails (connection, timeout or bad status).
+    """
+
+
+class JobCancelledError(Exception):
+    """
+    Raised inside a running job once cancellation has been requested.
+    """
+
+
+class ContentTooLargeError(ValueError):
+    """
+    Raised when remote content exceeds the configured size limit.
+    """
+
+
+class NoAudioStreamError(ValueError):
+    """
+    Raised when media has no audio track to transcribe.
+    """
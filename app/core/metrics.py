@@ -0,0 +1,174 @@
+"""
+Metrics
+-------
+Prometheus instruments shared by the pipeline, services and API.
+
+Stage latencies go to one histogram labelled by stage. The same timings
+can be collected per request (collect_timings) and returned in the
+response metadata; the current collector lives in a ContextVar so it
+follows the request into LLM worker threads submitted with
+contextvars.copy_context().
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# Covers fast local stages (ms) up to long ASR runs (minutes)
+_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800,
+)
+
+STAGE_LATENCY = Histogram(
+    "assessment_stage_duration_seconds",
+    "Time spent in each pipeline stage",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUEST_LATENCY = Histogram(
+    "assessment_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "assessment_http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["route"],
+)
+LLM_FAILURES = Counter(
+    "assessment_llm_failures_total",
+    "LLM calls that failed or returned unusable output",
+    ["kind"],
+)
+LLM_BACKEND_REQUESTS = Counter(
+    "assessment_llm_backend_requests_total",
+    "LLM calls per routed backend by outcome",
+    ["backend", "outcome"],
+)
+LLM_BACKEND_IN_FLIGHT = Gauge(
+    "assessment_llm_backend_in_flight",
+    "LLM calls currently running on each routed backend",
+    ["backend"],
+)
+LLM_BACKEND_AVAILABLE = Gauge(
+    "assessment_llm_backend_available",
+    "1 if the backend is healthy and its circuit breaker is closed",
+    ["backend"],
+)
+LLM_ROUTER_RETRIES = Counter(
+    "assessment_llm_router_retries_total",
+    "LLM calls retried on another backend after a failure",
+)
+LLM_HEDGEABLE_CALLS = Counter(
+    "assessment_llm_hedgeable_calls_total",
+    "Routed LLM calls that may be hedged (denominator of the hedge rate)",
+    ["kind"],
+)
+LLM_HEDGES = Counter(
+    "assessment_llm_hedges_total",
+    "Hedged LLM calls by winning attempt, or skipped for lack of budget",
+    ["kind", "outcome"],
+)
+LLM_HEDGE_DELAY = Gauge(
+    "assessment_llm_hedge_delay_seconds",
+    "Current delay after which an LLM call is hedged",
+    ["kind"],
+)
+LLM_EARLY_STOPS = Counter(
+    "assessment_llm_early_stops_total",
+    "Streamed generations stopped once enough valid questions had arrived",
+)
+LLM_PARTIAL_OUTPUTS = Counter(
+    "assessment_llm_partial_outputs_total",
+    "LLM answers that were malformed JSON and salvaged question by question",
+    ["kind"],
+)
+QUESTIONS_SALVAGED = Counter(
+    "assessment_questions_salvaged_total",
+    "Questions recovered from malformed LLM answers",
+)
+INVALID_QUESTIONS = Counter(
+    "assessment_invalid_questions_total",
+    "Generated questions rejected by validation",
+    ["reason"],
+)
+QUESTIONS_REGENERATED = Counter(
+    "assessment_questions_regenerated_total",
+    "Questions requested again to replace missing or rejected ones",
+)
+SECTIONS_THROTTLED = Counter(
+    "assessment_sections_throttled_total",
+    "Sections dropped by the MAX_SECTIONS limit",
+)
+BYTES_DOWNLOADED = Counter(
+    "assessment_bytes_downloaded_total",
+    "Bytes fetched from remote content sources",
+    ["kind"],
+)
+
+
+class StageTimings:
+    """
+    Per-request stage durations (seconds, summed over repeats).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seconds: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+
+    def as_ms(self) -> Dict[str, float]:
+        with self._lock:
+            return {stage: round(s * 1000, 3) for stage, s in self._seconds.items()}
+
+
+_current_timings: ContextVar[Optional[StageTimings]] = ContextVar(
+    "assessment_stage_timings", default=None
+)
+
+
+@contextmanager
+def collect_timings() -> Iterator[StageTimings]:
+    """Collect stage timings for everything run inside this block."""
+    timings = StageTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_LATENCY.labels(stage=stage).observe(seconds)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """Time a block as `stage` (recorded even if it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def render_latest() -> tuple:
+    """Return (body, content_type) for a /metrics response."""
+    return generate_latest(), CONTENT_TYPE_LATEST
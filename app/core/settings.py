@@ -1 +1,186 @@
-# for Centralized Settings
\ No newline at end of file
+# for Centralized Settings
+"""
+Centralized settings.
+Values are read from environment variables with sensible local defaults.
+"""
+
+import os
+from pathlib import Path
+
+
+# ------------------------------
+# Data directories
+# ------------------------------
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = Path(os.getenv("DATA_DIR", str(BASE_DIR / "data")))
+RAW_DIR = DATA_DIR / "raw"
+PROCESSED_DIR = DATA_DIR / "processed"
+OUTPUTS_DIR = DATA_DIR / "outputs"
+
+# ------------------------------
+# Remote content fetching
+# ------------------------------
+FETCH_POOL_SIZE = int(os.getenv("FETCH_POOL_SIZE", "16"))
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "60"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+FETCH_MAX_MEDIA_BYTES = int(os.getenv("FETCH_MAX_MEDIA_BYTES", str(4 * 1024**3)))
+FETCH_MAX_TEXT_BYTES = int(os.getenv("FETCH_MAX_TEXT_BYTES", str(64 * 1024**2)))
+
+# ------------------------------
+# LLM (Ollama)
+# ------------------------------
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+# Comma-separated hosts serving the same model; more than one enables the router
+OLLAMA_HOSTS = [
+    host.strip() for host in os.getenv("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if host.strip()
+]
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "qwen3:0.6b")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "10m")
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "16"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUEST_CONCURRENCY = int(os.getenv("LLM_REQUEST_CONCURRENCY", "4"))
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "1500"))
+LLM_BATCH_MAX_SECTIONS = int(os.getenv("LLM_BATCH_MAX_SECTIONS", "4"))
+# Constrain output to the question JSON schema where the backend supports it
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+# Stream tokens and stop as soon as enough valid questions have arrived
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+# num_predict cap when not set explicitly: base + per question, at most max
+LLM_NUM_PREDICT_BASE = int(os.getenv("LLM_NUM_PREDICT_BASE", "512"))
+LLM_NUM_PREDICT_PER_QUESTION = int(os.getenv("LLM_NUM_PREDICT_PER_QUESTION", "192"))
+LLM_NUM_PREDICT_MAX = int(os.getenv("LLM_NUM_PREDICT_MAX", "4096"))
+# Comma-separated stop sequences added to every call, e.g. "<|im_end|>"
+LLM_STOP_SEQUENCES = [
+    stop for stop in os.getenv("LLM_STOP_SEQUENCES", "").split(",") if stop
+]
+# Router: eject a host after this many consecutive failures, retry it after the cooldown
+LLM_ROUTER_FAILURE_THRESHOLD = int(os.getenv("LLM_ROUTER_FAILURE_THRESHOLD", "3"))
+LLM_ROUTER_COOLDOWN_SECONDS = float(os.getenv("LLM_ROUTER_COOLDOWN_SECONDS", "30"))
+# Retries on another host: this fraction of calls, plus a trickle per second
+LLM_ROUTER_RETRY_RATIO = float(os.getenv("LLM_ROUTER_RETRY_RATIO", "0.2"))
+LLM_ROUTER_RETRY_MIN_PER_SECOND = float(os.getenv("LLM_ROUTER_RETRY_MIN_PER_SECOND", "0.5"))
+LLM_ROUTER_HEALTH_INTERVAL_SECONDS = float(
+    os.getenv("LLM_ROUTER_HEALTH_INTERVAL_SECONDS", "10")
+)
+# Hedged section streams (needs several OLLAMA_HOSTS and LLM_STREAMING):
+# duplicate a stream on another host when its first piece is slower than
+# this percentile of recent ones
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Delay used until LLM_HEDGE_MIN_SAMPLES calls have been seen, and the floor
+LLM_HEDGE_INITIAL_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_INITIAL_DELAY_SECONDS", "10"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+# At most this fraction of calls is hedged, plus a trickle per second
+LLM_HEDGE_BUDGET_RATIO = float(os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.1"))
+LLM_HEDGE_MIN_PER_SECOND = float(os.getenv("LLM_HEDGE_MIN_PER_SECOND", "0.1"))
+# Load the model and evaluate the static prompt prefixes at startup so
+# the first requests hit a warm prompt cache (kept for LLM_KEEP_ALIVE)
+LLM_WARMUP_PROMPTS = os.getenv("LLM_WARMUP_PROMPTS", "false").lower() == "true"
+
+# ------------------------------
+# Prompt templates
+# ------------------------------
+# Version of every prompt template: v1 (original prompts) or v2
+PROMPT_VERSION = os.getenv("PROMPT_VERSION", "v2")
+# Pin single templates, e.g. "section=v1,regenerate=v2"; overrides PROMPT_VERSION
+PROMPT_VERSIONS = dict(
+    tuple(part.strip() for part in item.split("=", 1))
+    for item in os.getenv("PROMPT_VERSIONS", "").split(",")
+    if "=" in item
+)
+
+# ------------------------------
+# LLM response cache
+# ------------------------------
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = Path(
+    os.getenv("LLM_CACHE_PATH", str(PROCESSED_DIR / "llm_cache.sqlite3"))
+)
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_MAX_DISK_BYTES = int(os.getenv("LLM_CACHE_MAX_DISK_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# ------------------------------
+# Sectioning (token-budget chunking)
+# ------------------------------
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "600"))
+# Upper bound a section may grow to so content fits fewer sections;
+# keep well inside the model's context window (prompt + answer)
+CHUNK_MAX_CONTEXT_TOKENS = int(os.getenv("CHUNK_MAX_CONTEXT_TOKENS", "2500"))
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "120"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+# A pause this long between ASR segments is a preferred cut point
+CHUNK_MAX_GAP_SECONDS = float(os.getenv("CHUNK_MAX_GAP_SECONDS", "2.0"))
+# "token" packs by budget only; "semantic" also cuts at topic shifts
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "semantic")
+# Sentences compared on each side of a candidate boundary
+SEMANTIC_WINDOW = int(os.getenv("SEMANTIC_WINDOW", "3"))
+# A boundary needs similarity this many std devs below the mean
+SEMANTIC_DROP_STD = float(os.getenv("SEMANTIC_DROP_STD", "0.5"))
+# Optional sentence-transformers model; TF-IDF is used when unset
+SEMANTIC_EMBEDDING_MODEL = os.getenv("SEMANTIC_EMBEDDING_MODEL", "")
+
+# ------------------------------
+# ASR (Whisper)
+# ------------------------------
+ASR_MODEL_NAME = os.getenv("ASR_MODEL_NAME", "base")
+# Comma-separated Whisper sizes loaded at startup, e.g. "base,small"
+ASR_WARMUP_MODELS = [
+    name.strip() for name in os.getenv("ASR_WARMUP_MODELS", "").split(",") if name.strip()
+]
+# Unload models unused for this long (0 disables)
+ASR_MODEL_IDLE_SECONDS = float(os.getenv("ASR_MODEL_IDLE_SECONDS", "0"))
+# Chunked ASR: split at silences and transcribe chunks across processes
+ASR_CHUNKED = os.getenv("ASR_CHUNKED", "false").lower() == "true"
+ASR_WORKERS = int(os.getenv("ASR_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+ASR_CHUNK_MAX_SECONDS = float(os.getenv("ASR_CHUNK_MAX_SECONDS", "120"))
+ASR_VAD_MIN_SILENCE_MS = int(os.getenv("ASR_VAD_MIN_SILENCE_MS", "500"))
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() == "true"
+TRANSCRIPT_CACHE_DIR = Path(
+    os.getenv("TRANSCRIPT_CACHE_DIR", str(PROCESSED_DIR / "transcripts"))
+)
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "2000"))
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# ------------------------------
+# Media pre-stage (audio extraction)
+# ------------------------------
+AUDIO_CACHE_DIR = Path(os.getenv("AUDIO_CACHE_DIR", str(PROCESSED_DIR / "audio")))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(2 * 1024**3)))
+
+# ------------------------------
+# Background jobs
+# ------------------------------
+JOBS_DB_PATH = Path(os.getenv("JOBS_DB_PATH", str(PROCESSED_DIR / "jobs.sqlite3")))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A job whose owner has not renewed its lease for this long can be taken over
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# ------------------------------
+# Batch generation (JSONL)
+# ------------------------------
+# Modules generated at once across all batch requests
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+# Larger JSONL bodies are rejected with 413 before being buffered
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(16 * 1024**2)))
+
+# ------------------------------
+# Question validation
+# ------------------------------
+VALIDATION_MIN_STEM_CHARS = int(os.getenv("VALIDATION_MIN_STEM_CHARS", "15"))
+VALIDATION_MAX_STEM_CHARS = int(os.getenv("VALIDATION_MAX_STEM_CHARS", "400"))
+# Estimated Jaccard similarity (MinHash) at which two questions count as one
+VALIDATION_DUPLICATE_THRESHOLD = float(os.getenv("VALIDATION_DUPLICATE_THRESHOLD", "0.6"))
+VALIDATION_OPTION_DUPLICATE_THRESHOLD = float(
+    os.getenv("VALIDATION_OPTION_DUPLICATE_THRESHOLD", "0.8")
+)
+VALIDATION_SHINGLE_WORDS = int(os.getenv("VALIDATION_SHINGLE_WORDS", "2"))
+VALIDATION_MINHASH_PERMUTATIONS = int(os.getenv("VALIDATION_MINHASH_PERMUTATIONS", "64"))
+# Extra LLM rounds asking only for missing/rejected questions; 0 disables
+VALIDATION_REGEN_ROUNDS = int(os.getenv("VALIDATION_REGEN_ROUNDS", "2"))
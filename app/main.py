@@ -1,9 +1,23 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import logging
+import re
+import time
 
-from app.api.v1 import assessment, health, ingestion
+from app.api.v1 import assessment, health, ingestion, metrics
+from app.core import settings
+from app.core.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT
 from app.core.logging import setup_logging
+from app.services.llm_client import close_llm_clients
+from app.services.job_service import get_job_service, shutdown_job_service
+from app.services.batch_service import shutdown_batch_service
+from app.services.model_registry import get_model_registry
+from app.services.asr_service import get_asr_service
+from app.services.fetch_service import get_content_fetcher
+from app.services.llm_assessment_service import LLMAssessmentService
+
+_ID_SEGMENT = re.compile(r"/[0-9a-f]{16,}(?=/|$)")
 
 # Setup logging
 setup_logging()
@@ -29,16 +43,58 @@ app.add_middleware(
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(assessment.router, prefix="/api/v1", tags=["assessment"])
 app.include_router(ingestion.router, prefix="/api/v1", tags=["ingestion"])
+# Served at the root, where Prometheus scrapers look by default
+app.include_router(metrics.router, tags=["metrics"])
+
+
+def _route_label(request: Request) -> str:
+    # Collapse job ids so label cardinality stays bounded
+    return _ID_SEGMENT.sub("/{id}", request.url.path)
+
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    route = _route_label(request)
+    in_flight = REQUESTS_IN_FLIGHT.labels(route=route)
+    in_flight.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        in_flight.dec()
+        REQUEST_LATENCY.labels(
+            method=request.method, route=route, status=str(status)
+        ).observe(time.perf_counter() - start)
 
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up AI Assessment Generator API")
+    # Load configured ASR models before the first request needs them
+    registry = get_model_registry()
+    if settings.ASR_WARMUP_MODELS:
+        await asyncio.to_thread(registry.warm_up, settings.ASR_WARMUP_MODELS)
+    registry.start_idle_reaper(settings.ASR_MODEL_IDLE_SECONDS)
+    # Prime the LLM prompt cache with the static template prefixes
+    if settings.LLM_WARMUP_PROMPTS:
+        await asyncio.to_thread(LLMAssessmentService().warm_up)
+
+    # Resume jobs interrupted by the previous shutdown
+    get_job_service().recover()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down AI Assessment Generator API")
+    shutdown_job_service()
+    shutdown_batch_service()
+    get_model_registry().stop()
+    get_asr_service().close()
+    get_content_fetcher().close()
+    await close_llm_clients()
 
 
 if __name__ == "__main__":
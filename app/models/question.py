@@ -1,5 +1,11 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional
+
+# Answer letters, one per option, in order
+ANSWER_LETTERS = ("A", "B", "C", "D")
+
+# Filled in by the service, not generated by the LLM
+_ASSIGNED_FIELDS = {"question_id", "section_id", "type", "prompt_version"}
 
 
 @dataclass
@@ -14,3 +20,68 @@ class Question:
     options: List[str]
     correct_answer: str
     explanation: str
+    # Prompt template ("name@version") that produced the question
+    prompt_version: Optional[str] = None
+
+
+def questions_json_schema(num_questions: Optional[int] = None) -> Dict[str, Any]:
+    """
+    JSON schema of an LLM {"questions": [...]} answer, built from the
+    Question fields the model fills in: exactly one option per answer
+    letter and the answer restricted to those letters. Passed to the
+    backend for schema-constrained decoding.
+    """
+    properties: Dict[str, Any] = {}
+    for field in fields(Question):
+        if field.name in _ASSIGNED_FIELDS:
+            continue
+        if field.name == "options":
+            properties[field.name] = {
+                "type": "array",
+                "items": {"type": "string", "minLength": 1},
+                "minItems": len(ANSWER_LETTERS),
+                "maxItems": len(ANSWER_LETTERS),
+            }
+        elif field.name == "correct_answer":
+            properties[field.name] = {"type": "string", "enum": list(ANSWER_LETTERS)}
+        else:
+            properties[field.name] = {"type": "string", "minLength": 1}
+
+    questions: Dict[str, Any] = {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": properties,
+            "required": list(properties),
+            "additionalProperties": False,
+        },
+    }
+    if num_questions:
+        questions["minItems"] = questions["maxItems"] = num_questions
+
+    return {
+        "type": "object",
+        "properties": {"questions": questions},
+        "required": ["questions"],
+    }
+
+
+def sections_json_schema(
+    section_ids: List[str], num_questions: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Schema of a batched {"sections": {section_id: {"questions": [...]}}} answer.
+    """
+    per_section = questions_json_schema(num_questions)
+    return {
+        "type": "object",
+        "properties": {
+            "sections": {
+                "type": "object",
+                "properties": {section_id: per_section for section_id in section_ids},
+                "required": list(section_ids),
+                "additionalProperties": False,
+            }
+        },
+        "required": ["sections"],
+    }
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -10,3 +11,5 @@ class Section:
     section_id: str
     title: str
     content: str
+    start: Optional[float] = None  # seconds, ASR only
+    end: Optional[float] = None
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from dataclasses import dataclass
 
 
@@ -10,6 +10,9 @@ class TranscriptSegment:
     For text, this may be a paragraph.
     """
     text: str
+    start: Optional[float] = None  # seconds, ASR only
+    end: Optional[float] = None
+    paragraph_start: bool = False  # first sentence of a new paragraph
 
 
 @dataclass
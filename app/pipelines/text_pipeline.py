@@ -1,6 +1,7 @@
-from typing import List
+from typing import List, Optional
 from app.models.section import Section
-from app.services.cleaning_service import TranscriptCleaner
+from app.services.chunking_service import TokenChunker, build_chunker
+from app.services.cleaning_service import TextSource, TranscriptCleaner
 
 
 class TextPipeline:
@@ -8,14 +9,16 @@ class TextPipeline:
     Handles text-based content (including transcripts).
     """
 
-    def __init__(self):
+    def __init__(self, chunker: Optional[TokenChunker] = None):
         self.cleaner = TranscriptCleaner()
+        self.chunker = chunker or build_chunker()
 
-    def run(self, raw_text: str) -> List[Section]:
+    def run(self, raw_text: TextSource, max_sections: Optional[int] = None) -> List[Section]:
         """
         Full text pipeline:
-        raw text -> transcript -> sections
+        raw text -> transcript -> token-budget sections
+        `raw_text` may also be an iterator of text pieces or a text file.
         """
         transcript = self.cleaner.to_transcript(raw_text)
-        sections = self.cleaner.to_sections(transcript)
+        sections = self.chunker.chunk(transcript, max_sections=max_sections)
         return sections
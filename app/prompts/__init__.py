@@ -1,3 +1,13 @@
 # Prompt Engineering templates
 # To version prompt independently
-# For easier prompt iteration
\ No newline at end of file
+# For easier prompt iteration
+from app.prompts.registry import (
+    PromptTemplate,
+    RenderedPrompt,
+    get_prompt,
+    list_versions,
+    register,
+)
+
+# Registers the assessment templates
+from app.prompts import assessment_prompt  # noqa: F401,E402
@@ -1,5 +1,181 @@
-def build_assessment_prompt(section_text: str, num_questions: int) -> str:
-    return f"""
+from app.prompts.registry import PromptTemplate, get_prompt, register
+
+# Shared by every assessment template so the system prefix is identical
+SYSTEM = """
+You are an assessment generator. You write multiple-choice questions
+strictly from the course content you are given and answer with JSON only.
+"""
+
+_RULES = """
+STRICT RULES (MANDATORY):
+- Use ONLY the section content
+- Exactly 4 options per question (A, B, C, D)
+- Only ONE correct answer
+- All incorrect options must be clearly wrong
+- No vague or generic wording
+- No duplicate options
+- No external knowledge
+- NO explanations outside JSON
+- NO markdown
+- NO commentary
+- NO text before or after JSON
+"""
+
+_QUESTIONS_FORMAT = """
+OUTPUT FORMAT (JSON ONLY — NO OTHER TEXT):
+{
+  "questions": [
+    {
+      "question": "...",
+      "options": ["A", "B", "C", "D"],
+      "correct_answer": "A",
+      "explanation": "..."
+    }
+  ]
+}
+"""
+
+# ------------------------------
+# v1: the original prompts, kept for comparison and rollback. Section
+# content comes first, so calls share no static prefix.
+# ------------------------------
+SECTION_V1 = register(PromptTemplate(
+    name="section",
+    version="v1",
+    system="",
+    instructions="",
+    content="""
+You are an assessment generator.
+
+SECTION ID: {section_id}
+SECTION TITLE: {title}
+SECTION CONTENT:
+{content}
+
+TASK:
+Generate exactly {n} multiple-choice questions.
+
+STRICT RULES (MANDATORY):
+- Use ONLY the section content
+- Exactly 4 options per question (A, B, C, D)
+- Only ONE correct answer
+- All incorrect options must be clearly wrong
+- No vague or generic wording
+- No duplicate options
+- No external knowledge
+- NO explanations outside JSON
+- NO markdown
+- NO commentary
+- NO text before or after JSON
+
+OUTPUT FORMAT (JSON ONLY — NO OTHER TEXT):
+{{
+  "questions": [
+    {{
+      "question": "...",
+      "options": ["A", "B", "C", "D"],
+      "correct_answer": "A",
+      "explanation": "..."
+    }}
+  ]
+}}
+""",
+))
+
+SECTION_BATCH_V1 = register(PromptTemplate(
+    name="section_batch",
+    version="v1",
+    system="",
+    instructions="",
+    content="""
+You are an assessment generator.
+
+{blocks}
+
+TASK:
+For EACH section above, generate exactly {n} multiple-choice questions
+about that section only.
+
+STRICT RULES (MANDATORY):
+- Use ONLY the content of the section the question belongs to
+- Exactly 4 options per question (A, B, C, D)
+- Only ONE correct answer
+- All incorrect options must be clearly wrong
+- No vague or generic wording
+- No duplicate options
+- No external knowledge
+- NO explanations outside JSON
+- NO markdown
+- NO commentary
+- NO text before or after JSON
+
+OUTPUT FORMAT (JSON ONLY — NO OTHER TEXT):
+One key per section id ({ids}):
+{{
+  "sections": {{
+    "{first_id}": {{
+      "questions": [
+        {{
+          "question": "...",
+          "options": ["A", "B", "C", "D"],
+          "correct_answer": "A",
+          "explanation": "..."
+        }}
+      ]
+    }}
+  }}
+}}
+""",
+))
+
+REGENERATE_V1 = register(PromptTemplate(
+    name="regenerate",
+    version="v1",
+    system="",
+    instructions="",
+    content="""
+You are an assessment generator.
+
+SECTION ID: {section_id}
+SECTION TITLE: {title}
+SECTION CONTENT:
+{content}
+
+EXISTING QUESTIONS (do NOT repeat or reword these):
+{existing}
+
+TASK:
+Generate exactly {n} NEW multiple-choice questions that test facts
+not covered by the existing questions.
+
+STRICT RULES (MANDATORY):
+- Use ONLY the section content
+- Exactly 4 distinct options per question
+- "correct_answer" is the letter (A, B, C or D) of the one correct option
+- No "all of the above" or "none of the above"
+- A short explanation based only on the content
+- NO text before or after JSON
+
+OUTPUT FORMAT (JSON ONLY — NO OTHER TEXT):
+{{
+  "questions": [
+    {{
+      "question": "...",
+      "options": ["...", "...", "...", "..."],
+      "correct_answer": "A",
+      "explanation": "..."
+    }}
+  ]
+}}
+""",
+))
+
+ASSESSMENT_V1 = register(PromptTemplate(
+    name="assessment",
+    version="v1",
+    system="",
+    instructions="",
+    content="""
 SOURCE TEXT:
 {section_text}
 
@@ -29,4 +205,134 @@ CRITICAL:
 - No markdown
 - No commentary
 - No trailing text
-"""
+""",
+))
+
+
+# ------------------------------
+# v2: static system prompt and instructions first, per-call content last
+# ------------------------------
+SECTION = register(PromptTemplate(
+    name="section",
+    version="v2",
+    system=SYSTEM,
+    instructions=_RULES + _QUESTIONS_FORMAT,
+    content="""
+SECTION ID: {section_id}
+SECTION TITLE: {title}
+SECTION CONTENT:
+{content}
+
+TASK:
+Generate exactly {n} multiple-choice questions.
+""",
+))
+
+SECTION_BATCH = register(PromptTemplate(
+    name="section_batch",
+    version="v2",
+    system=SYSTEM,
+    instructions=_RULES.replace(
+        "Use ONLY the section content",
+        "Use ONLY the content of the section the question belongs to",
+    ) + """
+OUTPUT FORMAT (JSON ONLY — NO OTHER TEXT):
+One key per section id:
+{
+  "sections": {
+    "<section id>": {
+      "questions": [
+        {
+          "question": "...",
+          "options": ["A", "B", "C", "D"],
+          "correct_answer": "A",
+          "explanation": "..."
+        }
+      ]
+    }
+  }
+}
+""",
+    content="""
+{blocks}
+
+TASK:
+For EACH section above ({ids}), generate exactly {n} multiple-choice
+questions about that section only.
+""",
+))
+
+REGENERATE = register(PromptTemplate(
+    name="regenerate",
+    version="v2",
+    system=SYSTEM,
+    instructions="""
+STRICT RULES (MANDATORY):
+- Use ONLY the section content
+- Exactly 4 distinct options per question
+- "correct_answer" is the letter (A, B, C or D) of the one correct option
+- No "all of the above" or "none of the above"
+- Do NOT repeat or reword any of the existing questions
+- A short explanation based only on the content
+- NO text before or after JSON
+""" + _QUESTIONS_FORMAT,
+    content="""
+SECTION ID: {section_id}
+SECTION TITLE: {title}
+SECTION CONTENT:
+{content}
+
+EXISTING QUESTIONS (do NOT repeat or reword these):
+{existing}
+
+TASK:
+Generate exactly {n} NEW multiple-choice questions that test facts
+not covered by the existing questions.
+""",
+))
+
+ASSESSMENT = register(PromptTemplate(
+    name="assessment",
+    version="v2",
+    system=SYSTEM,
+    instructions="""
+RULES:
+- Use ONLY the source text
+- Each question must have 4 options
+- Exactly ONE correct answer
+- Short explanation based only on the text
+
+OUTPUT FORMAT (STRICT JSON ONLY):
+{
+  "questions": [
+    {
+      "question": "string",
+      "options": ["A. ...", "B. ...", "C. ...", "D. ..."],
+      "correct_answer": "A",
+      "explanation": "string"
+    }
+  ]
+}
+
+CRITICAL:
+- Return ONLY valid JSON
+- No markdown
+- No commentary
+- No trailing text
+""",
+    content="""
+SOURCE TEXT:
+{section_text}
+
+TASK:
+Generate {num_questions} multiple-choice questions.
+""",
+))
+
+
+def build_assessment_prompt(section_text: str, num_questions: int) -> str:
+    return (
+        get_prompt("assessment")
+        .render(section_text=section_text, num_questions=num_questions)
+        .prompt
+    )
@@ -0,0 +1,89 @@
+"""
+Prompt Registry
+---------------
+Versioned prompt templates, looked up by name.
+
+A template is laid out for the model's prompt (KV) cache: the system
+prompt and the instructions are static and come first, the per-call
+content (section text, question count) comes last. Every call with the
+same template then shares one long identical prefix, which the server
+reuses while the model stays loaded (keep_alive) instead of evaluating
+it again.
+
+Change the wording of a template by registering a new version.
+PROMPT_VERSION selects the version used by every template and
+PROMPT_VERSIONS pins single templates, e.g. to compare the original v1
+prompts against v2.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from app.core import settings
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    """A template filled in for one call."""
+    system: str
+    prompt: str
+    version: str  # "<name>@<version>" of the template that produced it
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: str
+    system: str
+    # Static part of the user prompt: rules and output format, no placeholders
+    instructions: str
+    # Per-call part, str.format() placeholders; always rendered last
+    content: str
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    @property
+    def prefix(self) -> str:
+        """The static prompt text every call with this template starts with."""
+        return self.instructions.strip()
+
+    def render(self, **values: Any) -> RenderedPrompt:
+        content = self.content.strip().format(**values)
+        return RenderedPrompt(
+            system=self.system.strip(),
+            prompt="\n\n".join(part for part in (self.prefix, content) if part) + "\n",
+            version=self.id,
+        )
+
+
+# name -> version -> template
+_templates: Dict[str, Dict[str, PromptTemplate]] = {}
+
+
+def register(template: PromptTemplate) -> PromptTemplate:
+    versions = _templates.setdefault(template.name, {})
+    if template.version in versions:
+        raise ValueError(f"Prompt {template.id} is already registered")
+    versions[template.version] = template
+    return template
+
+
+def get_prompt(name: str, version: str | None = None) -> PromptTemplate:
+    """
+    The template `name` at `version`; by default the version pinned in
+    PROMPT_VERSIONS, else PROMPT_VERSION.
+    """
+    versions = _templates.get(name)
+    if not versions:
+        raise KeyError(f"Unknown prompt: {name}")
+
+    version = version or settings.PROMPT_VERSIONS.get(name) or settings.PROMPT_VERSION
+    if version not in versions:
+        raise KeyError(f"Unknown version for prompt {name}: {version}")
+    return versions[version]
+
+
+def list_versions(name: str) -> List[str]:
+    return list(_templates.get(name, {}))
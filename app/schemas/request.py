@@ -34,6 +34,14 @@ class GenerateAssessmentRequest(BaseModel):
     content_source: ContentSource
     total_questions: int = Field(gt=0, le=50)
     difficulty: Optional[Literal["easy", "medium", "hard"]] = "medium"
+    # Sections generated in parallel for this request (server default if unset)
+    max_concurrency: Optional[int] = Field(default=None, gt=0, le=16)
+    # Pack several sections into one LLM prompt
+    batch_sections: bool = False
+    # Set to false to bypass cached LLM answers for this request
+    use_cache: bool = True
+    # Include per-stage timings (ms) in the response metadata
+    include_timings: bool = False
 
     @model_validator(mode="after")
     def validate_content_source(self):
@@ -6,24 +6,252 @@ Responsible for converting video/audio files into raw text.
 This service is isolated so it can be swapped later (Azure, Whisper, etc.).
 """
 
-import whisper
 import os
+import logging
+import multiprocessing
+import threading
 
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core import settings
+from app.models.transcript import Transcript, TranscriptSegment
+from app.services.media_service import is_asr_ready_wav, load_pcm_wav
+from app.services.model_registry import ModelRegistry, get_model_registry
+from app.services.transcript_cache import TranscriptCache, get_transcript_cache
+from app.utils.file_utils import sha256_file
+
+logger = logging.getLogger(__name__)
 
 
 class ASRService:
-    def __init__(self, model):
+    def __init__(
+        self,
+        model=None,
+        model_name: str = settings.ASR_MODEL_NAME,
+        cache: Optional[TranscriptCache] = None,
+        options: Optional[Dict[str, Any]] = None,
+        registry: Optional[ModelRegistry] = None,
+        chunked: bool = settings.ASR_CHUNKED,
+        workers: int = settings.ASR_WORKERS,
+    ):
+        # A pre-loaded model may be pinned; otherwise the shared registry
+        # loads it on first use and may evict it when idle
         self.model = model
+        self.model_name = model_name
+        self.cache = cache
+        self.options = options or {}
+        self.registry = registry or get_model_registry()
+
+        # Chunked mode: VAD split + process pool (workers load their own model)
+        self.chunked = chunked
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
 
-    def transcribe(self, media_path: str) -> str:
+    @contextmanager
+    def _model(self) -> Iterator[Any]:
+        if self.model is not None:
+            yield self.model
+            return
+
+        with self.registry.use_asr_model(self.model_name) as model:
+            yield model
+
+    def transcribe(self, media_path: str, media_hash: Optional[str] = None) -> str:
         """
         Transcribes audio or video file to text.
         """
+        return self.transcribe_with_segments(media_path, media_hash)["text"]
+
+    def transcribe_with_segments(
+        self, media_path: str, media_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Transcribes audio or video file.
+        Returns {"text": str, "segments": [{"start", "end", "text"}, ...]}.
+        Checks the transcript cache (keyed by media hash) before running ASR.
+        Pass `media_hash` when the caller already hashed the original media
+        (e.g. the media pre-stage) so the cache key stays stable.
+        """
 
         # CRITICAL FIX: ensure string path
         if isinstance(media_path, Path):
             media_path = str(media_path)
 
-        result = self.model.transcribe(media_path)
-        return result["text"]
+        key = None
+        if self.cache is not None:
+            key = TranscriptCache.make_key(
+                media_hash or sha256_file(media_path),
+                self.model_name,
+                {**self.options, "chunked": self.chunked},
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info(f"Transcript cache hit for {os.path.basename(media_path)}")
+                return {"text": cached["text"], "segments": cached["segments"]}
+
+        if self.chunked:
+            transcript = self._transcribe_chunked(media_path)
+        else:
+            with self._model() as model:
+                result = model.transcribe(_load_input(media_path), **self.options)
+
+            transcript = {
+                "text": result["text"],
+                "segments": _segments_from_result(result),
+            }
+
+        if key is not None:
+            try:
+                self.cache.set(
+                    key,
+                    transcript["text"],
+                    transcript["segments"],
+                    model=self.model_name,
+                )
+            except OSError as e:
+                logger.warning(f"Transcript cache write failed: {e}")
+
+        return transcript
+
+    def transcribe_to_transcript(
+        self, media_path: str, media_hash: Optional[str] = None
+    ) -> Transcript:
+        """
+        Transcribes media into timestamped TranscriptSegments.
+        """
+        result = self.transcribe_with_segments(media_path, media_hash)
+        return Transcript(
+            segments=[
+                TranscriptSegment(
+                    text=segment["text"], start=segment["start"], end=segment["end"]
+                )
+                for segment in result["segments"]
+                if segment["text"]
+            ]
+        )
+
+    # -----------------------------
+    # Chunked ASR
+    # -----------------------------
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned, not forked: the server process holds threads
+                # (executors, locks, loaded models) a fork would copy mid-use
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_chunk_worker,
+                    initargs=(self.model_name, self.workers),
+                )
+            return self._pool
+
+    def _transcribe_chunked(self, media_path: str) -> Dict[str, Any]:
+        """
+        Decode once, split at silences and transcribe chunks in parallel.
+        Chunk-relative timestamps are shifted back to media time.
+        """
+        from app.services.vad_service import SAMPLE_RATE, detect_speech_chunks
+
+        audio = _load_input(media_path)
+        if isinstance(audio, str):
+            from whisper.audio import load_audio
+
+            audio = load_audio(media_path)
+        chunks = detect_speech_chunks(
+            audio,
+            min_silence_ms=settings.ASR_VAD_MIN_SILENCE_MS,
+            max_chunk_seconds=settings.ASR_CHUNK_MAX_SECONDS,
+        )
+        logger.info(
+            f"Chunked ASR: {len(audio) / SAMPLE_RATE:.0f}s audio, "
+            f"{len(chunks)} speech chunks, {self.workers} workers"
+        )
+
+        if not chunks:
+            return {"text": "", "segments": []}
+
+        jobs = [
+            (audio[chunk.start : chunk.end], chunk.start_seconds, self.options)
+            for chunk in chunks
+        ]
+
+        segments: List[Dict[str, Any]] = []
+        for chunk_segments in self._get_pool().map(_transcribe_chunk, jobs):
+            segments.extend(chunk_segments)
+
+        segments.sort(key=lambda segment: segment["start"])
+
+        return {
+            "text": " ".join(segment["text"] for segment in segments if segment["text"]),
+            "segments": segments,
+        }
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+def _load_input(media_path: str):
+    """
+    16 kHz mono PCM WAV (from the media pre-stage) is read directly into
+    samples, skipping Whisper's ffmpeg decode; anything else is passed
+    through as a path.
+    """
+    if media_path.lower().endswith(".wav") and is_asr_ready_wav(media_path):
+        return load_pcm_wav(media_path)
+    return media_path
+
+
+def _segments_from_result(result: Dict[str, Any], offset: float = 0.0) -> List[Dict[str, Any]]:
+    return [
+        {
+            "start": round(float(segment["start"]) + offset, 3),
+            "end": round(float(segment["end"]) + offset, 3),
+            "text": segment["text"].strip(),
+        }
+        for segment in result.get("segments", [])
+    ]
+
+
+# -----------------------------
+# Chunk worker (runs in a child process)
+# -----------------------------
+_worker_model = None
+
+
+def _init_chunk_worker(model_name: str, workers: int) -> None:
+    global _worker_model
+    import torch
+    import whisper
+
+    # Split the cores between workers instead of oversubscribing them
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    _worker_model = whisper.load_model(model_name)
+
+
+def _transcribe_chunk(job: Tuple[Any, float, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    audio, offset, options = job
+    result = _worker_model.transcribe(audio, **options)
+    return _segments_from_result(result, offset)
+
+
+# -----------------------------
+# Shared process-wide service
+# -----------------------------
+_lock = threading.Lock()
+_service: Optional[ASRService] = None
+
+
+def get_asr_service() -> ASRService:
+    global _service
+    with _lock:
+        if _service is None:
+            _service = ASRService(cache=get_transcript_cache())
+        return _service
@@ -1,17 +1,44 @@
 import logging
-from typing import Dict, Any, List
-import whisper
+import threading
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
 
+from app.core.metrics import SECTIONS_THROTTLED, collect_timings, time_stage
 from app.services.content_resolver import ContentResolver
-from app.services.asr_service import ASRService
+from app.services.asr_service import ASRService, get_asr_service
+from app.services.media_service import get_media_preprocessor
 from app.services.llm_assessment_service import LLMAssessmentService
+from app.services.chunking_service import build_chunker
 from app.services.cleaning_service import TranscriptCleaner
+from app.services.llm_client import LLMBackend, get_llm_client
 from app.models.section import Section
 from app.models.question import Question
+from app.models.transcript import Transcript
 
 logger = logging.getLogger(__name__)
 
-MAX_SECTIONS = 5  # characters
+# Sections per request; the token budget grows so content fits in these
+MAX_SECTIONS = 5
+
+# Called as on_stage(stage_name, details) after each pipeline stage
+StageCallback = Callable[[str, Dict[str, Any]], None]
+
+# Polled before each LLM call is issued; True stops the generation
+CancelCheck = Callable[[], bool]
+
+
+class _CountingText:
+    """
+    Streamed text that counts characters as the cleaner consumes it.
+    """
+
+    def __init__(self, pieces: Iterable[str]):
+        self._pieces = pieces
+        self.characters = 0
+
+    def __iter__(self) -> Iterator[str]:
+        for piece in self._pieces:
+            self.characters += len(piece)
+            yield piece
 
 
 class AssessmentPipeline:
@@ -20,73 +47,243 @@ class AssessmentPipeline:
 
     Flow:
         Resolve content →
+        Audio extraction (if video) →
         ASR (if video) →
         Clean transcript →
         Sentence segmentation →
-        Sectioning →
+        Token-budget sectioning →
         LLM question generation →
         Structured response
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        llm_client: Optional[LLMBackend] = None,
+        asr_service: Optional[ASRService] = None,
+    ):
         self.content_resolver = ContentResolver()
-        # Load Whisper ONCE
-        whisper_model = whisper.load_model("base")  # or "small"
-        self.asr_service = ASRService(whisper_model)
+        # Whisper is loaded ONCE per process by the model registry, on first use
+        self.asr_service = asr_service or get_asr_service()
+        self.media = get_media_preprocessor()
 
         self.cleaner = TranscriptCleaner()
-        self.llm_service = LLMAssessmentService()
+        self.chunker = build_chunker()
+        self.llm_service = LLMAssessmentService(
+            llm_client=llm_client or get_llm_client()
+        )
 
-    def run(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def run(
+        self,
+        payload: Dict[str, Any],
+        on_stage: Optional[StageCallback] = None,
+        should_cancel: Optional[CancelCheck] = None,
+    ) -> Dict[str, Any]:
         """
         Execute full pipeline.
 
+        `on_stage` is notified after each stage (resolved, transcribed,
+        cleaned, sectioned, generated). It may raise to abort the run.
+        `should_cancel` is polled before every section or batch is sent
+        to the LLM, so a cancelled job also stops mid-generation.
+
         Expected payload:
         {
             "course_id": str,
             "module_id": str,
             "content_type": "text" | "video",
             "content_source": str,  # inline text or URI (Azure Blob)
-            "total_questions": int
+            "total_questions": int,
+            "max_concurrency": int,  # optional, sections generated in parallel
+            "batch_sections": bool,  # optional, several sections per prompt
+            "use_cache": bool,  # optional, False bypasses cached LLM answers
+            "include_timings": bool  # optional, adds metadata.timings_ms
         }
         """
 
         logger.info("Starting assessment pipeline")
 
+        with collect_timings() as timings:
+            resolved_type, raw_text, segments = self._resolve_text(payload, on_stage)
+            sections, original_count = self._build_sections(
+                raw_text, segments, on_stage
+            )
+            response = self.generate(
+                payload, resolved_type, sections, original_count, on_stage,
+                should_cancel,
+            )
+
+        if payload.get("include_timings"):
+            response["metadata"]["timings_ms"] = timings.as_ms()
+
+        logger.info("Assessment pipeline completed successfully")
+
+        return response
+
+    def stream(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Execute the pipeline as a stream of events.
+
+        Yields stage events (resolved, transcribed, cleaned, sectioned),
+        one "section" event per section as soon as its questions are
+        generated (completion order), then a final "summary" event.
+        Errors are reported as an "error" event instead of raising.
+        """
+        events: List[Dict[str, Any]] = []
+
+        def on_stage(stage: str, details: Dict[str, Any]) -> None:
+            events.append({"event": stage, **details})
+
+        try:
+            resolved_type, raw_text, segments = self._resolve_text(payload, on_stage)
+            yield from events
+            events.clear()
+
+            sections, original_count = self._build_sections(
+                raw_text, segments, on_stage
+            )
+            yield from events
+            events.clear()
+
+            questions_per_section = max(
+                payload["total_questions"] // len(sections), 1
+            )
+
+            total_questions = 0
+            for section, questions in self.llm_service.iter_questions(
+                sections,
+                questions_per_section=questions_per_section,
+                max_concurrency=payload.get("max_concurrency"),
+                batch=payload.get("batch_sections", False),
+                use_cache=payload.get("use_cache", True),
+            ):
+                total_questions += len(questions)
+                yield {
+                    "event": "section",
+                    "section": self._section_to_dict(section),
+                    "questions": [self._question_to_dict(q) for q in questions],
+                }
+
+        except Exception as e:
+            logger.error(f"Streaming pipeline failed: {e}")
+            yield {"event": "error", "detail": str(e)}
+            return
+
+        yield {
+            "event": "summary",
+            "assessment_id": "ASMT-POC-001",
+            "course_id": payload["course_id"],
+            "module_id": payload["module_id"],
+            "metadata": self._metadata(
+                resolved_type, sections, original_count, total_questions
+            ),
+        }
+
+    # ------------------------------
+    # Pipeline steps
+    # ------------------------------
+    def _resolve_text(
+        self, payload: Dict[str, Any], on_stage: Optional[StageCallback]
+    ) -> Tuple[str, Union[str, _CountingText], Optional[Transcript]]:
+        """
+        Returns (content_type, raw_text, timestamped ASR segments or None).
+        Remote text is not downloaded here: raw_text is then a stream the
+        cleaner consumes piece by piece in _build_sections.
+        """
         # ------------------------------
         # Step 1: Resolve content
         # ------------------------------
-        resolved_type, content = self.content_resolver.resolve(
-            payload["content_type"],
-            payload["content_source"],
-        )
+        with time_stage("resolve"):
+            resolved_type, content = self.content_resolver.resolve_stream(
+                payload["content_type"],
+                payload["content_source"],
+            )
+        self._notify(on_stage, "resolved", content_type=resolved_type)
 
         # ------------------------------
         # Step 2: ASR (if video)
         # ------------------------------
         if resolved_type == "video":
+            # ASR service checks the transcript cache before running Whisper
+            try:
+                # Extract 16 kHz mono audio once (cached); rejects silent media
+                with time_stage("extract_audio"):
+                    audio_path, media_hash = self.media.prepare(content)
+            finally:
+                # Drop the downloaded media once its audio has been extracted
+                self.content_resolver.release(content)
+
             logger.info("Running ASR on video content")
-            raw_text = self.asr_service.transcribe(content)
+            with time_stage("asr"):
+                segments = self.asr_service.transcribe_to_transcript(
+                    audio_path, media_hash=media_hash
+                )
+            raw_text = " ".join(segment.text for segment in segments.segments)
         elif resolved_type == "text":
-            raw_text = content
+            raw_text = content if isinstance(content, str) else _CountingText(content)
+            segments = None
         else:
             raise ValueError(f"Unsupported content type: {resolved_type}")
 
-        if not raw_text.strip():
-            raise ValueError("Resolved content is empty after processing")
+        # Streamed text is checked and reported once it has been read
+        if isinstance(raw_text, str):
+            if not raw_text.strip():
+                raise ValueError("Resolved content is empty after processing")
+            self._notify(on_stage, "transcribed", characters=len(raw_text))
 
+        return resolved_type, raw_text, segments
+
+    def _build_sections(
+        self,
+        raw_text: Union[str, _CountingText],
+        segments: Optional[Transcript],
+        on_stage: Optional[StageCallback],
+    ) -> Tuple[List[Section], int]:
         # ------------------------------
         # Step 3: Clean + transcript
         # ------------------------------
         logger.info("Cleaning transcript")
-        clean_text = self.cleaner.clean_text(raw_text)
+        with time_stage("clean"):
+            if segments is not None:
+                # Keep ASR timestamps so pauses can act as section boundaries
+                transcript = self.cleaner.clean_transcript(segments)
+            else:
+                # One streaming pass: cleaning, normalisation and sentence split
+                transcript = self.cleaner.to_transcript(raw_text)
+
+        if isinstance(raw_text, _CountingText):
+            if not transcript.segments:
+                raise ValueError("Resolved content is empty after processing")
+            self._notify(on_stage, "transcribed", characters=raw_text.characters)
+
+        self._notify(on_stage, "cleaned", segments=len(transcript.segments))
+
+        sections, original_count = self.build_sections(transcript)
+
+        self._notify(
+            on_stage,
+            "sectioned",
+            sections=len(sections),
+            original=original_count,
+            section_ids=[section.section_id for section in sections],
+        )
 
-        transcript = self.cleaner.to_transcript(clean_text)
+        return sections, original_count
 
+    # ------------------------------
+    # Reusable stages
+    # ------------------------------
+    def build_sections(self, transcript: Transcript) -> Tuple[List[Section], int]:
+        """
+        Section a cleaned transcript, throttled to MAX_SECTIONS.
+        Returns (sections, section count before throttling).
+        """
         # ------------------------------
         # Step 4: Sectioning / chunking
         # ------------------------------
-        sections: List[Section] = self.cleaner.to_sections(transcript)
+        with time_stage("section"):
+            sections: List[Section] = self.chunker.chunk(
+                transcript, max_sections=MAX_SECTIONS
+            )
 
         if not sections:
             raise ValueError("No sections generated from transcript")
@@ -94,63 +291,115 @@ class AssessmentPipeline:
         original_count = len(sections)
 
         if len(sections) > MAX_SECTIONS:
+            SECTIONS_THROTTLED.inc(len(sections) - MAX_SECTIONS)
             sections = sections[:MAX_SECTIONS]
             logger.info(f"Using {len(sections)} sections for LLM generation")
 
+        return sections, original_count
+
+    def generate(
+        self,
+        payload: Dict[str, Any],
+        resolved_type: str,
+        sections: List[Section],
+        original_count: int,
+        on_stage: Optional[StageCallback] = None,
+        should_cancel: Optional[CancelCheck] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate questions for prepared sections and assemble the response.
+        """
         # ------------------------------
         # Step 5: LLM assessment generation
         # ------------------------------
         questions_per_section = max(payload["total_questions"] // len(sections), 1)
 
-        questions: List[Question] = []
-
-        for section in sections:
-            try:
-                generated = self.llm_service.generate_questions(
-                    sections=[section],
-                    questions_per_section=questions_per_section,
-                )
-                questions.extend(generated)
-
-            except Exception as e:
-                logger.warning(
-                    f"Skipping section {section.section_id} due to LLM failure: {e}"
-                )
-                continue
+        with time_stage("generate"):
+            questions: List[Question] = self.llm_service.generate_questions(
+                sections=sections,
+                questions_per_section=questions_per_section,
+                max_concurrency=payload.get("max_concurrency"),
+                batch=payload.get("batch_sections", False),
+                use_cache=payload.get("use_cache", True),
+                should_cancel=should_cancel,
+            )
 
         if not questions:
             raise ValueError("LLM returned no valid questions")
-            logger.info(f"Generated total of {len(questions)} questions")
+
+        logger.info(f"Generated total of {len(questions)} questions")
+        self._notify(on_stage, "generated", questions=len(questions))
 
         # ------------------------------
         # Step 6: Assemble response
         # ------------------------------
-        response = {
-            "assessment_id": "ASMT-POC-001",
-            "course_id": payload["course_id"],
-            "module_id": payload["module_id"],
-            "metadata": {
-                "content_type": resolved_type,
-                # "total_sections": len(sections),
-                "total_sections": len(sections),
-                "original_section_count": original_count,
-                "throttled": original_count > len(sections),
-                "total_questions": len(questions),
-            },
-            "questions": [
-                {
-                    "question_id": q.question_id,
-                    "section_id": q.section_id,
-                    "type": q.type,
-                    "question": q.question,
-                    "options": q.options,
-                    "correct_answer": q.correct_answer,
-                    "explanation": q.explanation,
-                }
-                for q in questions
-            ],
+        with time_stage("assemble"):
+            return {
+                "assessment_id": "ASMT-POC-001",
+                "course_id": payload["course_id"],
+                "module_id": payload["module_id"],
+                "metadata": self._metadata(
+                    resolved_type, sections, original_count, len(questions)
+                ),
+                "questions": [self._question_to_dict(q) for q in questions],
+            }
+
+    # ------------------------------
+    # Response helpers
+    # ------------------------------
+    @staticmethod
+    def _metadata(
+        resolved_type: str,
+        sections: List[Section],
+        original_count: int,
+        total_questions: int,
+    ) -> Dict[str, Any]:
+        return {
+            "content_type": resolved_type,
+            # "total_sections": len(sections),
+            "total_sections": len(sections),
+            "original_section_count": original_count,
+            "throttled": original_count > len(sections),
+            "total_questions": total_questions,
         }
 
-        logger.info("Assessment pipeline completed successfully")
+    @staticmethod
+    def _section_to_dict(section: Section) -> Dict[str, Any]:
+        return {
+            "section_id": section.section_id,
+            "title": section.title,
+            "content": section.content,
+        }
 
-        return response
+    @staticmethod
+    def _question_to_dict(q: Question) -> Dict[str, Any]:
+        return {
+            "question_id": q.question_id,
+            "section_id": q.section_id,
+            "type": q.type,
+            "question": q.question,
+            "options": q.options,
+            "correct_answer": q.correct_answer,
+            "explanation": q.explanation,
+            "prompt_version": q.prompt_version,
+        }
+
+    @staticmethod
+    def _notify(on_stage: Optional[StageCallback], stage: str, **details: Any) -> None:
+        if on_stage is not None:
+            on_stage(stage, details)
+
+
+# -----------------------------
+# Shared process-wide pipeline
+# -----------------------------
+_lock = threading.Lock()
+_pipeline: Optional[AssessmentPipeline] = None
+
+
+def get_pipeline() -> AssessmentPipeline:
+    global _pipeline
+    with _lock:
+        if _pipeline is None:
+            _pipeline = AssessmentPipeline()
+        return _pipeline
@@ -1,13 +1,23 @@
+from typing import Optional
+
 from app.utils.json_utils import safe_json_loads
-from app.prompts.assessment_prompt import build_assessment_prompt
+from app.prompts import get_prompt
+from app.services.llm_client import GenerationOptions, LLMBackend, get_llm_client
 
 class AssessmentService:
-    def __init__(self, llm_client):
-        self.llm = llm_client
+    def __init__(self, llm_client: Optional[LLMBackend] = None):
+        self.llm = llm_client or get_llm_client()
 
-    def generate_questions(self, section_text: str, num_questions: int):
-        prompt = build_assessment_prompt(section_text, num_questions)
-        response = self.llm.generate(prompt)
+    def generate_questions(
+        self,
+        section_text: str,
+        num_questions: int,
+        options: Optional[GenerationOptions] = None,
+    ):
+        prompt = get_prompt("assessment").render(
+            section_text=section_text, num_questions=num_questions
+        )
+        response = self.llm.generate(prompt.prompt, options=options, system=prompt.system)
 
         parsed = safe_json_loads(response)
 
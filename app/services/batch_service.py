@@ -0,0 +1,206 @@
+"""
+Batch Service
+-------------
+Generates assessments for many modules from one JSONL request stream.
+
+Each line is a GenerateAssessmentRequest. Lines are parsed lazily and
+run on one process-wide worker pool, so concurrent batches
+share the same limit (and the shared pipeline, caches and LLM slots).
+Results are yielded in completion order, one per line, correlated by
+line index, course_id and module_id. A bad line or a failed generation
+produces an error item; it never fails the rest of the batch.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.core import settings
+from app.schemas.request import GenerateAssessmentRequest
+from app.services.job_service import COMPLETED, FAILED
+
+logger = logging.getLogger(__name__)
+
+
+def iter_lines(body: bytes) -> Iterator[str]:
+    """Yield the decoded, non-blank lines of a JSONL body."""
+    for line in body.splitlines():
+        if line.strip():
+            yield line.decode("utf-8", errors="replace")
+
+
+class BatchService:
+    def __init__(
+        self,
+        pipeline_factory: Callable[[], Any],
+        max_workers: int = settings.BATCH_WORKERS,
+        max_items: int = settings.BATCH_MAX_ITEMS,
+    ):
+        self.max_workers = max_workers
+        self.max_items = max_items
+        self._pipeline_factory = pipeline_factory
+        self._pipeline = None
+        self._pipeline_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="assessment-batch"
+        )
+
+    async def stream(self, lines: Iterable[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run every request line and yield result items as they complete,
+        followed by a final {"event": "summary"} item.
+        """
+        loop = asyncio.get_running_loop()
+        pending: Dict[asyncio.Future, Tuple[int, Dict[str, Any]]] = {}
+        # Submit only as far ahead as the workers can use, so results of
+        # early lines stream out while later ones are still queued
+        window = self.max_workers * 2
+        counts = {COMPLETED: 0, FAILED: 0}
+        started = time.perf_counter()
+        index = -1
+
+        try:
+            for line in lines:
+                index += 1
+
+                if index >= self.max_items:
+                    item = self._error_item(
+                        index, {}, f"Batch limit of {self.max_items} items exceeded"
+                    )
+                    counts[FAILED] += 1
+                    yield item
+                    break
+
+                payload, error = self._parse(line)
+                if error:
+                    counts[FAILED] += 1
+                    yield self._error_item(index, payload, error)
+                    continue
+
+                future = loop.run_in_executor(self._executor, self._run_item, payload)
+                pending[future] = (index, payload)
+
+                # Hand back whatever has finished; block only when the window is full
+                wait_timeout = None if len(pending) >= window else 0
+                done, _ = await asyncio.wait(
+                    pending, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for item in self._collect(done, pending, counts):
+                    yield item
+
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for item in self._collect(done, pending, counts):
+                    yield item
+
+        finally:
+            # Client went away: drop work that hasn't started yet
+            for future in pending:
+                future.cancel()
+
+        yield {
+            "event": "summary",
+            "total": counts[COMPLETED] + counts[FAILED],
+            "completed": counts[COMPLETED],
+            "failed": counts[FAILED],
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    # -----------------------------
+    # Items
+    # -----------------------------
+    @staticmethod
+    def _parse(line: str) -> Tuple[Dict[str, Any], Optional[str]]:
+        try:
+            raw = json.loads(line)
+        except json.JSONDecodeError as e:
+            return {}, f"Invalid JSON: {e}"
+
+        if not isinstance(raw, dict):
+            return {}, "Each line must be a JSON object"
+
+        try:
+            request = GenerateAssessmentRequest.model_validate(raw)
+        except ValidationError as e:
+            return raw, f"Invalid request: {e.errors(include_url=False)}"
+
+        return request.model_dump(mode="json"), None
+
+    def _run_item(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+        start = time.perf_counter()
+        result = self._get_pipeline().run(payload)
+        return result, time.perf_counter() - start
+
+    def _collect(self, done, pending, counts):
+        for future in done:
+            index, payload = pending.pop(future)
+            try:
+                result, seconds = future.result()
+            except Exception as e:
+                logger.error(
+                    f"Batch item {index} ({payload.get('course_id')}/"
+                    f"{payload.get('module_id')}) failed: {e}"
+                )
+                counts[FAILED] += 1
+                yield self._error_item(index, payload, str(e))
+                continue
+
+            counts[COMPLETED] += 1
+            yield {
+                "index": index,
+                "course_id": payload["course_id"],
+                "module_id": payload["module_id"],
+                "status": COMPLETED,
+                "duration_ms": round(seconds * 1000, 1),
+                "result": result,
+            }
+
+    @staticmethod
+    def _error_item(index: int, payload: Dict[str, Any], error: str) -> Dict[str, Any]:
+        return {
+            "index": index,
+            "course_id": payload.get("course_id"),
+            "module_id": payload.get("module_id"),
+            "status": FAILED,
+            "error": error,
+        }
+
+    def _get_pipeline(self):
+        with self._pipeline_lock:
+            if self._pipeline is None:
+                self._pipeline = self._pipeline_factory()
+            return self._pipeline
+
+
+# -----------------------------
+# Shared process-wide service
+# -----------------------------
+_lock = threading.Lock()
+_service: Optional[BatchService] = None
+
+
+def get_batch_service() -> BatchService:
+    global _service
+    with _lock:
+        if _service is None:
+            from app.services.assessment_pipeline_service import get_pipeline
+
+            _service = BatchService(pipeline_factory=get_pipeline)
+        return _service
+
+
+def shutdown_batch_service() -> None:
+    global _service
+    with _lock:
+        service, _service = _service, None
+    if service is not None:
+        service.shutdown()
@@ -1,2 +1,436 @@
-# Token based chunking
-# Semantic grouping
\ No newline at end of file
+"""
+Chunking Service
+----------------
+Token-budget sectioning of transcripts.
+
+Sentences are packed into sections up to a token budget, measured with
+the fast local estimate in text_utils. Paragraph breaks (text) and long
+pauses between timestamped segments (ASR) are preferred cut points, and
+a few trailing sentences can be repeated at the start of the next
+section so questions near a cut keep their context.
+
+SemanticChunker additionally cuts at topic shifts: sentence vectors
+(TF-IDF, or an optional local embedding model) are built in one batch
+as a sparse matrix and boundaries are placed at similarity drops between
+neighbouring windows, all in vectorised O(n) passes.
+"""
+
+import logging
+import math
+from functools import lru_cache
+from dataclasses import dataclass, replace
+from typing import Callable, Iterable, Iterator, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from app.core import settings
+from app.models.section import Section
+from app.models.transcript import Transcript, TranscriptSegment
+from app.utils.text_utils import content_words, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Maps a batch of sentences to an (n, d) array of vectors
+Embedder = Callable[[List[str]], np.ndarray]
+
+
+@dataclass
+class _Unit:
+    """
+    A sentence (or a piece of an over-long one) with its token estimate.
+    """
+    text: str
+    tokens: int
+    boundary: bool = False  # a preferred cut point precedes this unit
+    start: Optional[float] = None
+    end: Optional[float] = None
+
+
+def _piece(unit: _Unit, words: List[str], tokens: int, first: bool) -> _Unit:
+    return _Unit(
+        text=" ".join(words),
+        tokens=tokens,
+        boundary=unit.boundary and first,
+        start=unit.start,
+        end=unit.end,
+    )
+
+
+class TokenChunker:
+    """
+    Packs transcript segments into sections under a token budget.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = settings.CHUNK_MAX_TOKENS,
+        overlap_tokens: int = settings.CHUNK_OVERLAP_TOKENS,
+        min_tokens: int = settings.CHUNK_MIN_TOKENS,
+        max_context_tokens: int = settings.CHUNK_MAX_CONTEXT_TOKENS,
+        max_gap_seconds: float = settings.CHUNK_MAX_GAP_SECONDS,
+    ):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens must be in [0, max_tokens)")
+
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min(min_tokens, max_tokens)
+        self.max_context_tokens = max(max_context_tokens, max_tokens)
+        self.max_gap_seconds = max_gap_seconds
+
+    def chunk(
+        self, transcript: Transcript, max_sections: Optional[int] = None
+    ) -> List[Section]:
+        """
+        Split a transcript into sections of at most the token budget.
+
+        With `max_sections`, the budget grows (up to max_context_tokens)
+        so the whole transcript fits in that many sections instead of
+        being truncated; callers should still cap the result, since very
+        long content can exceed even the context-sized budget.
+        """
+        units = list(self._units(transcript.segments))
+        if not units:
+            return []
+
+        budget = self._budget(units, max_sections)
+        sections = list(self._pack(self._split_long(units, budget), budget))
+
+        # Boundaries leave sections short of the budget; widen until it fits
+        while (
+            max_sections
+            and len(sections) > max_sections
+            and budget < self.max_context_tokens
+        ):
+            budget = min(int(budget * 1.25) + 1, self.max_context_tokens)
+            sections = list(self._pack(self._split_long(units, budget), budget))
+
+        return sections
+
+    def iter_chunks(self, segments: Iterable[TranscriptSegment]) -> Iterator[Section]:
+        """
+        Lazily pack a stream of segments at the base budget, holding at
+        most one section plus one paragraph in memory.
+        """
+        units = self._units(segments)
+        return self._pack(self._split_long(units, self.max_tokens), self.max_tokens)
+
+    # -----------------------------
+    # Internals
+    # -----------------------------
+    def _budget(self, units: List[_Unit], max_sections: Optional[int]) -> int:
+        if not max_sections:
+            return self.max_tokens
+
+        total = sum(unit.tokens for unit in units)
+        # Headroom for overlap and for cuts that land short of the budget
+        needed = math.ceil(total * 1.15 / max_sections) + self.overlap_tokens
+        return max(self.max_tokens, min(needed, self.max_context_tokens))
+
+    def _units(self, segments: Iterable[TranscriptSegment]) -> Iterator[_Unit]:
+        previous_end: Optional[float] = None
+        first = True
+
+        for segment in segments:
+            text = segment.text.strip()
+            if not text:
+                continue
+
+            boundary = segment.paragraph_start
+            if (
+                previous_end is not None
+                and segment.start is not None
+                and segment.start - previous_end >= self.max_gap_seconds
+            ):
+                boundary = True
+
+            yield _Unit(
+                text=text,
+                tokens=estimate_tokens(text),
+                boundary=boundary and not first,
+                start=segment.start,
+                end=segment.end,
+            )
+            first = False
+            if segment.end is not None:
+                previous_end = segment.end
+
+    @staticmethod
+    def _split_long(units: Iterable[_Unit], budget: int) -> Iterator[_Unit]:
+        """Break sentences longer than the budget at word boundaries."""
+        for unit in units:
+            if unit.tokens <= budget:
+                yield unit
+                continue
+
+            words = unit.text.split()
+            piece: List[str] = []
+            piece_tokens = 0
+            first = True
+
+            for word in words:
+                word_tokens = estimate_tokens(word)
+                if piece and piece_tokens + word_tokens > budget:
+                    yield _piece(unit, piece, piece_tokens, first)
+                    piece, piece_tokens, first = [], 0, False
+                piece.append(word)
+                piece_tokens += word_tokens
+
+            if piece:
+                yield _piece(unit, piece, piece_tokens, first)
+
+    def _pack(self, units: Iterable[_Unit], budget: int) -> Iterator[Section]:
+        current: List[_Unit] = []
+        current_tokens = 0
+        index = 0
+
+        for block in self._blocks(units):
+            block_tokens = sum(unit.tokens for unit in block)
+
+            # Cut at a paragraph/pause when the next block won't fit whole,
+            # unless that would leave a tiny section behind
+            if (
+                current
+                and current_tokens + block_tokens > budget
+                and current_tokens >= self.min_tokens
+            ):
+                index += 1
+                yield self._section(current, index)
+                current, current_tokens = [], 0
+
+            for unit in block:
+                if current and current_tokens + unit.tokens > budget:
+                    index += 1
+                    yield self._section(current, index)
+
+                    # Overlap only across cuts forced mid-paragraph
+                    current = self._overlap(current)
+                    current_tokens = sum(u.tokens for u in current)
+                    while current and current_tokens + unit.tokens > budget:
+                        current_tokens -= current.pop(0).tokens
+
+                current.append(unit)
+                current_tokens += unit.tokens
+
+        if current:
+            yield self._section(current, index + 1)
+
+    @staticmethod
+    def _blocks(units: Iterable[_Unit]) -> Iterator[List[_Unit]]:
+        """Group units into paragraphs (runs between boundaries)."""
+        block: List[_Unit] = []
+        for unit in units:
+            if unit.boundary and block:
+                yield block
+                block = []
+            block.append(unit)
+        if block:
+            yield block
+
+    def _overlap(self, units: List[_Unit]) -> List[_Unit]:
+        if not self.overlap_tokens:
+            return []
+
+        carried: List[_Unit] = []
+        tokens = 0
+        # Never carry the whole section forward
+        for unit in reversed(units[1:]):
+            if tokens + unit.tokens > self.overlap_tokens:
+                break
+            carried.insert(0, unit)
+            tokens += unit.tokens
+        return carried
+
+    @staticmethod
+    def _section(units: List[_Unit], index: int) -> Section:
+        starts = [u.start for u in units if u.start is not None]
+        ends = [u.end for u in units if u.end is not None]
+        return Section(
+            section_id=f"S{index}",
+            title=f"Section {index}",
+            content=" ".join(u.text for u in units),
+            start=min(starts) if starts else None,
+            end=max(ends) if ends else None,
+        )
+
+
+# -----------------------------
+# Semantic sectioning
+# -----------------------------
+def tfidf_matrix(sentences: List[str]) -> sparse.csr_matrix:
+    """
+    Build L2-normalised TF-IDF rows (one per sentence) as a CSR matrix.
+    """
+    vocabulary = {}
+    rows: List[int] = []
+    cols: List[int] = []
+
+    for i, sentence in enumerate(sentences):
+        for word in content_words(sentence):
+            rows.append(i)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    n = len(sentences)
+    if not cols:
+        return sparse.csr_matrix((n, 1), dtype=np.float32)
+
+    counts = sparse.csr_matrix(
+        (np.ones(len(cols), dtype=np.float32), (rows, cols)),
+        shape=(n, len(vocabulary)),
+    )
+    counts.sum_duplicates()
+
+    # Sublinear term frequency, smoothed inverse document frequency
+    counts.data = 1.0 + np.log(counts.data)
+    df = np.bincount(counts.indices, minlength=len(vocabulary))
+    idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+    matrix = counts @ sparse.diags(idf.astype(np.float32))
+
+    return _normalize_rows(matrix.tocsr())
+
+
+def _normalize_rows(matrix):
+    if sparse.issparse(matrix):
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms) @ matrix
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def window_similarities(vectors, window: int) -> np.ndarray:
+    """
+    Cosine similarity across each gap between consecutive sentences,
+    comparing the `window` sentences before the gap with those after it.
+
+    Window sums are banded-matrix products, so the cost is linear in the
+    number of sentences. Returns an array of length n - 1.
+    """
+    n = vectors.shape[0]
+    if n < 2:
+        return np.zeros(0, dtype=np.float32)
+
+    window = max(1, window)
+    # Row i of `before` sums sentences i-window+1..i; `after` sums i+1..i+window
+    before = sparse.diags(
+        [np.ones(n - 1)] * window, [-k for k in range(window)], shape=(n - 1, n)
+    )
+    after = sparse.diags(
+        [np.ones(n - 1)] * window, [k + 1 for k in range(window)], shape=(n - 1, n)
+    )
+
+    left = _normalize_rows(before @ vectors)
+    right = _normalize_rows(after @ vectors)
+
+    if sparse.issparse(left):
+        return np.asarray(left.multiply(right).sum(axis=1)).ravel()
+    return np.einsum("ij,ij->i", left, right)
+
+
+def topic_boundaries(similarities: np.ndarray, drop_std: float) -> np.ndarray:
+    """
+    Indices of gaps that are local similarity minima and fall `drop_std`
+    standard deviations below the mean.
+    """
+    if len(similarities) < 3:
+        return np.zeros(0, dtype=np.int64)
+
+    padded = np.concatenate(([np.inf], similarities, [np.inf]))
+    is_minimum = (similarities <= padded[:-2]) & (similarities < padded[2:])
+    threshold = similarities.mean() - drop_std * similarities.std()
+
+    return np.flatnonzero(is_minimum & (similarities < threshold))
+
+
+@lru_cache(maxsize=None)
+def _load_sentence_transformer(model_name: str) -> Optional[Embedder]:
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.warning(
+            f"sentence-transformers not installed; using TF-IDF instead of {model_name}"
+        )
+        return None
+
+    model = SentenceTransformer(model_name)
+    return lambda sentences: model.encode(
+        sentences, batch_size=64, convert_to_numpy=True, show_progress_bar=False
+    )
+
+
+class SemanticChunker(TokenChunker):
+    """
+    Token-budget chunker that also cuts at topic shifts.
+
+    Topic boundaries are marked like paragraph breaks, so the usual
+    packing rules apply: small topics are merged up to the budget and
+    long ones are still split to fit.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        window: int = settings.SEMANTIC_WINDOW,
+        drop_std: float = settings.SEMANTIC_DROP_STD,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.embedder = embedder
+        self.window = window
+        self.drop_std = drop_std
+
+    def chunk(
+        self, transcript: Transcript, max_sections: Optional[int] = None
+    ) -> List[Section]:
+        return super().chunk(self.mark_topics(transcript), max_sections=max_sections)
+
+    def mark_topics(self, transcript: Transcript) -> Transcript:
+        """
+        Return a copy of the transcript with topic shifts flagged as
+        paragraph starts (existing paragraph starts are kept).
+        """
+        segments = transcript.segments
+        if len(segments) < 2 * self.window + 1:
+            return transcript
+
+        vectors = self.vectorize([segment.text for segment in segments])
+        gaps = topic_boundaries(window_similarities(vectors, self.window), self.drop_std)
+
+        starts = np.zeros(len(segments), dtype=bool)
+        starts[gaps + 1] = True
+
+        return Transcript(
+            segments=[
+                replace(segment, paragraph_start=True)
+                if flag and not segment.paragraph_start
+                else segment
+                for segment, flag in zip(segments, starts.tolist())
+            ]
+        )
+
+    def vectorize(self, sentences: List[str]):
+        """Sentence vectors: embeddings when available, TF-IDF otherwise."""
+        if self.embedder is not None:
+            vectors = np.asarray(self.embedder(sentences), dtype=np.float32)
+            return _normalize_rows(vectors)
+        return tfidf_matrix(sentences)
+
+
+def build_chunker(strategy: str = settings.CHUNK_STRATEGY) -> TokenChunker:
+    """
+    Create the sectioning chunker configured in settings.
+    """
+    if strategy == "token":
+        return TokenChunker()
+    if strategy == "semantic":
+        embedder = None
+        if settings.SEMANTIC_EMBEDDING_MODEL:
+            embedder = _load_sentence_transformer(settings.SEMANTIC_EMBEDDING_MODEL)
+        return SemanticChunker(embedder=embedder)
+
+    raise ValueError(f"Unknown chunking strategy: {strategy}")
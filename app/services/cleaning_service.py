@@ -2,14 +2,31 @@
 # NOrmalize text
 # Section Segmentation
 import re
-from typing import List
+from typing import IO, Iterable, Iterator, List, Union
 from app.models.transcript import Transcript, TranscriptSegment
 from app.models.section import Section
 
+# Raw text, an iterator of text pieces, or a file opened in text mode
+TextSource = Union[str, Iterable[str], IO[str]]
+
+# Compiled once; longer fillers first so "uh-huh" isn't cut to "-huh"
+_FILLERS = re.compile(r"\b(?:uh-huh|uumh|you know|um|uh)\b", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+# A sentence end followed by whitespace, or a paragraph break (blank line)
+_BREAK = re.compile(r"(?<=[.!?])\s+|\s*\n[^\S\n]*\n\s*")
+
+READ_SIZE = 64 * 1024
+# Cut unpunctuated text (raw ASR output) at whitespace past this length
+MAX_SENTENCE_CHARS = 2000
+
 
 class TranscriptCleaner:
     """
     Cleans raw transcript text and splits it into logical sections.
+
+    Cleaning, whitespace normalisation and sentence splitting run in one
+    streaming pass: input is consumed piece by piece and only the
+    current unfinished sentence is buffered.
     """
 
     def clean_text(self, text: str) -> str:
@@ -21,33 +38,94 @@ class TranscriptCleaner:
             return ""
 
         # Lower risk operations only
-        text = text.strip()
-        text = re.sub(r"\s+", " ", text)  # normalize whitespace
-        text = re.sub(
-            r"\b(um|uh|you know|uumh|Uh-huh)\b", "", text, flags=re.IGNORECASE
-        )
-        text = text.strip()
+        text = _FILLERS.sub("", text)
+        return _WHITESPACE.sub(" ", text).strip()
+
+    def iter_segments(self, source: TextSource) -> Iterator[TranscriptSegment]:
+        """
+        Lazily yield cleaned sentence segments from text, an iterator of
+        text pieces, or a text file. The first sentence of each paragraph
+        (blank-line separated) is marked so chunking can cut there.
+        """
+        buffer = ""
+        paragraph_start = False
+        emitted = False
+
+        for piece in _pieces(source):
+            buffer += piece
+            position = 0
+
+            for match in _BREAK.finditer(buffer):
+                # A break touching the end may continue in the next piece
+                if match.end() == len(buffer):
+                    break
+
+                text = self.clean_text(buffer[position:match.start()])
+                if text:
+                    yield TranscriptSegment(
+                        text=text, paragraph_start=paragraph_start and emitted
+                    )
+                    emitted = True
+                    paragraph_start = False
+                paragraph_start = paragraph_start or match.group().count("\n") >= 2
+                position = match.end()
+
+            buffer = buffer[position:]
+
+            # Unpunctuated text never ends a sentence; don't buffer it all
+            while len(buffer) > MAX_SENTENCE_CHARS:
+                cut = buffer.rfind(" ", 0, MAX_SENTENCE_CHARS)
+                if cut <= 0:
+                    cut = MAX_SENTENCE_CHARS
+                text = self.clean_text(buffer[:cut])
+                if text:
+                    yield TranscriptSegment(
+                        text=text, paragraph_start=paragraph_start and emitted
+                    )
+                    emitted = True
+                    paragraph_start = False
+                buffer = buffer[cut:]
 
-        return text
+        text = self.clean_text(buffer)
+        if text:
+            yield TranscriptSegment(text=text, paragraph_start=paragraph_start and emitted)
 
-    def to_transcript(self, raw_text: str) -> Transcript:
+    def to_transcript(self, raw_text: TextSource) -> Transcript:
         """
         Convert raw text into transcript segments.
-        For now, split by sentences.
+        Split by sentences; see iter_segments().
         """
         if not raw_text:
             raise ValueError("Raw text is empty")
 
-        sentences = re.split(r"(?<=[.!?])\s+", raw_text)
-
-        segments = [
-            TranscriptSegment(text=self.clean_text(sentence))
-            for sentence in sentences
-            if sentence.strip()
-        ]
+        return Transcript(segments=list(self.iter_segments(raw_text)))
 
+    def clean_transcript(self, transcript: Transcript) -> Transcript:
+        """
+        Clean timestamped (ASR) segments in place of re-splitting them,
+        so their start/end times survive.
+        """
+        segments = []
+        for segment in transcript.segments:
+            text = self.clean_text(segment.text)
+            if text:
+                segments.append(
+                    TranscriptSegment(text=text, start=segment.start, end=segment.end)
+                )
         return Transcript(segments=segments)
 
+    def iter_sections(self, source: TextSource, chunker=None) -> Iterator[Section]:
+        """
+        Lazily yield token-budget sections straight from the input,
+        holding at most one section's worth of text at a time.
+        """
+        if chunker is None:
+            from app.services.chunking_service import TokenChunker
+
+            chunker = TokenChunker()
+
+        return chunker.iter_chunks(self.iter_segments(source))
+
     def to_sections(
         self, transcript: Transcript, max_sentences_per_section: int = 2
     ) -> List[Section]:
@@ -85,3 +163,18 @@ class TranscriptCleaner:
             )
 
         return sections
+
+
+def _pieces(source: TextSource, read_size: int = READ_SIZE) -> Iterator[str]:
+    if isinstance(source, str):
+        # Slice so a huge string is scanned in bounded windows
+        for start in range(0, len(source), read_size):
+            yield source[start:start + read_size]
+    elif hasattr(source, "read"):
+        while True:
+            piece = source.read(read_size)
+            if not piece:
+                break
+            yield piece
+    else:
+        yield from source
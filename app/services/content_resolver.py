@@ -1,6 +1,8 @@
-import tempfile
-import requests
-from typing import Tuple
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple, Union
+
+from app.services.fetch_service import ContentFetcher, get_content_fetcher
+from app.services.media_service import detect_container
 
 
 class ContentResolver:
@@ -10,9 +12,33 @@ class ContentResolver:
     Returns:
         mode: 'text' or 'video'
         payload: raw text OR local file path
+
+    Remote video is downloaded to a temp file owned by the fetcher;
+    call release(payload) (or use resolved()) once it has been consumed.
     """
 
+    def __init__(self, fetcher: Optional[ContentFetcher] = None):
+        self.fetcher = fetcher or get_content_fetcher()
+
     def resolve(self, content_type: str, content_source: dict) -> Tuple[str, str]:
+        mode, payload = self.resolve_stream(content_type, content_source)
+
+        if mode == "text" and not isinstance(payload, str):
+            payload = "".join(payload)
+
+        return mode, payload
+
+    def resolve_stream(
+        self, content_type: str, content_source: dict
+    ) -> Tuple[str, Union[str, Iterator[str]]]:
+        """
+        Like resolve(), but remote text comes back as an iterator of
+        decoded pieces so it can be cleaned without a full copy.
+        """
+        # Accept request models as well as plain dicts
+        if hasattr(content_source, "model_dump"):
+            content_source = content_source.model_dump(mode="json")
+
         source_type = content_source.get("type")
 
         # ----------------------------
@@ -35,33 +61,45 @@ class ContentResolver:
 
         raise ValueError(f"Unsupported content source type: {source_type}")
 
-    def _resolve_uri(self, content_type: str, content_source: dict) -> Tuple[str, str]:
+    def release(self, payload) -> None:
+        """Remove a temp file created while resolving (no-op otherwise)."""
+        if isinstance(payload, str) and self.fetcher.owns(payload):
+            self.fetcher.release(payload)
+
+    @contextmanager
+    def resolved(self, content_type: str, content_source: dict):
+        """Resolve content and release any temp file on exit."""
+        mode, payload = self.resolve(content_type, content_source)
+        try:
+            yield mode, payload
+        finally:
+            self.release(payload)
+
+    def _resolve_uri(
+        self, content_type: str, content_source: dict
+    ) -> Tuple[str, Union[str, Iterator[str]]]:
         headers = {}
 
         auth = content_source.get("auth")
         if auth and auth.get("type") == "bearer":
             headers["Authorization"] = f"Bearer {auth['token']}"
 
-        response = requests.get(
-            content_source["uri"],
-            headers=headers,
-            stream=True,
-            timeout=60,
-        )
-        response.raise_for_status()
+        uri = str(content_source["uri"])
 
         # ----------------------------
         # Text content
         # ----------------------------
         if content_type == "text":
-            return "text", response.text
+            return "text", self.fetcher.iter_text(uri, headers=headers)
 
         # ----------------------------
         # Video content
         # ----------------------------
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-        for chunk in response.iter_content(chunk_size=8192):
-            tmp.write(chunk)
-        tmp.close()
+        path = self.fetcher.download(uri, headers=headers)
+
+        # Name the file after its real container, sniffed from its bytes
+        container = detect_container(path)
+        if container:
+            path = self.fetcher.rename(path, f"{path}.{container}")
 
-        return "video", tmp.name
+        return "video", path
@@ -0,0 +1,276 @@
+"""
+Fetch Service
+-------------
+Pooled, streaming retrieval of remote content (Azure Blob, HTTP).
+
+- One shared requests.Session with a connection pool and retries
+- Chunk size adapts to the advertised Content-Length
+- Hard size limits enforced while streaming
+- Media downloads resume with Range requests after a dropped connection
+- Text is decoded incrementally, never buffered as one bytes object
+- Temp files are tracked and removed when released (or at exit)
+"""
+
+import atexit
+import codecs
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterator, Optional, Set
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core import settings
+from app.core.exceptions import ContentTooLargeError
+from app.core.metrics import BYTES_DOWNLOADED, time_stage
+
+logger = logging.getLogger(__name__)
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+def adaptive_chunk_size(content_length: Optional[int]) -> int:
+    """
+    Aim for roughly 64 reads per body, within [64 KB, 4 MB].
+    """
+    if not content_length:
+        return DEFAULT_CHUNK_SIZE
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, content_length // 64))
+
+
+class ContentFetcher:
+    def __init__(
+        self,
+        pool_size: int = settings.FETCH_POOL_SIZE,
+        timeout: float = settings.FETCH_TIMEOUT_SECONDS,
+        retries: int = settings.FETCH_RETRIES,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+
+        # Retries here cover connection setup and retryable statuses;
+        # mid-body failures are resumed in download()
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._temp_files: Set[str] = set()
+        self._temp_lock = threading.Lock()
+
+    # -----------------------------
+    # Streaming reads
+    # -----------------------------
+    def _open(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        response = self.session.get(url, headers=headers, stream=True, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _content_length(response: requests.Response) -> Optional[int]:
+        value = response.headers.get("Content-Length")
+        return int(value) if value and value.isdigit() else None
+
+    def _check_size(self, url: str, size: int, max_bytes: int) -> None:
+        if size > max_bytes:
+            raise ContentTooLargeError(
+                f"Content at {url} exceeds the {max_bytes} byte limit"
+            )
+
+    def iter_bytes(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        max_bytes: int = settings.FETCH_MAX_TEXT_BYTES,
+    ) -> Iterator[bytes]:
+        with self._open(url, headers or {}) as response:
+            length = self._content_length(response)
+            if length is not None:
+                self._check_size(url, length, max_bytes)
+
+            received = 0
+            for chunk in response.iter_content(chunk_size=adaptive_chunk_size(length)):
+                received += len(chunk)
+                self._check_size(url, received, max_bytes)
+                BYTES_DOWNLOADED.labels(kind="bytes").inc(len(chunk))
+                yield chunk
+
+    def iter_text(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        max_bytes: int = settings.FETCH_MAX_TEXT_BYTES,
+    ) -> Iterator[str]:
+        """
+        Yield decoded text pieces as they arrive.
+        Uses the charset from Content-Type, defaulting to UTF-8.
+        """
+        with self._open(url, headers or {}) as response:
+            length = self._content_length(response)
+            if length is not None:
+                self._check_size(url, length, max_bytes)
+
+            encoding = (
+                requests.utils.get_encoding_from_headers(response.headers) or "utf-8"
+            )
+            # requests reports ISO-8859-1 for bare text/* types; transcripts are UTF-8
+            if encoding.lower() == "iso-8859-1" and "charset" not in response.headers.get(
+                "Content-Type", ""
+            ):
+                encoding = "utf-8"
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+            received = 0
+            for chunk in response.iter_content(chunk_size=adaptive_chunk_size(length)):
+                received += len(chunk)
+                self._check_size(url, received, max_bytes)
+                BYTES_DOWNLOADED.labels(kind="text").inc(len(chunk))
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+
+    # -----------------------------
+    # Resumable download
+    # -----------------------------
+    def download(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        suffix: str = "",
+        max_bytes: int = settings.FETCH_MAX_MEDIA_BYTES,
+    ) -> str:
+        """
+        Download to a tracked temp file and return its path.
+        A dropped connection is resumed from the last byte written with a
+        Range request (or restarted if the server ignores ranges).
+        Call release(path) when done with the file.
+        """
+        headers = dict(headers or {})
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix="content-")
+        os.close(fd)
+        self._track(path)
+
+        written = 0
+        attempt = 0
+
+        try:
+            with time_stage("download"), open(path, "wb") as f:
+                while True:
+                    request_headers = dict(headers)
+                    if written:
+                        request_headers["Range"] = f"bytes={written}-"
+
+                    try:
+                        with self._open(url, request_headers) as response:
+                            if written and response.status_code != 206:
+                                # Server ignored the range: start over
+                                f.seek(0)
+                                f.truncate()
+                                written = 0
+
+                            length = self._content_length(response)
+                            if length is not None:
+                                self._check_size(url, written + length, max_bytes)
+
+                            for chunk in response.iter_content(
+                                chunk_size=adaptive_chunk_size(length)
+                            ):
+                                written += len(chunk)
+                                self._check_size(url, written, max_bytes)
+                                BYTES_DOWNLOADED.labels(kind="media").inc(len(chunk))
+                                f.write(chunk)
+                        return path
+
+                    except (
+                        requests.exceptions.ChunkedEncodingError,
+                        requests.exceptions.ConnectionError,
+                        requests.exceptions.Timeout,
+                    ) as e:
+                        attempt += 1
+                        if attempt > self.retries:
+                            raise
+                        logger.warning(
+                            f"Download of {url} interrupted at {written} bytes "
+                            f"({e}); resuming (attempt {attempt}/{self.retries})"
+                        )
+                        f.flush()
+                        time.sleep(min(2 ** attempt * 0.5, 10))
+        except Exception:
+            self.release(path)
+            raise
+
+    # -----------------------------
+    # Temp file lifecycle
+    # -----------------------------
+    def _track(self, path: str) -> None:
+        with self._temp_lock:
+            self._temp_files.add(path)
+
+    def owns(self, path: str) -> bool:
+        with self._temp_lock:
+            return path in self._temp_files
+
+    def rename(self, path: str, new_path: str) -> str:
+        """Rename a tracked temp file, keeping it tracked."""
+        os.replace(path, new_path)
+        with self._temp_lock:
+            self._temp_files.discard(path)
+            self._temp_files.add(new_path)
+        return new_path
+
+    def release(self, path: str) -> None:
+        """Delete a temp file created by download()."""
+        with self._temp_lock:
+            if path not in self._temp_files:
+                return
+            self._temp_files.discard(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove temp file {path}: {e}")
+
+    def release_all(self) -> None:
+        with self._temp_lock:
+            paths = list(self._temp_files)
+        for path in paths:
+            self.release(path)
+
+    def close(self) -> None:
+        self.release_all()
+        self.session.close()
+
+
+# -----------------------------
+# Shared process-wide fetcher
+# -----------------------------
+_lock = threading.Lock()
+_fetcher: Optional[ContentFetcher] = None
+
+
+def get_content_fetcher() -> ContentFetcher:
+    global _fetcher
+    with _lock:
+        if _fetcher is None:
+            _fetcher = ContentFetcher()
+            atexit.register(_fetcher.release_all)
+        return _fetcher
@@ -0,0 +1,358 @@
+"""
+Job Service
+-----------
+Runs long assessment generations in the background.
+
+Jobs live in a SQLite table under data/processed so status and results
+survive worker restarts. A thread pool executes AssessmentPipeline.run;
+per-stage progress is written back as the pipeline reports it, and
+cancellation is checked at every stage boundary and before each LLM
+call is sent.
+
+Several processes may share the table. Each job is leased by the
+process running it (owner + lease_expires); a heartbeat renews the
+leases of a process's jobs, and recover() only claims jobs whose lease
+has run out, so a restart never re-runs another live process's work.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core import settings
+from app.core.exceptions import JobCancelledError
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINAL_STATES = {COMPLETED, FAILED, CANCELLED}
+
+
+class JobStore:
+    """
+    Persistent job table.
+    """
+
+    def __init__(self, db_path: Path = settings.JOBS_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                owner TEXT,
+                lease_expires REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        # Tables created before leases were added
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_expires", "REAL")):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._db.commit()
+
+    def create(
+        self, payload: Dict[str, Any], owner: str, lease_seconds: float
+    ) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, status, stage, progress, payload, owner, "
+                "lease_expires, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id, QUEUED, QUEUED, "[]", json.dumps(payload),
+                    owner, now + lease_seconds, now, now,
+                ),
+            )
+            self._db.commit()
+        return job_id
+
+    def claim(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """
+        Take (or keep) the lease on an unfinished job. Atomic: succeeds only
+        if the job is unowned, already ours, or its lease has expired.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET owner = ?, lease_expires = ?, updated_at = ? "
+                "WHERE job_id = ? AND status IN (?, ?) "
+                "AND (owner IS NULL OR owner = ? OR lease_expires < ?)",
+                (owner, now + lease_seconds, now, job_id, QUEUED, RUNNING, owner, now),
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def renew_leases(self, owner: str, lease_seconds: float) -> int:
+        """Extend the lease of every unfinished job held by `owner`."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time() + lease_seconds, owner, QUEUED, RUNNING),
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"])
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def update(self, job_id: str, owner: Optional[str] = None, **fields: Any) -> bool:
+        """
+        Set fields on a job. With `owner`, only while that owner holds the
+        lease; returns False if the job was taken over meanwhile.
+        """
+        for name in ("progress", "result"):
+            if name in fields and fields[name] is not None:
+                fields[name] = json.dumps(fields[name])
+        fields["updated_at"] = time.time()
+
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        where, params = "job_id = ?", [job_id]
+        if owner is not None:
+            where += " AND owner = ?"
+            params.append(owner)
+
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET {columns} WHERE {where}",
+                (*fields.values(), *params),
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def append_progress(self, job_id: str, stage: str, details: Dict[str, Any]) -> None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT progress FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            progress = json.loads(row["progress"]) if row else []
+            progress.append({"stage": stage, "at": time.time(), **details})
+            self._db.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE job_id = ?",
+                (stage, json.dumps(progress), time.time(), job_id),
+            )
+            self._db.commit()
+
+    def request_cancel(self, job_id: str) -> None:
+        self.update(job_id, cancel_requested=1)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def unfinished(self) -> List[str]:
+        """Unfinished jobs nobody holds a live lease on."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id FROM jobs WHERE status IN (?, ?) "
+                "AND (owner IS NULL OR lease_expires IS NULL OR lease_expires < ?) "
+                "ORDER BY created_at",
+                (QUEUED, RUNNING, time.time()),
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+
+class JobService:
+    """
+    Submits pipeline runs to a worker pool and tracks them in a JobStore.
+    """
+
+    def __init__(
+        self,
+        pipeline_factory: Callable[[], Any],
+        store: Optional[JobStore] = None,
+        max_workers: int = settings.JOB_WORKERS,
+        lease_seconds: float = settings.JOB_LEASE_SECONDS,
+    ):
+        self.store = store or JobStore()
+        # Unique per process (and per service), recorded on the jobs it runs
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self._pipeline_factory = pipeline_factory
+        self._pipeline = None
+        self._pipeline_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="assessment-job"
+        )
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(
+            target=self._renew_leases, name="job-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+    def submit(self, payload: Dict[str, Any]) -> str:
+        job_id = self.store.create(payload, self.owner, self.lease_seconds)
+        self._executor.submit(self._run, job_id)
+        logger.info(f"Queued job {job_id}")
+        return job_id
+
+    def recover(self) -> int:
+        """
+        Re-queue unfinished jobs whose owner stopped renewing its lease
+        (a crashed or restarted process). Each is claimed atomically, so
+        two processes recovering at once never both take a job.
+        """
+        recovered = 0
+        for job_id in self.store.unfinished():
+            if not self.store.claim(job_id, self.owner, self.lease_seconds):
+                continue
+            self.store.update(job_id, owner=self.owner, status=QUEUED)
+            self._executor.submit(self._run, job_id)
+            recovered += 1
+        if recovered:
+            logger.info(f"Recovered {recovered} unfinished jobs")
+        return recovered
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job. Queued jobs never start; running jobs stop at the
+        next stage boundary, or before their next section/batch is sent
+        to the LLM, whichever comes first.
+        """
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINAL_STATES:
+            return job
+
+        self.store.request_cancel(job_id)
+        return self.store.get(job_id)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._stop.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _renew_leases(self) -> None:
+        # Renew well inside the lease so one slow write does not lose it
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.store.renew_leases(self.owner, self.lease_seconds)
+            except Exception as e:
+                logger.warning(f"Job lease renewal failed: {e}")
+
+    def _get_pipeline(self):
+        with self._pipeline_lock:
+            if self._pipeline is None:
+                self._pipeline = self._pipeline_factory()
+            return self._pipeline
+
+    def _run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINAL_STATES:
+            return
+
+        # Another process may have taken the job over (expired lease)
+        if not self.store.claim(job_id, self.owner, self.lease_seconds):
+            logger.info(f"Job {job_id} is leased by another process, skipping")
+            return
+
+        if job["cancel_requested"]:
+            self.store.update(job_id, owner=self.owner, status=CANCELLED, stage=CANCELLED)
+            return
+
+        self.store.update(
+            job_id, owner=self.owner, status=RUNNING, stage=RUNNING, progress=[]
+        )
+
+        def on_stage(stage: str, details: Dict[str, Any]) -> None:
+            # Heartbeat from the job itself, on top of the background renewal
+            if not self.store.claim(job_id, self.owner, self.lease_seconds):
+                raise JobCancelledError(f"Job {job_id} lost its lease after {stage}")
+            self.store.append_progress(job_id, stage, details)
+            if self.store.is_cancel_requested(job_id):
+                raise JobCancelledError(f"Job {job_id} cancelled after {stage}")
+
+        try:
+            result = self._get_pipeline().run(
+                job["payload"],
+                on_stage=on_stage,
+                should_cancel=lambda: self.store.is_cancel_requested(job_id),
+            )
+        except JobCancelledError as e:
+            logger.info(str(e))
+            self.store.update(job_id, owner=self.owner, status=CANCELLED, stage=CANCELLED)
+            return
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self.store.update(
+                job_id, owner=self.owner, status=FAILED, stage=FAILED, error=str(e)
+            )
+            return
+
+        if not self.store.update(
+            job_id, owner=self.owner, status=COMPLETED, stage=COMPLETED, result=result
+        ):
+            logger.warning(f"Job {job_id} lost its lease; result discarded")
+            return
+        logger.info(f"Job {job_id} completed")
+
+
+# -----------------------------
+# Shared process-wide service
+# -----------------------------
+_lock = threading.Lock()
+_service: Optional[JobService] = None
+
+
+def get_job_service() -> JobService:
+    global _service
+    with _lock:
+        if _service is None:
+            from app.services.assessment_pipeline_service import get_pipeline
+
+            _service = JobService(pipeline_factory=get_pipeline)
+        return _service
+
+
+def shutdown_job_service() -> None:
+    global _service
+    with _lock:
+        service, _service = _service, None
+    if service is not None:
+        service.shutdown()
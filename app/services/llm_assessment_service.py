@@ -2,179 +2,854 @@
 LLM Assessment Service
 ---------------------
 Uses Ollama to generate assessment questions from cleaned transcript sections.
-Strict JSON-only output. No fallbacks.
+Output must be JSON (schema-constrained when the backend supports it);
+invalid sections are retried in smaller calls, and invalid or duplicate
+questions are regenerated, rather than failing the request.
 """
 
-import json
-import subprocess
+import contextvars
 import logging
-from typing import List
-
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from app.core import settings
+from app.core.exceptions import JobCancelledError
+from app.core.metrics import (
+    INVALID_QUESTIONS,
+    LLM_EARLY_STOPS,
+    LLM_FAILURES,
+    LLM_PARTIAL_OUTPUTS,
+    QUESTIONS_REGENERATED,
+    QUESTIONS_SALVAGED,
+    time_stage,
+)
 from app.models.section import Section
-from app.models.question import Question
+from app.models.question import Question, questions_json_schema, sections_json_schema
+from app.prompts import RenderedPrompt, get_prompt
+from app.services.llm_client import GenerationOptions, LLMBackend, get_llm_client
+from app.services.llm_cache import LLMResponseCache, get_llm_cache
+from app.services.validation_service import (
+    DUPLICATE,
+    DuplicateIndex,
+    QuestionValidator,
+    duplicate_text,
+)
+from app.utils.json_utils import (
+    QuestionStreamParser,
+    parse_questions_payload,
+    parse_sections_payload,
+    safe_json_loads,
+)
+from app.utils.text_utils import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+# Process-wide cap on in-flight LLM calls, shared by all requests
+_llm_slots = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Templates used by the service, see app/prompts
+PROMPT_NAMES = ("section", "section_batch", "regenerate")
+
 
 class LLMAssessmentService:
-    def __init__(self, model_name: str = "qwen3:0.6b"):
-        self.model_name = model_name
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        llm_client: Optional[LLMBackend] = None,
+        options: Optional[GenerationOptions] = None,
+        cache: Optional[LLMResponseCache] = None,
+        validator: Optional[QuestionValidator] = None,
+    ):
+        if llm_client is None:
+            # Shared per model, so instances never own unclosed pools
+            llm_client = get_llm_client(model_name)
+
+        self.llm = llm_client
+        self.model_name = llm_client.model_name
+        self.options = options or GenerationOptions()
+        self.cache = cache if cache is not None else get_llm_cache()
+        self.validator = validator or QuestionValidator()
+        # Resolved once so a service instance uses one set of versions
+        self.prompts = {name: get_prompt(name) for name in PROMPT_NAMES}
+        # Schema-constrained decoding, when the backend can do it
+        self.structured = settings.LLM_STRUCTURED_OUTPUT and getattr(
+            self.llm, "supports_format", False
+        )
 
     def generate_questions(
-        self, sections: List[Section], questions_per_section: int = 1
+        self,
+        sections: List[Section],
+        questions_per_section: int = 1,
+        max_concurrency: Optional[int] = None,
+        batch: bool = False,
+        use_cache: bool = True,
+        should_cancel: Optional[Callable[[], bool]] = None,
     ) -> List[Question]:
         """
         Generate assessment questions using LLM.
-        Skips sections that fail or return invalid output.
+        Invalid and near-duplicate questions are dropped and only the
+        missing ones are asked for again (see _complete), so each section
+        ends up with `questions_per_section` questions whenever the model
+        manages it within VALIDATION_REGEN_ROUNDS.
+        With `batch=True` several sections share one prompt.
+        With `use_cache=False` cached answers are bypassed (and refreshed).
+        `should_cancel` is checked before each LLM call is submitted; once
+        it returns True the remaining calls are dropped and
+        JobCancelledError is raised.
         """
         all_questions: List[Question] = []
 
+        if batch:
+            per_section = self.generate_questions_batched(
+                sections,
+                questions_per_section,
+                max_concurrency=max_concurrency,
+                use_cache=use_cache,
+                should_cancel=should_cancel,
+            )
+        else:
+            per_section = self.generate_questions_by_section(
+                sections,
+                questions_per_section,
+                max_concurrency=max_concurrency,
+                use_cache=use_cache,
+                should_cancel=should_cancel,
+            )
+
+        per_section = self._complete(
+            sections,
+            per_section,
+            questions_per_section,
+            max_concurrency,
+            should_cancel=should_cancel,
+        )
+
+        for questions in per_section:
+            all_questions.extend(questions)
+
+        return all_questions
+
+    def generate_questions_by_section(
+        self,
+        sections: List[Section],
+        questions_per_section: int = 1,
+        max_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        should_cancel: Optional[Callable[[], bool]] = None,
+    ) -> List[List[Question]]:
+        """
+        Generate questions for every section concurrently.
+
+        At most `max_concurrency` sections of this request are in flight
+        (default LLM_REQUEST_CONCURRENCY); all requests together are capped
+        by LLM_MAX_CONCURRENCY. Results are returned in section order and a
+        failing section yields an empty list instead of aborting the others.
+        """
+        return self._map_concurrent(
+            lambda section: self._safe_generate_for_section(
+                section, questions_per_section, use_cache
+            ),
+            sections,
+            max_concurrency,
+            should_cancel,
+        )
+
+    def generate_questions_batched(
+        self,
+        sections: List[Section],
+        questions_per_section: int = 1,
+        token_budget: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        should_cancel: Optional[Callable[[], bool]] = None,
+    ) -> List[List[Question]]:
+        """
+        Generate questions with several sections packed into one prompt.
+
+        Sections are packed greedily up to `token_budget` estimated content
+        tokens (default LLM_BATCH_TOKEN_BUDGET). The model answers with a
+        JSON object keyed by section_id; any section missing or invalid in
+        that answer falls back to a single-section call.
+        Cached sections are served directly and never packed.
+        """
+        by_section: Dict[str, List[Question]] = {}
+        pending: List[Section] = []
+
         for section in sections:
-            try:
-                prompt = self._build_prompt(section, questions_per_section)
-                response = self._call_llm(prompt)
-                questions = self._parse_response(response, section.section_id)
+            cached = None
+            if use_cache:
+                cached = self._cache_lookup(section, questions_per_section)
+
+            if cached:
+                by_section[section.section_id] = cached
+            else:
+                pending.append(section)
+
+        batches = self._plan_batches(
+            pending, token_budget or settings.LLM_BATCH_TOKEN_BUDGET
+        )
+        logger.info(f"Packed {len(pending)} sections into {len(batches)} prompts")
+
+        batch_results = self._map_concurrent(
+            lambda batch: self._generate_for_batch(
+                batch, questions_per_section, max_concurrency, should_cancel
+            ),
+            batches,
+            max_concurrency,
+            should_cancel,
+        )
+
+        for result in batch_results:
+            by_section.update(result)
+
+        return [by_section.get(section.section_id, []) for section in sections]
+
+    def iter_questions(
+        self,
+        sections: List[Section],
+        questions_per_section: int = 1,
+        max_concurrency: Optional[int] = None,
+        batch: bool = False,
+        use_cache: bool = True,
+    ) -> Iterator[Tuple[Section, List[Question]]]:
+        """
+        Yield (section, questions) pairs as soon as each section finishes,
+        in completion order. Same options as generate_questions. Closing
+        the iterator early cancels sections that have not started yet.
+        """
+        # Duplicates are checked against every section yielded so far
+        index = self.validator.new_index()
+        for section, questions in self._iter_generated(
+            sections, questions_per_section, max_concurrency, batch, use_cache
+        ):
+            completed = self._complete(
+                [section], [questions], questions_per_section, index=index
+            )
+            yield section, completed[0]
+
+    def _iter_generated(
+        self,
+        sections: List[Section],
+        questions_per_section: int,
+        max_concurrency: Optional[int],
+        batch: bool,
+        use_cache: bool,
+    ) -> Iterator[Tuple[Section, List[Question]]]:
+        if not batch:
+            yield from self._iter_concurrent(
+                lambda section: self._safe_generate_for_section(
+                    section, questions_per_section, use_cache
+                ),
+                sections,
+                max_concurrency,
+            )
+            return
+
+        pending: List[Section] = []
+        for section in sections:
+            cached = None
+            if use_cache:
+                cached = self._cache_lookup(section, questions_per_section)
+
+            if cached:
+                yield section, cached
+            else:
+                pending.append(section)
+
+        batches = self._plan_batches(pending, settings.LLM_BATCH_TOKEN_BUDGET)
+        for batch_sections, result in self._iter_concurrent(
+            lambda batch: self._generate_for_batch(
+                batch, questions_per_section, max_concurrency
+            ),
+            batches,
+            max_concurrency,
+        ):
+            for section in batch_sections:
+                yield section, result.get(section.section_id, [])
+
+    def _iter_concurrent(
+        self,
+        fn: Callable[[T], R],
+        items: List[T],
+        max_concurrency: Optional[int] = None,
+    ) -> Iterator[Tuple[T, R]]:
+        limit = max(1, max_concurrency or settings.LLM_REQUEST_CONCURRENCY)
+
+        if limit == 1 or len(items) <= 1:
+            for item in items:
+                yield item, fn(item)
+            return
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(limit, len(items)), thread_name_prefix="llm-section"
+        )
+        try:
+            # Each task runs in a copy of the caller's context (stage timings)
+            futures = {
+                executor.submit(contextvars.copy_context().run, fn, item): item
+                for item in items
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _map_concurrent(
+        self,
+        fn: Callable[[T], R],
+        items: List[T],
+        max_concurrency: Optional[int] = None,
+        should_cancel: Optional[Callable[[], bool]] = None,
+    ) -> List[R]:
+        limit = max(1, max_concurrency or settings.LLM_REQUEST_CONCURRENCY)
+
+        def checked(item: T) -> R:
+            # Runs as each item is started, so queued items see a cancel
+            if should_cancel is not None and should_cancel():
+                raise JobCancelledError("Generation cancelled")
+            return fn(item)
+
+        if limit == 1 or len(items) <= 1:
+            return [checked(item) for item in items]
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(limit, len(items)), thread_name_prefix="llm-section"
+        )
+        try:
+            futures = [
+                executor.submit(contextvars.copy_context().run, checked, item)
+                for item in items
+            ]
+            return [future.result() for future in futures]
+        finally:
+            # On cancel or error, queued items are dropped instead of sent
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _safe_generate_for_section(
+        self, section: Section, n: int, use_cache: bool = False
+    ) -> List[Question]:
+        if use_cache:
+            cached = self._cache_lookup(section, n)
+            if cached:
+                return cached
+
+        try:
+            questions = self._generate_for_section(section, n)
+
+            if not questions:
+                logger.warning(
+                    f"No valid questions generated for section {section.section_id}"
+                )
+
+            return questions
+
+        except Exception as e:
+            logger.error(f"Skipping section {section.section_id} due to error: {e}")
+            return []
+
+    def _generate_for_section(self, section: Section, n: int) -> List[Question]:
+        prompt = self._build_prompt(section, n)
+        response = self._call_llm(prompt, n)
+        with time_stage("parse"):
+            questions = self._parse_response(
+                response, section.section_id, prompt.version
+            )
+        self._cache_store(section, n, questions)
+        return questions
 
-                if not questions:
+    def _generate_for_batch(
+        self,
+        batch: List[Section],
+        n: int,
+        max_concurrency: Optional[int] = None,
+        should_cancel: Optional[Callable[[], bool]] = None,
+    ) -> Dict[str, List[Question]]:
+        if len(batch) == 1:
+            section = batch[0]
+            return {section.section_id: self._safe_generate_for_section(section, n)}
+
+        parts: Dict[str, dict] = {}
+        section_ids = [section.section_id for section in batch]
+        try:
+            prompt = self._build_batch_prompt(batch, n)
+            options = self._with_caps(
+                self._with_schema(self.options, sections_json_schema(section_ids, n)),
+                n * len(batch),
+            )
+            with _llm_slots, time_stage("llm_call"):
+                raw_output = self.llm.generate(
+                    prompt.prompt, options=options, system=prompt.system
+                )
+            with time_stage("parse"):
+                parts = self._split_batch_response(
+                    raw_output, section_ids, structured=options.format is not None
+                )
+        except Exception as e:
+            LLM_FAILURES.labels(kind="batch").inc()
+            logger.warning(f"Batched call failed, falling back to single calls: {e}")
+
+        results: Dict[str, List[Question]] = {}
+        fallbacks: List[Section] = []
+        for section in batch:
+            questions: List[Question] = []
+            part = parts.get(section.section_id)
+
+            if part is not None:
+                try:
+                    with time_stage("parse"):
+                        self._validate_questions_payload(part)
+                        questions = self._parse_response(
+                            part, section.section_id, prompt.version
+                        )
+                    self._cache_store(section, n, questions)
+                except ValueError as e:
                     logger.warning(
-                        f"No valid questions generated for section {section.section_id}"
+                        f"Invalid batched output for section {section.section_id}: {e}"
                     )
-                    continue
 
-                all_questions.extend(questions)
+            if questions:
+                results[section.section_id] = questions
+            else:
+                logger.info(f"Falling back to single call for {section.section_id}")
+                fallbacks.append(section)
+
+        # Single calls for what the batch missed run concurrently, so a
+        # failed batch of k sections is not k sequential round-trips
+        retried = self._map_concurrent(
+            lambda section: self._safe_generate_for_section(section, n),
+            fallbacks,
+            max_concurrency,
+            should_cancel,
+        )
+        for section, questions in zip(fallbacks, retried):
+            results[section.section_id] = questions
+
+        return {section.section_id: results[section.section_id] for section in batch}
+
+    def _plan_batches(
+        self, sections: List[Section], token_budget: int
+    ) -> List[List[Section]]:
+        """
+        Greedily pack consecutive sections until the content token budget
+        or LLM_BATCH_MAX_SECTIONS is reached. An oversized section gets a
+        batch of its own.
+        """
+        batches: List[List[Section]] = []
+        current: List[Section] = []
+        used = 0
 
-            except Exception as e:
-                logger.error(f"Skipping section {section.section_id} due to error: {e}")
-                continue
+        for section in sections:
+            cost = estimate_tokens(section.content) + estimate_tokens(section.title)
 
-        return all_questions
+            if current and (
+                used + cost > token_budget
+                or len(current) >= settings.LLM_BATCH_MAX_SECTIONS
+            ):
+                batches.append(current)
+                current, used = [], 0
 
-    # -----------------------------
-    # Prompt Builder
-    # -----------------------------
-    def _build_prompt(self, section: Section, n: int) -> str:
-        return f"""
-You are an assessment generator.
-
-SECTION ID: {section.section_id}
-SECTION TITLE: {section.title}
-SECTION CONTENT:
-{section.content}
-
-TASK:
-Generate exactly {n} multiple-choice questions.
-
-STRICT RULES (MANDATORY):
-- Use ONLY the section content
-- Exactly 4 options per question (A, B, C, D)
-- Only ONE correct answer
-- All incorrect options must be clearly wrong
-- No vague or generic wording
-- No duplicate options
-- No external knowledge
-- NO explanations outside JSON
-- NO markdown
-- NO commentary
-- NO text before or after JSON
-
-OUTPUT FORMAT (JSON ONLY — NO OTHER TEXT):
-{{
-  "questions": [
-    {{
-      "question": "...",
-      "options": ["A", "B", "C", "D"],
-      "correct_answer": "A",
-      "explanation": "..."
-    }}
-  ]
-}}
-"""
+            current.append(section)
+            used += cost
+
+        if current:
+            batches.append(current)
+
+        return batches
 
     # -----------------------------
-    # Ollama Call
+    # Validation + targeted regeneration
     # -----------------------------
-    def _call_llm(self, prompt: str) -> dict:
-        try:
-            process = subprocess.Popen(
-                ["ollama", "run", self.model_name],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-
-            stdout_bytes, stderr_bytes = process.communicate(
-                input=prompt.encode("utf-8")
+    def _complete(
+        self,
+        sections: List[Section],
+        per_section: List[List[Question]],
+        n: int,
+        max_concurrency: Optional[int] = None,
+        index: Optional[DuplicateIndex] = None,
+        should_cancel: Optional[Callable[[], bool]] = None,
+    ) -> List[List[Question]]:
+        """
+        Drop near-duplicates across sections, trim each section to `n`
+        and ask again only for what is missing, with a narrower prompt
+        listing what to avoid. Question ids are renumbered per section.
+        """
+        index = index or self.validator.new_index()
+        accepted: List[List[Question]] = []
+        avoid: List[List[str]] = []
+
+        for questions in per_section:
+            kept, dropped = self._accept(questions, index, n)
+            accepted.append(kept)
+            avoid.append([q.question for q in kept + dropped])
+
+        regenerated = set()
+        for _ in range(settings.VALIDATION_REGEN_ROUNDS):
+            short = [i for i, kept in enumerate(accepted) if len(kept) < n]
+            if not short:
+                break
+
+            QUESTIONS_REGENERATED.inc(sum(n - len(accepted[i]) for i in short))
+            extra = self._map_concurrent(
+                lambda i: self._safe_regenerate(
+                    sections[i], n - len(accepted[i]), avoid[i]
+                ),
+                short,
+                max_concurrency,
+                should_cancel,
             )
 
-            if process.returncode != 0:
-                raise RuntimeError(stderr_bytes.decode("utf-8", errors="ignore"))
+            for i, questions in zip(short, extra):
+                kept, dropped = self._accept(questions, index, n - len(accepted[i]))
+                accepted[i].extend(kept)
+                avoid[i].extend(q.question for q in kept + dropped)
+                regenerated.add(i)
+
+        for i, (section, questions) in enumerate(zip(sections, accepted)):
+            for idx, q in enumerate(questions, start=1):
+                q.question_id = f"{section.section_id}-Q{idx}"
+            # Cache the topped-up set so a cache hit needs no regeneration
+            if i in regenerated:
+                self._cache_store(section, n, questions)
+            if len(questions) < n:
+                logger.warning(
+                    f"Section {section.section_id} has {len(questions)}/{n} "
+                    f"valid questions after regeneration"
+                )
 
-            raw_output = stdout_bytes.decode("utf-8", errors="ignore")
+        return accepted
+
+    def _accept(
+        self, questions: List[Question], index: DuplicateIndex, limit: int
+    ) -> Tuple[List[Question], List[Question]]:
+        """Returns (kept, near-duplicates), keeping at most `limit`."""
+        kept: List[Question] = []
+        dropped: List[Question] = []
+
+        for q in questions:
+            if len(kept) >= limit:
+                break
+            if index.add(duplicate_text(q)):
+                kept.append(q)
+            else:
+                INVALID_QUESTIONS.labels(reason=DUPLICATE).inc()
+                logger.info(f"Near-duplicate question dropped in {q.section_id}")
+                dropped.append(q)
+
+        return kept, dropped
+
+    def _safe_regenerate(
+        self, section: Section, missing: int, avoid: List[str]
+    ) -> List[Question]:
+        try:
+            prompt = self._build_regen_prompt(section, missing, avoid)
+            response = self._call_llm(prompt, missing)
+            with time_stage("parse"):
+                return self._parse_response(
+                    response, section.section_id, prompt.version
+                )
+        except Exception as e:
+            logger.error(f"Regeneration failed for section {section.section_id}: {e}")
+            return []
 
-            return self._extract_and_validate_json(raw_output)
+    # -----------------------------
+    # Response Cache
+    # -----------------------------
+    def _cache_key(self, section: Section, n: int) -> str:
+        return LLMResponseCache.make_key(
+            model_name=self.model_name,
+            prompt_version=self._prompt_versions(),
+            content=f"{section.title}\n{section.content}",
+            num_questions=n,
+            options=self.options.model_options(),
+        )
+
+    def _prompt_versions(self) -> str:
+        # Any template change invalidates: batched answers are cached too
+        return ",".join(self.prompts[name].id for name in PROMPT_NAMES)
+
+    def _cache_lookup(self, section: Section, n: int) -> Optional[List[Question]]:
+        if self.cache is None:
+            return None
 
+        try:
+            cached = self.cache.get(self._cache_key(section, n))
         except Exception as e:
-            raise RuntimeError(f"Ollama call failed: {e}")
+            logger.warning(f"LLM cache lookup failed: {e}")
+            return None
+
+        if not cached:
+            return None
+
+        logger.info(f"LLM cache hit for section {section.section_id}")
+        return self._parse_response({"questions": cached}, section.section_id)
+
+    def _cache_store(self, section: Section, n: int, questions: List[Question]) -> None:
+        if self.cache is None or not questions:
+            return
+
+        value = [
+            {
+                "question": q.question,
+                "options": q.options,
+                "correct_answer": q.correct_answer,
+                "explanation": q.explanation,
+                "prompt_version": q.prompt_version,
+            }
+            for q in questions
+        ]
+        try:
+            self.cache.set(self._cache_key(section, n), value)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
 
     # -----------------------------
-    # JSON Extraction + Validation
+    # Prompt Builder
     # -----------------------------
-    def _extract_and_validate_json(self, text: str) -> dict:
-        start = text.find("{")
-        end = text.rfind("}")
+    def _build_prompt(self, section: Section, n: int) -> RenderedPrompt:
+        return self.prompts["section"].render(
+            section_id=section.section_id,
+            title=section.title,
+            content=section.content,
+            n=n,
+        )
+
+    def _build_batch_prompt(self, sections: List[Section], n: int) -> RenderedPrompt:
+        blocks = "\n\n".join(
+            f"SECTION ID: {section.section_id}\n"
+            f"SECTION TITLE: {section.title}\n"
+            f"SECTION CONTENT:\n{section.content}"
+            for section in sections
+        )
+        ids = ", ".join(f'"{section.section_id}"' for section in sections)
+        return self.prompts["section_batch"].render(
+            blocks=blocks, ids=ids, first_id=sections[0].section_id, n=n
+        )
+
+    def _build_regen_prompt(
+        self, section: Section, n: int, avoid: List[str]
+    ) -> RenderedPrompt:
+        existing = "\n".join(f"- {question}" for question in avoid) or "- (none)"
+        return self.prompts["regenerate"].render(
+            section_id=section.section_id,
+            title=section.title,
+            content=section.content,
+            existing=existing,
+            n=n,
+        )
+
+    def warm_up(self) -> None:
+        """
+        Load the model and evaluate each template's static prefix once, so
+        the server keeps it in the prompt cache for LLM_KEEP_ALIVE and the
+        first real calls only pay for their content.
+        """
+        options = replace(self.options, num_predict=1, format=None)
+        for template in self.prompts.values():
+            try:
+                with _llm_slots:
+                    self.llm.generate(
+                        template.prefix, options=options, system=template.system.strip()
+                    )
+            except Exception as e:
+                logger.warning(f"Prompt warm-up failed for {template.id}: {e}")
 
-        if start == -1 or end == -1 or end <= start:
-            raise ValueError("No valid JSON object found in LLM output")
+    # -----------------------------
+    # Ollama Call
+    # -----------------------------
+    def _call_llm(
+        self,
+        prompt: RenderedPrompt,
+        n: int,
+        options: Optional[GenerationOptions] = None,
+    ) -> dict:
+        """
+        Ask for `n` questions; returns the {"questions": [...]} payload.
+        """
+        options = self._with_caps(
+            self._with_schema(options or self.options, questions_json_schema(n)), n
+        )
+        # Single-section calls are short and uniform enough to hedge; only
+        # streams can be, as the losing attempt must be cancellable
+        if settings.LLM_HEDGING and settings.LLM_STREAMING and options.hedge is None:
+            options = replace(options, hedge=True)
+        if settings.LLM_STREAMING:
+            return self._call_llm_streaming(prompt, n, options)
 
-        json_str = text[start : end + 1]
+        try:
+            with _llm_slots, time_stage("llm_call"):
+                raw_output = self.llm.generate(
+                    prompt.prompt, options=options, system=prompt.system
+                )
+        except Exception as e:
+            LLM_FAILURES.labels(kind="error").inc()
+            raise RuntimeError(f"Ollama call failed: {e}")
 
-        data = json.loads(json_str)
+        try:
+            with time_stage("parse"):
+                return self._extract_and_validate_json(
+                    raw_output, structured=options.format is not None
+                )
+        except Exception as e:
+            LLM_FAILURES.labels(kind="invalid_output").inc()
+            raise RuntimeError(f"Ollama call failed: {e}")
 
-        # HARD validation
-        if "questions" not in data or not isinstance(data["questions"], list):
-            raise ValueError("Invalid JSON: 'questions' must be a list")
+    def _call_llm_streaming(
+        self, prompt: RenderedPrompt, n: int, options: GenerationOptions
+    ) -> dict:
+        """
+        Parse questions as tokens arrive and stop the generation once `n`
+        valid ones are in or the JSON object closes, so trailing and
+        runaway tokens are never generated.
+        """
+        parser = QuestionStreamParser()
+        questions: List[dict] = []
+        valid = 0
 
-        for q in data["questions"]:
-            for field in ("question", "options", "correct_answer", "explanation"):
-                if field not in q:
-                    raise ValueError(f"Missing field '{field}' in question")
+        try:
+            with _llm_slots, time_stage("llm_call"):
+                stream = self.llm.generate_stream(
+                    prompt.prompt, options=options, system=prompt.system
+                )
+                try:
+                    for piece in stream:
+                        for q in parser.feed(piece):
+                            questions.append(q)
+                            if self.validator.validate(q)[0] is not None:
+                                valid += 1
+                        if valid >= n or parser.closed:
+                            break
+                finally:
+                    # Closing the stream cancels the rest of the generation
+                    stream.close()
+        except Exception as e:
+            LLM_FAILURES.labels(kind="error").inc()
+            raise RuntimeError(f"Ollama call failed: {e}")
 
-            if not isinstance(q["options"], list) or len(q["options"]) != 4:
-                raise ValueError("Each question must have exactly 4 options")
+        if not parser.closed:
+            if valid >= n:
+                LLM_EARLY_STOPS.inc()
+            elif questions:
+                # Ran out (num_predict cap) or broke off mid-object
+                self._record_partial("section", len(questions))
+            else:
+                LLM_FAILURES.labels(kind="invalid_output").inc()
+                raise RuntimeError("Ollama call failed: no questions in streamed output")
+
+        return {"questions": questions}
+
+    def _with_caps(self, options: GenerationOptions, n: int) -> GenerationOptions:
+        """Default num_predict to the size of `n` answers; add stop sequences."""
+        changes = {}
+        if options.num_predict is None:
+            changes["num_predict"] = min(
+                settings.LLM_NUM_PREDICT_MAX,
+                settings.LLM_NUM_PREDICT_BASE + n * settings.LLM_NUM_PREDICT_PER_QUESTION,
+            )
+        if settings.LLM_STOP_SEQUENCES and options.stop is None:
+            changes["stop"] = list(settings.LLM_STOP_SEQUENCES)
+        return replace(options, **changes) if changes else options
 
+    # -----------------------------
+    # JSON Extraction + Validation
+    # -----------------------------
+    def _with_schema(
+        self, options: GenerationOptions, schema: Optional[dict]
+    ) -> GenerationOptions:
+        if not self.structured or schema is None or options.format is not None:
+            return options
+        return replace(options, format=schema)
+
+    def _extract_and_validate_json(self, text: str, structured: bool = False) -> dict:
+        """
+        Tolerant parse: reasoning blocks, code fences and chatter are
+        stripped, and if the object is still broken every question that
+        decodes on its own is salvaged.
+        Schema-constrained (`structured`) output is plain JSON in the
+        expected shape, so it is loaded directly first.
+        """
+        if structured:
+            data = safe_json_loads(text)
+            if isinstance(data, dict) and isinstance(data.get("questions"), list):
+                return data
+            LLM_FAILURES.labels(kind="schema_violation").inc()
+
+        data, complete = parse_questions_payload(text)
+        if not complete:
+            if not data["questions"]:
+                raise ValueError("No valid JSON object found in LLM output")
+            self._record_partial("section", len(data["questions"]))
+        self._validate_questions_payload(data)
         return data
 
-    def _is_valid_question(self, q: dict) -> bool:
-        try:
-            if not q["question"].strip():
-                return False
-
-            options = q["options"]
-            if not isinstance(options, list) or len(options) != 4:
-                return False
+    def _split_batch_response(
+        self, text: str, section_ids: List[str], structured: bool = False
+    ) -> Dict[str, dict]:
+        """
+        Split a batched response into per-section {"questions": [...]} parts.
+        Accepts both {"sections": {id: ...}} and a bare {id: ...} mapping;
+        a broken object is salvaged section by section.
+        """
+        data = safe_json_loads(text) if structured else None
+        if isinstance(data, dict) and isinstance(data.get("sections"), dict):
+            sections, complete = data["sections"], True
+        else:
+            if structured:
+                LLM_FAILURES.labels(kind="schema_violation").inc()
+            sections, complete = parse_sections_payload(text, section_ids)
+
+        if not complete:
+            if not sections:
+                raise ValueError("No valid JSON object found in LLM output")
+            self._record_partial(
+                "batch",
+                sum(len(part["questions"]) for part in sections.values()),
+            )
 
-            if len(set(options)) != 4:
-                return False
+        parts: Dict[str, dict] = {}
+        for section_id, part in sections.items():
+            if isinstance(part, list):
+                part = {"questions": part}
+            if isinstance(part, dict):
+                parts[str(section_id)] = part
 
-            if q["correct_answer"] not in ["A", "B", "C", "D"]:
-                return False
+        return parts
 
-            if not q["explanation"].strip():
-                return False
+    @staticmethod
+    def _record_partial(kind: str, salvaged: int) -> None:
+        LLM_PARTIAL_OUTPUTS.labels(kind=kind).inc()
+        QUESTIONS_SALVAGED.inc(salvaged)
+        logger.warning(f"Malformed {kind} output; salvaged {salvaged} questions")
 
-            return True
-        except Exception:
-            return False
+    def _validate_questions_payload(self, data: dict) -> None:
+        # HARD validation of the envelope; each question is checked by
+        # the validator in _parse_response
+        if "questions" not in data or not isinstance(data["questions"], list):
+            raise ValueError("Invalid JSON: 'questions' must be a list")
 
     # -----------------------------
     # Response Parser
     # -----------------------------
-    def _parse_response(self, data: dict, section_id: str) -> List[Question]:
+    def _parse_response(
+        self, data: dict, section_id: str, prompt_version: Optional[str] = None
+    ) -> List[Question]:
+        """
+        Validated questions from a payload. `prompt_version` is the template
+        that produced them; cached questions carry their own.
+        """
         questions: List[Question] = []
 
-        for idx, q in enumerate(data.get("questions", []), start=1):
-            if not self._is_valid_question(q):
-                logger.warning(f"Invalid question skipped in section {section_id}")
+        for idx, raw in enumerate(data.get("questions", []), start=1):
+            q, reason = self.validator.validate(raw)
+            if q is None:
+                INVALID_QUESTIONS.labels(reason=reason).inc()
+                logger.warning(
+                    f"Invalid question skipped in section {section_id} ({reason})"
+                )
                 continue
 
             questions.append(
@@ -186,6 +861,7 @@ OUTPUT FORMAT (JSON ONLY — NO OTHER TEXT):
                     options=q["options"],
                     correct_answer=q["correct_answer"],
                     explanation=q["explanation"],
+                    prompt_version=raw.get("prompt_version") or prompt_version,
                 )
             )
 
@@ -0,0 +1,223 @@
+"""
+LLM Response Cache
+------------------
+Content-addressed cache for generated questions.
+
+Two tiers:
+    - bounded in-memory LRU (per process)
+    - persistent SQLite file under data/processed (shared across restarts)
+
+Keys are a SHA-256 of (model, prompt version, section content,
+question count, generation options), so identical resubmissions hit.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        db_path: Path = settings.LLM_CACHE_PATH,
+        max_memory_entries: int = settings.LLM_CACHE_MEMORY_ENTRIES,
+        max_disk_bytes: int = settings.LLM_CACHE_MAX_DISK_BYTES,
+        ttl_seconds: int = settings.LLM_CACHE_TTL_SECONDS,
+    ):
+        self.db_path = Path(db_path)
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+        }
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)"
+        )
+        self._db.commit()
+
+    # -----------------------------
+    # Key
+    # -----------------------------
+    @staticmethod
+    def make_key(
+        model_name: str,
+        prompt_version: str,
+        content: str,
+        num_questions: int,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        material = json.dumps(
+            {
+                "model": model_name,
+                "prompt_version": prompt_version,
+                "content": content,
+                "n": num_questions,
+                "options": options or {},
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    # -----------------------------
+    # Lookup / store
+    # -----------------------------
+    def get(self, key: str) -> Optional[List[dict]]:
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+
+            raw, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                self._counters["misses"] += 1
+                return None
+
+            self._db.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+
+            value = json.loads(raw)
+            self._remember(key, created_at, value)
+            self._counters["disk_hits"] += 1
+            return value
+
+    def set(self, key: str, value: List[dict]) -> None:
+        now = time.time()
+        raw = json.dumps(value, ensure_ascii=False)
+
+        with self._lock:
+            self._remember(key, now, value)
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, raw, len(raw), now, now),
+            )
+            self._counters["writes"] += 1
+            self._evict_disk(now)
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": entries,
+                "disk_bytes": size,
+            }
+
+    # -----------------------------
+    # Eviction (call with lock held)
+    # -----------------------------
+    def _remember(self, key: str, created_at: float, value: List[dict]) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        expired = self._db.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        self._counters["evictions"] += max(expired, 0)
+
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+
+        # Drop least recently used rows until we are back under the budget
+        while total > self.max_disk_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM llm_cache ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._memory.pop(key, None)
+                self._counters["evictions"] += 1
+                total -= size
+                if total <= self.max_disk_bytes:
+                    break
+
+
+# -----------------------------
+# Shared process-wide cache
+# -----------------------------
+_lock = threading.Lock()
+_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Return the shared cache, or None when LLM_CACHE_ENABLED is false."""
+    global _cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    with _lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+            logger.info(f"LLM response cache at {_cache.db_path}")
+        return _cache
@@ -0,0 +1,415 @@
+"""
+LLM Client
+----------
+Pluggable LLM backend layer.
+
+Talks to the Ollama HTTP API (/api/generate, /api/chat) over a persistent
+keep-alive connection pool instead of spawning `ollama run` per call.
+Sync and async clients share the same payload building.
+"""
+
+import json
+import logging
+import socket
+import threading
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+import httpx
+
+from app.core import settings
+from app.core.exceptions import LLMBackendError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GenerationOptions:
+    """
+    Per-call generation options.
+    `timeout`, `keep_alive`, `format` and `hedge` are request-level,
+    everything else is forwarded to Ollama as model options. `format` is
+    "json" or a JSON schema the output is constrained to (structured
+    outputs); `hedge` lets the router duplicate a slow stream.
+    """
+    temperature: Optional[float] = None
+    top_p: Optional[float] = None
+    num_predict: Optional[int] = None
+    num_ctx: Optional[int] = None
+    stop: Optional[List[str]] = None
+    seed: Optional[int] = None
+    timeout: Optional[float] = None
+    keep_alive: Optional[str] = None
+    format: Optional[Union[str, Dict[str, Any]]] = None
+    hedge: Optional[bool] = None
+
+    def model_options(self) -> Dict[str, Any]:
+        options = asdict(self)
+        options.pop("timeout")
+        options.pop("keep_alive")
+        options.pop("format")
+        options.pop("hedge")
+        return {k: v for k, v in options.items() if v is not None}
+
+
+# Called with a function that aborts the open request from any thread
+AbortHook = Callable[[Callable[[], None]], None]
+
+
+class LLMBackend:
+    """
+    Interface every LLM backend implements.
+    """
+
+    model_name: str
+    # True if GenerationOptions.format (schema-constrained decoding) is honoured
+    supports_format: bool = False
+
+    def generate(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions] = None,
+        system: Optional[str] = None,
+    ) -> str:
+        raise NotImplementedError
+
+    def generate_stream(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions] = None,
+        system: Optional[str] = None,
+        on_open: Optional[AbortHook] = None,
+    ) -> Iterator[str]:
+        """
+        Yield the output in pieces as it is generated. Closing the
+        iterator early should stop generation. Backends without
+        streaming yield the whole output at once.
+
+        If the backend can abort a request from another thread (even
+        while a read is blocked, where closing the iterator cannot), it
+        passes an abort function to `on_open` as the request starts;
+        an aborted stream raises LLMBackendError.
+        """
+        yield self.generate(prompt, options=options, system=system)
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[GenerationOptions] = None,
+    ) -> str:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class _OllamaPayloadMixin:
+    """
+    Request building shared by the sync and async Ollama clients.
+    """
+
+    host: str
+    model_name: str
+    timeout: float
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+        )
+
+    def _timeout(self, options: Optional[GenerationOptions]) -> httpx.Timeout:
+        read = options.timeout if options and options.timeout else self.timeout
+        return httpx.Timeout(read, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+
+    def _base_payload(self, options: Optional[GenerationOptions]) -> Dict[str, Any]:
+        options = options or GenerationOptions()
+        payload: Dict[str, Any] = {
+            "model": self.model_name,
+            "stream": False,
+            "keep_alive": options.keep_alive or settings.LLM_KEEP_ALIVE,
+        }
+        if options.format is not None:
+            payload["format"] = options.format
+        model_options = options.model_options()
+        if model_options:
+            payload["options"] = model_options
+        return payload
+
+    def _generate_payload(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions],
+        system: Optional[str],
+    ) -> Dict[str, Any]:
+        payload = self._base_payload(options)
+        payload["prompt"] = prompt
+        if system:
+            payload["system"] = system
+        return payload
+
+    def _chat_payload(
+        self, messages: List[Dict[str, str]], options: Optional[GenerationOptions]
+    ) -> Dict[str, Any]:
+        payload = self._base_payload(options)
+        payload["messages"] = messages
+        return payload
+
+    @staticmethod
+    def _check_status(response: httpx.Response) -> None:
+        if response.status_code != 200:
+            raise LLMBackendError(
+                f"Ollama returned {response.status_code}: {response.text[:500]}"
+            )
+
+    @classmethod
+    def _read(cls, response: httpx.Response, field: str) -> str:
+        cls._check_status(response)
+        data = response.json()
+        if field == "message":
+            return data.get("message", {}).get("content", "")
+        return data.get(field, "")
+
+
+class OllamaClient(_OllamaPayloadMixin, LLMBackend):
+    """
+    Synchronous Ollama client backed by a pooled httpx.Client.
+    Safe to share across threads.
+    """
+
+    supports_format = True
+
+    def __init__(
+        self,
+        host: str = settings.OLLAMA_HOST,
+        model_name: str = settings.LLM_MODEL_NAME,
+        timeout: float = settings.LLM_TIMEOUT_SECONDS,
+    ):
+        self.host = host.rstrip("/")
+        self.model_name = model_name
+        self.timeout = timeout
+        self._client = httpx.Client(base_url=self.host, limits=self._limits())
+        # No keep-alive: abortable streams each get (and own) a connection
+        self._abortable_client = httpx.Client(
+            base_url=self.host,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=0,
+            ),
+        )
+
+    def _post(self, path: str, payload: dict, options: Optional[GenerationOptions]):
+        try:
+            return self._client.post(path, json=payload, timeout=self._timeout(options))
+        except httpx.HTTPError as e:
+            raise LLMBackendError(f"Ollama request to {self.host}{path} failed: {e}")
+
+    def generate(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions] = None,
+        system: Optional[str] = None,
+    ) -> str:
+        payload = self._generate_payload(prompt, options, system)
+        return self._read(self._post("/api/generate", payload, options), "response")
+
+    def generate_stream(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions] = None,
+        system: Optional[str] = None,
+        on_open: Optional[AbortHook] = None,
+    ) -> Iterator[str]:
+        """
+        Stream /api/generate. Closing the iterator early closes the
+        connection, which makes Ollama stop generating and free the slot.
+        """
+        payload = self._generate_payload(prompt, options, system)
+        payload["stream"] = True
+
+        client, extensions = self._client, None
+        if on_open is not None:
+            client, extensions = self._abortable_request(on_open)
+
+        try:
+            with client.stream(
+                "POST",
+                "/api/generate",
+                json=payload,
+                timeout=self._timeout(options),
+                extensions=extensions,
+            ) as response:
+                if response.status_code != 200:
+                    response.read()
+                    self._check_status(response)
+
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise LLMBackendError(f"Ollama stream failed: {data['error']}")
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        return
+        except httpx.HTTPError as e:
+            raise LLMBackendError(f"Ollama request to {self.host}/api/generate failed: {e}")
+
+    def _abortable_request(self, on_open: AbortHook):
+        """
+        Client and request extensions for a stream that can be aborted from
+        another thread, even before Ollama sends its response headers
+        (which it only does with the first token). The request gets a
+        fresh connection so its socket is known as soon as it connects;
+        aborting shuts that socket down, failing any read blocked on it.
+        """
+        lock = threading.Lock()
+        sockets: List[socket.socket] = []
+        aborted = False
+
+        def shutdown() -> None:
+            for sock in sockets:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+        def abort() -> None:
+            nonlocal aborted
+            with lock:
+                aborted = True
+                shutdown()
+
+        def trace(event: str, info: Dict[str, Any]) -> None:
+            if event != "connection.connect_tcp.complete":
+                return
+            sock = info["return_value"].get_extra_info("socket")
+            with lock:
+                if sock is not None:
+                    sockets.append(sock)
+                # Aborted while still connecting
+                if aborted:
+                    shutdown()
+
+        on_open(abort)
+        return self._abortable_client, {"trace": trace}
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[GenerationOptions] = None,
+    ) -> str:
+        payload = self._chat_payload(messages, options)
+        return self._read(self._post("/api/chat", payload, options), "message")
+
+    def health_check(self) -> bool:
+        """True if the server answers; used by the router's health probes."""
+        try:
+            response = self._client.get(
+                "/api/tags", timeout=settings.LLM_CONNECT_TIMEOUT_SECONDS
+            )
+        except httpx.HTTPError:
+            return False
+        return response.status_code == 200
+
+    def close(self) -> None:
+        self._client.close()
+        self._abortable_client.close()
+
+
+class AsyncOllamaClient(_OllamaPayloadMixin):
+    """
+    Asynchronous Ollama client backed by a pooled httpx.AsyncClient.
+    """
+
+    def __init__(
+        self,
+        host: str = settings.OLLAMA_HOST,
+        model_name: str = settings.LLM_MODEL_NAME,
+        timeout: float = settings.LLM_TIMEOUT_SECONDS,
+    ):
+        self.host = host.rstrip("/")
+        self.model_name = model_name
+        self.timeout = timeout
+        self._client = httpx.AsyncClient(base_url=self.host, limits=self._limits())
+
+    async def _post(self, path: str, payload: dict, options: Optional[GenerationOptions]):
+        try:
+            return await self._client.post(
+                path, json=payload, timeout=self._timeout(options)
+            )
+        except httpx.HTTPError as e:
+            raise LLMBackendError(f"Ollama request to {self.host}{path} failed: {e}")
+
+    async def generate(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions] = None,
+        system: Optional[str] = None,
+    ) -> str:
+        payload = self._generate_payload(prompt, options, system)
+        response = await self._post("/api/generate", payload, options)
+        return self._read(response, "response")
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[GenerationOptions] = None,
+    ) -> str:
+        payload = self._chat_payload(messages, options)
+        response = await self._post("/api/chat", payload, options)
+        return self._read(response, "message")
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+# -----------------------------
+# Shared process-wide clients
+# -----------------------------
+_lock = threading.Lock()
+_sync_clients: Dict[str, LLMBackend] = {}
+_async_client: Optional[AsyncOllamaClient] = None
+
+
+def get_llm_client(model_name: Optional[str] = None) -> LLMBackend:
+    """
+    Return the process-wide sync client for a model (LLM_MODEL_NAME by
+    default): one connection pool per host, routed across hosts when
+    OLLAMA_HOSTS lists more than one. Each model gets one shared client.
+    """
+    model_name = model_name or settings.LLM_MODEL_NAME
+    with _lock:
+        client = _sync_clients.get(model_name)
+        if client is None:
+            from app.services.llm_router import LLMRouter, create_llm_backend
+
+            client = create_llm_backend(model_name=model_name)
+            if isinstance(client, LLMRouter):
+                client.start_health_checks(settings.LLM_ROUTER_HEALTH_INTERVAL_SECONDS)
+            _sync_clients[model_name] = client
+            logger.info(f"LLM client for {model_name} ready: {', '.join(settings.OLLAMA_HOSTS)}")
+        return client
+
+
+def get_async_llm_client() -> AsyncOllamaClient:
+    """Return the process-wide async client."""
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            _async_client = AsyncOllamaClient()
+        return _async_client
+
+
+async def close_llm_clients() -> None:
+    """Close shared connection pools (called on app shutdown)."""
+    global _async_client
+    with _lock:
+        sync_clients, async_client = list(_sync_clients.values()), _async_client
+        _sync_clients.clear()
+        _async_client = None
+    for sync_client in sync_clients:
+        sync_client.close()
+    if async_client is not None:
+        await async_client.aclose()
@@ -0,0 +1,594 @@
+"""
+LLM Router
+----------
+Spreads LLM calls over several Ollama hosts (OLLAMA_HOSTS).
+
+Each call goes to the available backend with the fewest requests in
+flight, ties broken by its latency average. A backend that fails
+LLM_ROUTER_FAILURE_THRESHOLD calls in a row is ejected by its circuit
+breaker for LLM_ROUTER_COOLDOWN_SECONDS and then gets a single trial
+call (half-open) before it takes traffic again. A background thread
+probes every host so dead ones stop receiving calls and recovered ones
+come back without waiting for user traffic.
+
+A failed call is retried once per remaining backend while the retry
+budget allows; the budget is a fraction of recent calls, so an outage
+cannot multiply the load on the surviving hosts.
+
+Streams requested with GenerationOptions(hedge=True) are hedged: if no
+piece has arrived after the observed LLM_HEDGE_PERCENTILE time to first
+piece of such streams, a duplicate goes to another backend and the
+first to produce output wins. Each attempt registers an abort handle for
+its open request, so the losers are aborted the moment a leader is
+chosen (and every attempt when the caller stops early), even while
+blocked waiting for their first byte; this stops their generation and
+frees the backend. Non-streamed calls are never hedged since a losing
+one could not be cancelled. Hedges are capped by their own budget
+(LLM_HEDGE_BUDGET_RATIO of calls).
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, TypeVar
+
+from app.core import settings
+from app.core.exceptions import LLMBackendError
+from app.core.metrics import (
+    LLM_BACKEND_AVAILABLE,
+    LLM_BACKEND_IN_FLIGHT,
+    LLM_BACKEND_REQUESTS,
+    LLM_HEDGE_DELAY,
+    LLM_HEDGEABLE_CALLS,
+    LLM_HEDGES,
+    LLM_ROUTER_RETRIES,
+)
+from app.services.llm_client import AbortHook, GenerationOptions, LLMBackend, OllamaClient
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Weight of the newest call in the per-backend latency average
+_LATENCY_ALPHA = 0.3
+
+
+class RetryBudget:
+    """
+    Token bucket for retries: every call deposits `ratio` tokens, every
+    retry takes one, and `min_per_second` tokens trickle in so a quiet
+    service can still retry. Capped at `capacity`.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, capacity: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount: float) -> None:
+        now = time.monotonic()
+        amount += (now - self._updated) * self.min_per_second
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    def record_call(self) -> None:
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill(0.0)
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class LatencyWindow:
+    """
+    The most recent `size` latencies of one kind of call.
+    """
+
+    def __init__(self, size: int, min_samples: int):
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q-th percentile, or None until `min_samples` are in."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class BackendNode:
+    """
+    One backend and its routing state (guarded by the router's lock).
+    """
+
+    def __init__(self, name: str, backend: LLMBackend):
+        self.name = name
+        self.backend = backend
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.healthy = True
+        # A half-open breaker lets one trial call through at a time
+        self.trial_running = False
+
+    def available(self, now: float, cooldown: float) -> bool:
+        if not self.healthy:
+            return False
+        if self.state == OPEN:
+            return now - self.opened_at >= cooldown
+        if self.state == HALF_OPEN:
+            return not self.trial_running
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency else None,
+            "consecutive_failures": self.failures,
+        }
+
+
+class LLMRouter(LLMBackend):
+    """
+    LLMBackend over several backends serving the same model.
+    """
+
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        names: Optional[List[str]] = None,
+        failure_threshold: int = settings.LLM_ROUTER_FAILURE_THRESHOLD,
+        cooldown_seconds: float = settings.LLM_ROUTER_COOLDOWN_SECONDS,
+        retry_budget: Optional[RetryBudget] = None,
+        hedge_budget: Optional[RetryBudget] = None,
+    ):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+
+        names = names or [f"backend-{i}" for i in range(len(backends))]
+        self.nodes = [BackendNode(name, backend) for name, backend in zip(names, backends)]
+        self.model_name = backends[0].model_name
+        self.supports_format = all(getattr(b, "supports_format", False) for b in backends)
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.retry_budget = retry_budget or RetryBudget(
+            settings.LLM_ROUTER_RETRY_RATIO, settings.LLM_ROUTER_RETRY_MIN_PER_SECOND
+        )
+        # Same token bucket, spent on hedges instead of retries
+        self.hedge_budget = hedge_budget or RetryBudget(
+            settings.LLM_HEDGE_BUDGET_RATIO, settings.LLM_HEDGE_MIN_PER_SECOND
+        )
+        # Time to first piece of hedgeable streams
+        self.first_piece_latency = LatencyWindow(
+            settings.LLM_HEDGE_WINDOW, settings.LLM_HEDGE_MIN_SAMPLES
+        )
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+        for node in self.nodes:
+            LLM_BACKEND_AVAILABLE.labels(backend=node.name).set(1)
+
+    # -----------------------------
+    # LLMBackend
+    # -----------------------------
+    def generate(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions] = None,
+        system: Optional[str] = None,
+    ) -> str:
+        def fn(backend: LLMBackend) -> str:
+            return backend.generate(prompt, options=options, system=system)
+
+        self.retry_budget.record_call()
+        return self._call(fn, set())
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[GenerationOptions] = None,
+    ) -> str:
+        self.retry_budget.record_call()
+        return self._call(lambda b: b.chat(messages, options=options), set())
+
+    def generate_stream(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions] = None,
+        system: Optional[str] = None,
+        on_open: Optional[AbortHook] = None,
+    ) -> Iterator[str]:
+        """
+        Stream from one backend. A failure before the first piece is
+        retried elsewhere; after that the caller already holds output,
+        so the error is raised. `on_open` is not used: attempts are
+        aborted internally, where a retry cannot mistake it for a failure.
+        """
+        self.retry_budget.record_call()
+        if self._hedging(options):
+            return self._stream_hedged(prompt, options, system)
+        return self._stream(prompt, options, system, set())
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+        for node in self.nodes:
+            node.backend.close()
+
+    # -----------------------------
+    # Routing
+    # -----------------------------
+    def _stream(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions],
+        system: Optional[str],
+        tried: Set[str],
+        track: bool = False,
+        on_open: Optional[AbortHook] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> Iterator[str]:
+        """
+        Stream from the best backend, retrying elsewhere on failure. With
+        `stop` set, an error is taken as our own abort: no breaker
+        penalty and no retry.
+        """
+        while True:
+            if stop is not None and stop.is_set():
+                return
+            node = self._acquire(tried)
+            start = time.perf_counter()
+            stream = node.backend.generate_stream(
+                prompt, options=options, system=system, on_open=on_open
+            )
+            started = False
+            failure: Optional[LLMBackendError] = None
+            failed: Optional[bool] = False
+
+            try:
+                for piece in stream:
+                    if not started and track:
+                        self.first_piece_latency.observe(time.perf_counter() - start)
+                    started = True
+                    yield piece
+            except GeneratorExit:
+                # The caller stopped early; a normal, successful call
+                raise
+            except LLMBackendError as e:
+                failure = e
+                failed = True
+                if stop is not None and stop.is_set():
+                    failed = None
+            except BaseException:
+                failed = None
+                raise
+            finally:
+                stream.close()
+                self._release(node, start, failed=failed)
+
+            if failure is None or failed is None:
+                return
+            if started or not self._retry_allowed(tried, node, failure):
+                raise failure
+
+    def _call(self, fn: Callable[[LLMBackend], T], tried: Set[str]) -> T:
+        while True:
+            node = self._acquire(tried)
+            start = time.perf_counter()
+            try:
+                result = fn(node.backend)
+            except LLMBackendError as e:
+                self._release(node, start, failed=True)
+                if not self._retry_allowed(tried, node, e):
+                    raise
+                continue
+            except BaseException:
+                # Not the backend's fault (e.g. cancelled); no breaker penalty
+                self._release(node, start, failed=None)
+                raise
+
+            self._release(node, start, failed=False)
+            return result
+
+    def _acquire(self, tried: Set[str]) -> BackendNode:
+        """Least outstanding requests among available, untried backends."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                node
+                for node in self.nodes
+                if node.name not in tried and node.available(now, self.cooldown_seconds)
+            ]
+            if not candidates:
+                raise LLMBackendError("No healthy LLM backend available")
+
+            node = min(candidates, key=lambda n: (n.in_flight, n.latency or 0.0))
+            if node.state == OPEN:
+                node.state = HALF_OPEN
+            if node.state == HALF_OPEN:
+                node.trial_running = True
+            node.in_flight += 1
+            tried.add(node.name)
+
+        LLM_BACKEND_IN_FLIGHT.labels(backend=node.name).inc()
+        return node
+
+    def _release(self, node: BackendNode, start: float, failed: Optional[bool]) -> None:
+        """Record a finished call; `failed=None` leaves the breaker untouched."""
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            node.in_flight -= 1
+            node.trial_running = False
+            if failed:
+                node.failures += 1
+                if node.state == HALF_OPEN or node.failures >= self.failure_threshold:
+                    if node.state != OPEN:
+                        logger.warning(
+                            f"LLM backend {node.name} ejected after "
+                            f"{node.failures} consecutive failures"
+                        )
+                    node.state = OPEN
+                    node.opened_at = time.monotonic()
+            elif failed is False:
+                if node.state != CLOSED:
+                    logger.info(f"LLM backend {node.name} readmitted")
+                node.failures = 0
+                node.state = CLOSED
+                node.latency = (
+                    elapsed
+                    if node.latency is None
+                    else _LATENCY_ALPHA * elapsed + (1 - _LATENCY_ALPHA) * node.latency
+                )
+            available = node.healthy and node.state == CLOSED
+
+        outcome = "error" if failed else "ok"
+        LLM_BACKEND_IN_FLIGHT.labels(backend=node.name).dec()
+        LLM_BACKEND_REQUESTS.labels(backend=node.name, outcome=outcome).inc()
+        LLM_BACKEND_AVAILABLE.labels(backend=node.name).set(1 if available else 0)
+
+    def _has_other(self, tried: Set[str]) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            return any(
+                n.name not in tried and n.available(now, self.cooldown_seconds)
+                for n in self.nodes
+            )
+
+    def _retry_allowed(
+        self, tried: Set[str], node: BackendNode, error: Exception
+    ) -> bool:
+        if not self._has_other(tried):
+            return False
+        if not self.retry_budget.try_spend():
+            logger.warning(f"LLM retry budget exhausted; not retrying after {node.name}")
+            return False
+
+        LLM_ROUTER_RETRIES.inc()
+        logger.warning(f"LLM backend {node.name} failed, retrying elsewhere: {error}")
+        return True
+
+    # -----------------------------
+    # Hedging
+    # -----------------------------
+    def _hedging(self, options: Optional[GenerationOptions]) -> bool:
+        return bool(options and options.hedge) and len(self.nodes) > 1
+
+    def _hedge_delay(self) -> float:
+        """Observed percentile time to first piece, floored; fixed until warmed up."""
+        observed = self.first_piece_latency.percentile(settings.LLM_HEDGE_PERCENTILE)
+        delay = settings.LLM_HEDGE_INITIAL_DELAY_SECONDS if observed is None else observed
+        delay = max(delay, settings.LLM_HEDGE_MIN_DELAY_SECONDS)
+        LLM_HEDGE_DELAY.labels(kind="stream").set(delay)
+        return delay
+
+    def _hedge_allowed(self, tried: Set[str]) -> bool:
+        if not self._has_other(tried):
+            return False
+        if not self.hedge_budget.try_spend():
+            LLM_HEDGES.labels(kind="stream", outcome="skipped").inc()
+            return False
+        return True
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._hedge_pool is None:
+                # Every hedged stream may run as two attempts
+                self._hedge_pool = ThreadPoolExecutor(
+                    max_workers=2 * settings.LLM_MAX_CONCURRENCY,
+                    thread_name_prefix="llm-hedge",
+                )
+            return self._hedge_pool
+
+    def _stream_hedged(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions],
+        system: Optional[str],
+    ) -> Iterator[str]:
+        """
+        Run the stream on a worker and race a duplicate against it when no
+        piece has arrived within the hedge delay. The first attempt to
+        produce output becomes the leader; the others are aborted.
+        """
+        tried: Set[str] = set()
+        self.hedge_budget.record_call()
+        LLM_HEDGEABLE_CALLS.labels(kind="stream").inc()
+
+        pieces: "queue.Queue[tuple]" = queue.Queue()
+        stops: List[threading.Event] = []
+        # Abort handle of each attempt's open request, set via on_open
+        handles: Dict[int, Callable[[], None]] = {}
+        handles_lock = threading.Lock()
+
+        def abort(attempt: int) -> None:
+            stops[attempt].set()
+            with handles_lock:
+                handle = handles.pop(attempt, None)
+            if handle is not None:
+                handle()
+
+        def abort_all() -> None:
+            for attempt in range(len(stops)):
+                abort(attempt)
+
+        def run(attempt: int, stop: threading.Event) -> None:
+            def opened(handle: Callable[[], None]) -> None:
+                with handles_lock:
+                    handles[attempt] = handle
+                # Aborted while the request was still being opened
+                if stop.is_set():
+                    abort(attempt)
+
+            stream = self._stream(
+                prompt, options, system, tried, track=True, on_open=opened, stop=stop
+            )
+            try:
+                for piece in stream:
+                    if stop.is_set():
+                        return
+                    pieces.put((attempt, piece, None))
+                pieces.put((attempt, None, None))
+            except Exception as e:
+                pieces.put((attempt, None, e))
+            finally:
+                with handles_lock:
+                    handles.pop(attempt, None)
+                # Backends without abort handles stop here, at their next piece
+                stream.close()
+
+        def start() -> None:
+            stop = threading.Event()
+            stops.append(stop)
+            self._pool().submit(run, len(stops) - 1, stop)
+
+        deadline = time.monotonic() + self._hedge_delay()
+        start()
+        leader: Optional[int] = None
+        running = 1
+        decided = False
+
+        try:
+            while True:
+                timeout = None if decided else max(0.0, deadline - time.monotonic())
+                try:
+                    attempt, piece, error = pieces.get(timeout=timeout)
+                except queue.Empty:
+                    decided = True
+                    if self._hedge_allowed(tried):
+                        logger.info("LLM stream has not started, hedging on another backend")
+                        start()
+                        running += 1
+                    continue
+
+                if leader is not None and attempt != leader:
+                    continue
+                if error is not None:
+                    running -= 1
+                    if leader is not None or running == 0:
+                        raise error
+                    continue
+
+                if leader is None:
+                    leader = attempt
+                    decided = True
+                    for i in range(len(stops)):
+                        if i != leader:
+                            abort(i)
+                    if len(stops) > 1:
+                        outcome = "primary" if leader == 0 else "hedge"
+                        LLM_HEDGES.labels(kind="stream", outcome=outcome).inc()
+
+                if piece is None:
+                    return
+                yield piece
+        finally:
+            # Also when the caller stops early: every attempt is aborted
+            abort_all()
+
+    # -----------------------------
+    # Health checks
+    # -----------------------------
+    def check_health(self) -> None:
+        """Probe every backend that can be probed and update its health."""
+        for node in self.nodes:
+            probe = getattr(node.backend, "health_check", None)
+            if probe is None:
+                continue
+            try:
+                healthy = bool(probe())
+            except Exception:
+                healthy = False
+
+            with self._lock:
+                changed = healthy != node.healthy
+                node.healthy = healthy
+                available = healthy and node.state == CLOSED
+
+            if changed:
+                logger.warning(
+                    f"LLM backend {node.name} is {'up' if healthy else 'down'}"
+                )
+            LLM_BACKEND_AVAILABLE.labels(backend=node.name).set(1 if available else 0)
+
+    def start_health_checks(self, interval: float) -> None:
+        if self._health_thread is not None or interval <= 0:
+            return
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(
+            target=run, name="llm-health-check", daemon=True
+        )
+        self._health_thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {node.name: node.status() for node in self.nodes}
+
+
+def create_llm_backend(model_name: str = settings.LLM_MODEL_NAME) -> LLMBackend:
+    """
+    An Ollama client for OLLAMA_HOSTS: a single client for one host,
+    otherwise a router over one client per host.
+    """
+    hosts = settings.OLLAMA_HOSTS
+    if len(hosts) == 1:
+        return OllamaClient(host=hosts[0], model_name=model_name)
+
+    return LLMRouter(
+        [OllamaClient(host=host, model_name=model_name) for host in hosts],
+        names=hosts,
+    )
@@ -0,0 +1,216 @@
+"""
+Media Service
+-------------
+Pre-stage between content resolution and ASR.
+
+- Detects the container from the file's leading bytes (not its name)
+- Rejects media without an audio track before any model is loaded
+- Extracts and downmixes audio once to 16 kHz mono PCM WAV
+- Caches that artifact under data/processed/audio by media hash
+
+ASR then reads the small PCM file directly instead of demuxing the
+original video on every run or retry.
+"""
+
+import logging
+import os
+import threading
+import wave
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from app.core import settings
+from app.core.exceptions import NoAudioStreamError
+from app.utils.file_utils import sha256_file
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+def detect_container(path: Union[str, Path]) -> Optional[str]:
+    """
+    Sniff the media container from magic bytes.
+    Returns a file extension ("mp4", "webm", "wav", ...) or None.
+    """
+    with open(path, "rb") as f:
+        head = f.read(4096)
+
+    if len(head) < 12:
+        return None
+
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"M4A ", b"M4B "):
+            return "m4a"
+        if brand == b"qt  ":
+            return "mov"
+        return "mp4"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm" if b"webm" in head[:64] else "mkv"
+    if head[:4] == b"RIFF":
+        if head[8:12] == b"WAVE":
+            return "wav"
+        if head[8:12] == b"AVI ":
+            return "avi"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:3] == b"ID3" or (head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head[:4] == b"\x30\x26\xb2\x75":
+        return "wmv"
+    if head[0] == 0x47 and len(head) > 376 and head[188] == 0x47 and head[376] == 0x47:
+        return "ts"
+
+    return None
+
+
+def is_asr_ready_wav(path: Union[str, Path]) -> bool:
+    """True if the file is already 16 kHz mono 16-bit PCM WAV."""
+    try:
+        with wave.open(str(path), "rb") as wav:
+            return (
+                wav.getframerate() == SAMPLE_RATE
+                and wav.getnchannels() == 1
+                and wav.getsampwidth() == 2
+            )
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def load_pcm_wav(path: Union[str, Path]) -> np.ndarray:
+    """
+    Read a 16-bit PCM WAV into float32 samples in [-1, 1] (Whisper's input).
+    """
+    with wave.open(str(path), "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"Expected 16-bit PCM WAV: {path}")
+        frames = wav.readframes(wav.getnframes())
+        channels = wav.getnchannels()
+
+    audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio
+
+
+class MediaPreprocessor:
+    def __init__(
+        self,
+        cache_dir: Path = settings.AUDIO_CACHE_DIR,
+        max_bytes: int = settings.AUDIO_CACHE_MAX_BYTES,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def prepare(self, media_path: Union[str, Path]) -> Tuple[str, str]:
+        """
+        Return (pcm_wav_path, media_sha256) for the given media file.
+        Raises NoAudioStreamError for media without audio.
+        """
+        media_path = str(media_path)
+        media_hash = sha256_file(media_path)
+        target = self.cache_dir / f"{media_hash}.wav"
+
+        if target.exists():
+            os.utime(target, None)
+            logger.info(f"Audio cache hit for {os.path.basename(media_path)}")
+            return str(target), media_hash
+
+        container = detect_container(media_path)
+        logger.info(f"Extracting audio from {container or 'unknown'} container")
+
+        if not is_asr_ready_wav(media_path):
+            self._check_audio_stream(media_path)
+        self._extract(media_path, target)
+        self._evict()
+
+        return str(target), media_hash
+
+    @staticmethod
+    def _check_audio_stream(path: str) -> None:
+        import ffmpeg
+
+        try:
+            probe = ffmpeg.probe(path)
+        except ffmpeg.Error as e:
+            stderr = e.stderr.decode("utf-8", errors="ignore") if e.stderr else str(e)
+            raise ValueError(f"Unreadable media file: {stderr.strip()[-300:]}")
+
+        if not any(s.get("codec_type") == "audio" for s in probe.get("streams", [])):
+            raise NoAudioStreamError("Media has no audio track to transcribe")
+
+    def _extract(self, media_path: str, target: Path) -> None:
+        tmp_path = target.with_suffix(f".{threading.get_ident()}.tmp.wav")
+
+        if is_asr_ready_wav(media_path):
+            # Already 16 kHz mono PCM: copy bytes instead of re-encoding
+            with open(media_path, "rb") as src, open(tmp_path, "wb") as dst:
+                while True:
+                    chunk = src.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+        else:
+            import ffmpeg
+
+            try:
+                (
+                    ffmpeg.input(media_path)
+                    .output(
+                        str(tmp_path),
+                        vn=None,
+                        ac=1,
+                        ar=SAMPLE_RATE,
+                        acodec="pcm_s16le",
+                        format="wav",
+                    )
+                    .run(quiet=True, overwrite_output=True)
+                )
+            except ffmpeg.Error as e:
+                tmp_path.unlink(missing_ok=True)
+                stderr = e.stderr.decode("utf-8", errors="ignore") if e.stderr else str(e)
+                raise ValueError(f"Audio extraction failed: {stderr.strip()[-300:]}")
+
+        os.replace(tmp_path, target)
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            for f in self.cache_dir.glob("*.wav"):
+                if ".tmp" in f.suffixes:
+                    continue
+                try:
+                    stat = f.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, f))
+
+            total = sum(size for _, size, _ in entries)
+            entries.sort()
+            # Always keep the newest artifact, even if it alone exceeds the budget
+            while len(entries) > 1 and total > self.max_bytes:
+                _, size, f = entries.pop(0)
+                f.unlink(missing_ok=True)
+                total -= size
+
+
+# -----------------------------
+# Shared process-wide preprocessor
+# -----------------------------
+_lock = threading.Lock()
+_preprocessor: Optional[MediaPreprocessor] = None
+
+
+def get_media_preprocessor() -> MediaPreprocessor:
+    global _preprocessor
+    with _lock:
+        if _preprocessor is None:
+            _preprocessor = MediaPreprocessor()
+        return _preprocessor
@@ -0,0 +1,176 @@
+"""
+Model Registry
+--------------
+Process-wide owner of heavyweight models (Whisper).
+
+- Loads a model on first use, or up front via warm_up() at startup
+- Shares one instance per model size across every router and pipeline
+- Evicts models idle for longer than a threshold to free RAM
+- Reports load state and timings for the health endpoint
+"""
+
+import gc
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _load_whisper(name: str):
+    # Imported lazily so the API starts without pulling in torch
+    import whisper
+
+    return whisper.load_model(name)
+
+
+@dataclass
+class ModelEntry:
+    name: str
+    model: Any = None
+    state: str = "unloaded"  # unloaded | loading | loaded | failed
+    load_seconds: Optional[float] = None
+    loaded_at: Optional[float] = None
+    last_used: Optional[float] = None
+    uses: int = 0
+    in_use: int = 0
+    error: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class ModelRegistry:
+    def __init__(self, loader: Callable[[str], Any] = _load_whisper):
+        self._loader = loader
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _entry(self, name: str) -> ModelEntry:
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = ModelEntry(name=name)
+            return self._entries[name]
+
+    def get_asr_model(self, name: str = settings.ASR_MODEL_NAME):
+        """
+        Return the shared model instance, loading it on first use.
+        Concurrent first callers wait for a single load.
+        """
+        entry = self._entry(name)
+
+        with entry.lock:
+            if entry.model is None:
+                entry.state = "loading"
+                logger.info(f"Loading ASR model '{name}'")
+                started = time.perf_counter()
+                try:
+                    entry.model = self._loader(name)
+                except Exception as e:
+                    entry.state = "failed"
+                    entry.error = str(e)
+                    raise
+                entry.load_seconds = round(time.perf_counter() - started, 3)
+                entry.loaded_at = time.time()
+                entry.state = "loaded"
+                entry.error = None
+                logger.info(f"Loaded ASR model '{name}' in {entry.load_seconds}s")
+
+            entry.last_used = time.time()
+            entry.uses += 1
+            return entry.model
+
+    @contextmanager
+    def use_asr_model(self, name: str = settings.ASR_MODEL_NAME) -> Iterator[Any]:
+        """
+        Borrow a model; it will not be evicted while borrowed.
+        """
+        model = self.get_asr_model(name)
+        entry = self._entry(name)
+        with entry.lock:
+            entry.in_use += 1
+        try:
+            yield model
+        finally:
+            with entry.lock:
+                entry.in_use -= 1
+                entry.last_used = time.time()
+
+    def warm_up(self, names: Iterable[str]) -> None:
+        for name in names:
+            try:
+                self.get_asr_model(name)
+            except Exception as e:
+                logger.error(f"Warm-up failed for ASR model '{name}': {e}")
+
+    def evict(self, name: str) -> bool:
+        entry = self._entry(name)
+        with entry.lock:
+            if entry.model is None or entry.in_use:
+                return False
+            entry.model = None
+            entry.state = "unloaded"
+        gc.collect()
+        logger.info(f"Evicted ASR model '{name}'")
+        return True
+
+    def evict_idle(self, max_idle_seconds: float) -> List[str]:
+        now = time.time()
+        with self._lock:
+            candidates = [
+                entry.name
+                for entry in self._entries.values()
+                if entry.model is not None
+                and not entry.in_use
+                and entry.last_used is not None
+                and now - entry.last_used > max_idle_seconds
+            ]
+        return [name for name in candidates if self.evict(name)]
+
+    def start_idle_reaper(self, max_idle_seconds: float, interval: float = 60.0) -> None:
+        """
+        Periodically evict models idle for longer than `max_idle_seconds`.
+        """
+        if self._reaper is not None or max_idle_seconds <= 0:
+            return
+
+        def reap() -> None:
+            while not self._stop.wait(interval):
+                self.evict_idle(max_idle_seconds)
+
+        self._reaper = threading.Thread(target=reap, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            entry.name: {
+                "state": entry.state,
+                "load_seconds": entry.load_seconds,
+                "loaded_at": entry.loaded_at,
+                "last_used": entry.last_used,
+                "uses": entry.uses,
+                "in_use": entry.in_use,
+                "error": entry.error,
+            }
+            for entry in entries
+        }
+
+
+# -----------------------------
+# Shared process-wide registry
+# -----------------------------
+_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    return _registry
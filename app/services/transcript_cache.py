@@ -0,0 +1,145 @@
+"""
+Transcript Cache
+----------------
+On-disk cache of ASR output keyed by media content.
+
+Key = SHA-256(media bytes) + ASR model name + ASR options, so the same
+lecture uploaded under another module (or retried) skips Whisper.
+Each entry is one JSON file holding the transcript text and segments.
+Eviction is least-recently-used by file mtime, bounded by entry count
+and total bytes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptCache:
+    def __init__(
+        self,
+        cache_dir: Path = settings.TRANSCRIPT_CACHE_DIR,
+        max_entries: int = settings.TRANSCRIPT_CACHE_MAX_ENTRIES,
+        max_bytes: int = settings.TRANSCRIPT_CACHE_MAX_BYTES,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(
+        media_hash: str, model_name: str, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        material = json.dumps(
+            {"media": media_hash, "model": model_name, "options": options or {}},
+            sort_keys=True,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self._counters["misses"] += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable transcript cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self._counters["misses"] += 1
+            return None
+
+        # Touch for LRU ordering
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        with self._lock:
+            self._counters["hits"] += 1
+        return entry
+
+    def set(self, key: str, text: str, segments: list, **metadata: Any) -> None:
+        entry = {
+            "text": text,
+            "segments": segments,
+            "created_at": time.time(),
+            **metadata,
+        }
+
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._counters["writes"] += 1
+            self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        files = list(self.cache_dir.glob("*.json"))
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(files),
+                "bytes": sum(f.stat().st_size for f in files if f.exists()),
+            }
+
+    def _evict(self) -> None:
+        entries = []
+        for f in self.cache_dir.glob("*.json"):
+            try:
+                stat = f.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, f))
+
+        total = sum(size for _, size, _ in entries)
+        if len(entries) <= self.max_entries and total <= self.max_bytes:
+            return
+
+        entries.sort()
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, f = entries.pop(0)
+            f.unlink(missing_ok=True)
+            total -= size
+            self._counters["evictions"] += 1
+
+
+# -----------------------------
+# Shared process-wide cache
+# -----------------------------
+_lock = threading.Lock()
+_cache: Optional[TranscriptCache] = None
+
+
+def get_transcript_cache() -> Optional[TranscriptCache]:
+    """Return the shared cache, or None when TRANSCRIPT_CACHE_ENABLED is false."""
+    global _cache
+    if not settings.TRANSCRIPT_CACHE_ENABLED:
+        return None
+    with _lock:
+        if _cache is None:
+            _cache = TranscriptCache()
+        return _cache
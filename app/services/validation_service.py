@@ -1 +1,252 @@
-# Rule based + LLM Validation
\ No newline at end of file
+# Rule based + LLM Validation
+"""
+Validation Service
+------------------
+Rule-based checks for generated questions and near-duplicate detection.
+
+QuestionValidator.validate() checks one raw question (structure, answer /
+option consistency, stem length) and returns a normalised copy or the
+reason it was rejected. DuplicateIndex compares MinHash signatures of
+content-word shingles (stem plus correct option), so the same question
+reworded for two sections is caught across the whole assessment.
+"""
+
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core import settings
+from app.models.question import ANSWER_LETTERS, Question
+from app.utils.text_utils import content_words
+
+LETTERS = ANSWER_LETTERS
+
+# Rejection reasons (also the INVALID_QUESTIONS "reason" label)
+STRUCTURE = "structure"
+STEM_LENGTH = "stem_length"
+ANSWER = "answer"
+OPTIONS = "options"
+DUPLICATE = "duplicate"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# "A. text", "(b) text", "C) text" option labels
+_OPTION_LABEL = re.compile(r"^\(?([A-Da-d])[\).:]\s+")
+_ANSWER_LETTER = re.compile(r"^(?:option\s+)?\(?([A-D])[\).:]?$", re.IGNORECASE)
+_CATCH_ALL = re.compile(r"^(?:all|none|both) of the (?:above|options)$")
+
+# Largest 31-bit prime: a * x + b stays inside uint64 for 31-bit hashes
+_PRIME = (1 << 31) - 1
+
+
+# -----------------------------
+# Shingling + MinHash
+# -----------------------------
+def normalize_text(text: str) -> str:
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+def shingles(text: str, size: int = 2, unit: str = "word") -> List[str]:
+    """
+    Overlapping n-grams of content words (stopwords dropped, so "by" vs
+    "through" rewordings still match) or of normalised characters. Text
+    shorter than one shingle is a single shingle.
+    """
+    if unit == "char":
+        tokens: List[str] = list(normalize_text(text))
+        joiner = ""
+    else:
+        tokens = content_words(text)
+        joiner = " "
+
+    if len(tokens) <= size:
+        return [joiner.join(tokens)] if tokens else []
+    return [joiner.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+class MinHasher:
+    """
+    MinHash signatures over shingle sets. The fraction of equal
+    signature slots estimates the Jaccard similarity of two sets.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, items: List[str]) -> np.ndarray:
+        if not items:
+            return np.full(len(self._a), _PRIME, dtype=np.uint64)
+
+        hashes = np.fromiter(
+            (zlib.crc32(item.encode("utf-8")) & _PRIME for item in set(items)),
+            dtype=np.uint64,
+        )
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        return float(np.mean(a == b))
+
+
+def duplicate_text(q: Question) -> str:
+    """
+    What two questions are compared on: the stem plus the correct
+    option, so templated stems ("What is the role of X?") about
+    different facts are not duplicates.
+    """
+    answer = q.options[LETTERS.index(q.correct_answer)]
+    return f"{q.question} {answer}"
+
+
+class DuplicateIndex:
+    """
+    Signatures of accepted texts; add() refuses near-duplicates.
+    """
+
+    def __init__(self, hasher: MinHasher, threshold: float, shingle_size: int):
+        self.hasher = hasher
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self._signatures: List[np.ndarray] = []
+
+    def add(self, text: str) -> bool:
+        """Index `text`; False (not indexed) if it near-duplicates an entry."""
+        signature = self._signature(text)
+        if self._best_match(signature) >= self.threshold:
+            return False
+        self._signatures.append(signature)
+        return True
+
+    def _signature(self, text: str) -> np.ndarray:
+        return self.hasher.signature(shingles(text, self.shingle_size))
+
+    def _best_match(self, signature: np.ndarray) -> float:
+        if not self._signatures:
+            return 0.0
+        return float(np.max(np.mean(np.vstack(self._signatures) == signature, axis=1)))
+
+
+# -----------------------------
+# Rules
+# -----------------------------
+class QuestionValidator:
+    def __init__(
+        self,
+        min_stem_chars: int = settings.VALIDATION_MIN_STEM_CHARS,
+        max_stem_chars: int = settings.VALIDATION_MAX_STEM_CHARS,
+        duplicate_threshold: float = settings.VALIDATION_DUPLICATE_THRESHOLD,
+        option_duplicate_threshold: float = settings.VALIDATION_OPTION_DUPLICATE_THRESHOLD,
+        shingle_size: int = settings.VALIDATION_SHINGLE_WORDS,
+        num_perm: int = settings.VALIDATION_MINHASH_PERMUTATIONS,
+    ):
+        self.min_stem_chars = min_stem_chars
+        self.max_stem_chars = max_stem_chars
+        self.duplicate_threshold = duplicate_threshold
+        self.option_duplicate_threshold = option_duplicate_threshold
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+
+    def new_index(self) -> DuplicateIndex:
+        """A fresh near-duplicate index, one per assessment."""
+        return DuplicateIndex(self.hasher, self.duplicate_threshold, self.shingle_size)
+
+    def validate(self, q: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Returns (normalised question, None) or (None, reason).
+        Normalising strips whitespace and option labels ("A. ...") and
+        turns an answer given as "b", "(B)" or the option text into its
+        letter.
+        """
+        if not isinstance(q, dict):
+            return None, STRUCTURE
+
+        question = q.get("question")
+        options = q.get("options")
+        explanation = q.get("explanation")
+        answer = q.get("correct_answer")
+
+        if not isinstance(question, str) or not question.strip():
+            return None, STRUCTURE
+        if not isinstance(explanation, str) or not explanation.strip():
+            return None, STRUCTURE
+        if (
+            not isinstance(options, list)
+            or len(options) != len(LETTERS)
+            or not all(isinstance(o, str) and o.strip() for o in options)
+        ):
+            return None, STRUCTURE
+        if not isinstance(answer, str) or not answer.strip():
+            return None, ANSWER
+
+        question = question.strip()
+        if not self.min_stem_chars <= len(question) <= self.max_stem_chars:
+            return None, STEM_LENGTH
+
+        options, labels_ok = self._strip_labels(options)
+        if not labels_ok:
+            return None, OPTIONS
+        if self._has_option_problem(options):
+            return None, OPTIONS
+
+        letter = self._answer_letter(answer.strip(), options)
+        if letter is None:
+            return None, ANSWER
+
+        return {
+            "question": question,
+            "options": options,
+            "correct_answer": letter,
+            "explanation": explanation.strip(),
+        }, None
+
+    # -----------------------------
+    # Helpers
+    # -----------------------------
+    @staticmethod
+    def _strip_labels(options: List[str]) -> Tuple[List[str], bool]:
+        """Drop "A. " style labels; labelled options must be in A-D order."""
+        stripped = []
+        labels = []
+        for option in options:
+            option = option.strip()
+            match = _OPTION_LABEL.match(option)
+            labels.append(match.group(1).upper() if match else None)
+            stripped.append(option[match.end():].strip() if match else option)
+
+        if any(labels) and tuple(labels) != LETTERS:
+            return stripped, False
+        return stripped, all(stripped)
+
+    def _has_option_problem(self, options: List[str]) -> bool:
+        normalized = [normalize_text(o) for o in options]
+        if len(set(normalized)) != len(normalized):
+            return True
+        # "All of the above" makes more than one letter arguably correct
+        if any(_CATCH_ALL.match(o) for o in normalized):
+            return True
+
+        # Near-identical wording ("The nucleus" / "nucleus.") on character shingles
+        signatures = [self.hasher.signature(shingles(o, 3, unit="char")) for o in options]
+        for i in range(len(signatures)):
+            for j in range(i + 1, len(signatures)):
+                similarity = MinHasher.similarity(signatures[i], signatures[j])
+                if similarity >= self.option_duplicate_threshold:
+                    return True
+        return False
+
+    @staticmethod
+    def _answer_letter(answer: str, options: List[str]) -> Optional[str]:
+        match = _ANSWER_LETTER.match(answer)
+        if match:
+            return match.group(1).upper()
+
+        # Answer given as the option text (possibly with its label)
+        label = _OPTION_LABEL.match(answer)
+        text = normalize_text(answer[label.end():] if label else answer)
+        matches = [i for i, o in enumerate(options) if normalize_text(o) == text]
+        if len(matches) == 1:
+            return LETTERS[matches[0]]
+        return None
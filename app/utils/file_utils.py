@@ -0,0 +1,20 @@
+import hashlib
+from pathlib import Path
+from typing import Union
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: Union[str, Path], chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    Streaming SHA-256 of a file's bytes.
+    Reads fixed-size chunks so large media never sits in memory.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
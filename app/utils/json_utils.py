@@ -1,4 +1,13 @@
 import json
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# qwen3-style reasoning; an unterminated block (cut-off output) runs to the end
+_THINK_BLOCK = re.compile(r"<think>.*?(?:</think>|$)", re.DOTALL | re.IGNORECASE)
+_CODE_FENCE = re.compile(r"```[a-zA-Z]*")
+_QUESTIONS_KEY = re.compile(r'"questions"\s*:\s*\[')
+
+_decoder = json.JSONDecoder()
 
 
 def safe_json_loads(text: str) -> dict | None:
@@ -6,3 +15,187 @@ def safe_json_loads(text: str) -> dict | None:
         return json.loads(text)
     except json.JSONDecodeError:
         return None
+
+
+def strip_llm_noise(text: str) -> str:
+    """Remove <think> reasoning blocks and markdown code fences."""
+    return _CODE_FENCE.sub("", _THINK_BLOCK.sub("", text))
+
+
+def iter_json_objects(
+    text: str, start: int = 0, end: Optional[int] = None
+) -> Iterator[Tuple[Any, int]]:
+    """
+    Yield (object, end offset) for every JSON object that decodes at a
+    "{" in text[start:end], scanning forward past each one. Malformed
+    objects are skipped by moving on to the next "{".
+    """
+    end = len(text) if end is None else end
+    position = text.find("{", start, end)
+
+    while position != -1:
+        try:
+            obj, stop = _decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            position = text.find("{", position + 1, end)
+            continue
+
+        if stop > end:
+            return
+        yield obj, stop
+        position = text.find("{", stop, end)
+
+
+def extract_json_object(text: str) -> Optional[dict]:
+    """The first complete top-level JSON object in LLM output, or None."""
+    for obj, _ in iter_json_objects(strip_llm_noise(text)):
+        if isinstance(obj, dict):
+            return obj
+    return None
+
+
+def salvage_questions(text: str, start: int = 0, end: Optional[int] = None) -> List[dict]:
+    """
+    Question-like objects ({"question": ...}) found one by one after a
+    "questions" key, so a malformed or truncated question costs only
+    itself. Without the key, any question-like object counts.
+    """
+    end = len(text) if end is None else end
+    match = _QUESTIONS_KEY.search(text, start, end)
+    if match:
+        start = match.end()
+
+    return [
+        obj
+        for obj, _ in iter_json_objects(text, start, end)
+        if isinstance(obj, dict) and "question" in obj
+    ]
+
+
+def parse_questions_payload(text: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parse an LLM {"questions": [...]} answer tolerantly.
+
+    Returns (payload, complete). `complete` is False when the output had
+    to be salvaged question by question (bad JSON, truncation, chatter
+    that broke the object); the payload then holds what was recovered.
+    """
+    cleaned = strip_llm_noise(text)
+
+    data = extract_json_object(cleaned)
+    if isinstance(data, dict) and isinstance(data.get("questions"), list):
+        return data, True
+
+    return {"questions": salvage_questions(cleaned)}, False
+
+
+def parse_sections_payload(text: str, section_ids: List[str]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parse a batched {"sections": {id: {"questions": [...]}}} answer.
+
+    Falls back to salvaging questions between consecutive section-id
+    keys, so one broken section does not lose the others. Returns
+    (sections mapping, complete).
+    """
+    cleaned = strip_llm_noise(text)
+
+    data = extract_json_object(cleaned)
+    if isinstance(data, dict):
+        sections = data.get("sections", data)
+        if isinstance(sections, dict) and any(str(k) in section_ids for k in sections):
+            return sections, True
+
+    # Where each section's answer starts, in output order
+    starts = []
+    for section_id in section_ids:
+        match = re.search(rf'"{re.escape(section_id)}"\s*:', cleaned)
+        if match:
+            starts.append((match.end(), section_id))
+    starts.sort()
+
+    sections: Dict[str, Any] = {}
+    for i, (start, section_id) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(cleaned)
+        questions = salvage_questions(cleaned, start, end)
+        if questions:
+            sections[section_id] = {"questions": questions}
+
+    return sections, False
+
+
+class QuestionStreamParser:
+    """
+    Incremental parser for a streamed {"questions": [...]} answer.
+
+    feed() takes the next piece of model output and returns the question
+    objects completed by it. A leading <think> block and code fences are
+    skipped, braces inside strings are ignored, and `closed` turns True
+    once the top-level object ends, so the caller can stop the stream
+    instead of paying for trailing text. Malformed questions are skipped.
+    """
+
+    def __init__(self):
+        self.closed = False
+        self._buffer = ""
+        self._position = 0
+        self._started = False
+        self._in_string = False
+        self._escaped = False
+        self._open: List[int] = []
+
+    def feed(self, piece: str) -> List[dict]:
+        self._buffer += piece
+        if self.closed:
+            return []
+        if not self._started and not self._find_root():
+            return []
+        return self._scan()
+
+    def _find_root(self) -> bool:
+        # Re-searched on every piece until found, so a tag split across
+        # pieces ("<thi" + "nk>") is still recognised
+        while True:
+            brace = self._buffer.find("{", self._position)
+            think = self._buffer.find("<think>", self._position)
+            if think != -1 and (brace == -1 or think < brace):
+                end = self._buffer.find("</think>", think)
+                if end == -1:
+                    return False
+                self._position = end + len("</think>")
+                continue
+            if brace == -1:
+                return False
+
+            self._started = True
+            self._position = brace
+            return True
+
+    def _scan(self) -> List[dict]:
+        found: List[dict] = []
+        text = self._buffer
+
+        for i in range(self._position, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._open.append(i)
+            elif char == "}" and self._open:
+                start = self._open.pop()
+                if not self._open:
+                    self.closed = True
+                    self._position = i + 1
+                    return found
+                obj = safe_json_loads(text[start:i + 1])
+                if isinstance(obj, dict) and "question" in obj:
+                    found.append(obj)
+
+        self._position = len(text)
+        return found
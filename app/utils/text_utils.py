@@ -0,0 +1,41 @@
+import re
+from typing import List
+
+# Word pieces and standalone punctuation, a cheap stand-in for a BPE tokenizer
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD_PATTERN = re.compile(r"[a-z0-9]{3,}")
+
+STOPWORDS = frozenset(
+    """
+    the and for are but not you all any can had her was one our out has him his
+    how its may new now old see two who did get let say she too use that with
+    have this will your from they know want been good much some time very when
+    come here just like long make many more only over such take than them well
+    were what which while would there their then these those into also about
+    because could should being where after before again
+    """.split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local token estimate.
+    Counts words and punctuation, charging long words as several tokens
+    (BPE vocabularies split them), which tracks Llama/Qwen tokenizers
+    closely enough for budgeting.
+    """
+    if not text:
+        return 0
+
+    count = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        count += 1 + (match.end() - match.start()) // 8
+
+    return count
+
+
+def content_words(text: str) -> List[str]:
+    """
+    Lower-cased words of 3+ characters that are not stopwords.
+    """
+    return [w for w in _WORD_PATTERN.findall(text.lower()) if w not in STOPWORDS]
@@ -0,0 +1,400 @@
+"""
+Per-stage micro-benchmarks for the assessment pipeline.
+
+Measures our own code apart from Ollama and Whisper: text cleaning,
+sentence splitting, sectioning, LLM JSON extraction/parsing, response
+assembly, and an end-to-end run against fake LLM and ASR backends with
+configurable latency.
+
+Usage:
+    python scripts/benchmark_models.py --sizes 1KB,1MB,50MB --output bench.json
+    python scripts/benchmark_models.py --baseline bench.json   # compare
+
+Comparison exits with status 1 when any benchmark's p50 regressed by
+more than --threshold (default 10%).
+"""
+
+import argparse
+import itertools
+import json
+import math
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Add parent directory to path so app module can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.section import Section
+from app.models.transcript import Transcript, TranscriptSegment
+from app.services.assessment_pipeline_service import AssessmentPipeline
+from app.services.chunking_service import build_chunker
+from app.services.cleaning_service import TranscriptCleaner
+from app.services.llm_assessment_service import LLMAssessmentService
+from app.services.llm_client import GenerationOptions, LLMBackend
+
+_WORDS = (
+    "the cell membrane controls what enters and leaves the cell while "
+    "mitochondria produce energy through respiration and the nucleus stores "
+    "genetic information that guides protein synthesis in ribosomes"
+).split()
+_FILLERS = ["um", "uh", "you know"]
+
+
+# ------------------------------
+# Synthetic inputs
+# ------------------------------
+def parse_size(text: str) -> int:
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B)?\s*", text, re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid size: {text}")
+    scale = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+    return int(float(match.group(1)) * scale[(match.group(2) or "B").upper()])
+
+
+def synthetic_transcript(size_bytes: int, seed: int = 0) -> str:
+    """
+    Lecture-like text with fillers, irregular whitespace and paragraphs.
+    """
+    rng = random.Random(seed)
+    sentences: List[str] = []
+    total = 0
+
+    while total < size_bytes:
+        words = rng.choices(_WORDS, k=rng.randint(6, 18))
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(_FILLERS))
+        sentence = " ".join(words).capitalize() + rng.choice([".", ".", "?", "!"])
+        sentence += "\n\n" if rng.random() < 0.05 else rng.choice([" ", "  ", "\n"])
+        sentences.append(sentence)
+        total += len(sentence)
+
+    return "".join(sentences)[:size_bytes]
+
+
+_calls = itertools.count()
+
+
+def fake_llm_output(n: int, wrap: bool = True, seed: int = 0) -> str:
+    # Distinct stems per call, so validation doesn't reject them as duplicates
+    rng = random.Random(seed)
+    payload = {
+        "questions": [
+            {
+                "question": "How does {} {} relate to {} {}?".format(*rng.sample(_WORDS, 4)),
+                "options": ["Energy", "Proteins", "DNA", "Water"],
+                "correct_answer": "A",
+                "explanation": "Mitochondria produce energy through respiration.",
+            }
+            for i in range(n)
+        ]
+    }
+    text = json.dumps(payload, indent=2)
+    # Small models often wrap JSON in chatter; keep extraction honest
+    return f"Sure! Here are the questions:\n{text}\nHope this helps." if wrap else text
+
+
+# ------------------------------
+# Fake backends
+# ------------------------------
+class FakeLLM(LLMBackend):
+    """
+    Returns well-formed questions after a fixed latency.
+    """
+
+    model_name = "fake-llm"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def generate(
+        self,
+        prompt: str,
+        options: Optional[GenerationOptions] = None,
+        system: Optional[str] = None,
+    ) -> str:
+        time.sleep(self.latency)
+        match = re.search(r"Generate exactly (\d+)", prompt)
+        return fake_llm_output(int(match.group(1)) if match else 1, seed=next(_calls))
+
+
+class FakeASR:
+    """
+    Stands in for ASRService; returns a synthetic timestamped transcript.
+    """
+
+    def __init__(self, latency: float = 0.0, size_bytes: int = 64 * 1024):
+        self.latency = latency
+        self.text = synthetic_transcript(size_bytes, seed=1)
+
+    def transcribe_to_transcript(
+        self, media_path: str, media_hash: Optional[str] = None
+    ) -> Transcript:
+        time.sleep(self.latency)
+        segments = []
+        for i, sentence in enumerate(re.split(r"(?<=[.!?])\s+", self.text)):
+            segments.append(TranscriptSegment(sentence, start=i * 3.0, end=i * 3.0 + 2.5))
+        return Transcript(segments=segments)
+
+    def transcribe(self, media_path: str, media_hash: Optional[str] = None) -> str:
+        return " ".join(s.text for s in self.transcribe_to_transcript(media_path).segments)
+
+
+def _silent_wav(path: Path) -> None:
+    # 16 kHz mono PCM is used as-is by the media pre-stage (no ffmpeg needed)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\x00\x00" * 16000)
+
+
+# ------------------------------
+# Timing
+# ------------------------------
+def measure(
+    fn: Callable[[], Any], repeat: int, warmup: int = 1, size_bytes: Optional[int] = None
+) -> Dict[str, Any]:
+    for _ in range(warmup):
+        fn()
+
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+
+    def pct(p: float) -> float:
+        # Nearest-rank percentile
+        rank = max(1, math.ceil(p / 100 * len(timings)))
+        return timings[rank - 1] * 1000
+
+    result = {
+        "runs": repeat,
+        "mean_ms": statistics.fmean(timings) * 1000,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "ops_per_s": 1.0 / statistics.fmean(timings) if timings[0] > 0 else None,
+    }
+    if size_bytes:
+        result["size_bytes"] = size_bytes
+        result["throughput_mb_s"] = size_bytes / 1024**2 / statistics.fmean(timings)
+    return result
+
+
+def _label(size: int) -> str:
+    for unit, scale in (("MB", 1024**2), ("KB", 1024)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{unit}"
+    return f"{size}B"
+
+
+def _repeats_for(size: int, repeat: int) -> int:
+    # Keep multi-megabyte runs affordable
+    if size >= 10 * 1024**2:
+        return max(3, repeat // 10)
+    if size >= 1024**2:
+        return max(5, repeat // 4)
+    return repeat
+
+
+# ------------------------------
+# Benchmarks
+# ------------------------------
+def bench_text_stages(sizes: List[int], repeat: int) -> Dict[str, Any]:
+    cleaner = TranscriptCleaner()
+    chunker = build_chunker()
+    results: Dict[str, Any] = {}
+
+    for size in sizes:
+        text = synthetic_transcript(size)
+        runs = _repeats_for(size, repeat)
+        label = _label(size)
+        transcript = cleaner.to_transcript(text)
+
+        results[f"clean_text[{label}]"] = measure(
+            lambda: cleaner.clean_text(text), runs, size_bytes=size
+        )
+        results[f"to_transcript[{label}]"] = measure(
+            lambda: cleaner.to_transcript(text), runs, size_bytes=size
+        )
+        results[f"to_sections[{label}]"] = measure(
+            lambda: cleaner.to_sections(transcript), runs, size_bytes=size
+        )
+        results[f"chunk[{label}]"] = measure(
+            lambda: chunker.chunk(transcript), runs, size_bytes=size
+        )
+
+    return results
+
+
+def bench_llm_parsing(repeat: int) -> Dict[str, Any]:
+    service = LLMAssessmentService(llm_client=FakeLLM(), cache=None)
+    results: Dict[str, Any] = {}
+
+    for n in (1, 5, 20):
+        raw = fake_llm_output(n)
+        data = service._extract_and_validate_json(raw)
+
+        results[f"extract_and_validate_json[{n}q]"] = measure(
+            lambda: service._extract_and_validate_json(raw), repeat * 10,
+            size_bytes=len(raw),
+        )
+        results[f"parse_response[{n}q]"] = measure(
+            lambda: service._parse_response(data, "S1"), repeat * 10
+        )
+
+    return results
+
+
+def bench_assembly(repeat: int) -> Dict[str, Any]:
+    service = LLMAssessmentService(llm_client=FakeLLM(), cache=None)
+    sections = [
+        Section(section_id=f"S{i}", title=f"Section {i}", content="x") for i in range(1, 6)
+    ]
+    questions = []
+    for section in sections:
+        data = service._extract_and_validate_json(fake_llm_output(4))
+        questions.extend(service._parse_response(data, section.section_id))
+
+    def assemble():
+        return {
+            "assessment_id": "ASMT-BENCH",
+            "metadata": AssessmentPipeline._metadata("text", sections, 5, len(questions)),
+            "questions": [AssessmentPipeline._question_to_dict(q) for q in questions],
+        }
+
+    return {f"assemble_response[{len(questions)}q]": measure(assemble, repeat * 10)}
+
+
+def bench_end_to_end(
+    repeat: int, llm_latency: float, asr_latency: float, size: int
+) -> Dict[str, Any]:
+    pipeline = AssessmentPipeline(
+        llm_client=FakeLLM(latency=llm_latency),
+        asr_service=FakeASR(latency=asr_latency, size_bytes=size),
+    )
+    text = synthetic_transcript(size)
+    results: Dict[str, Any] = {}
+
+    base = {"course_id": "BENCH", "module_id": "M1", "total_questions": 10, "use_cache": False}
+    text_payload = {
+        **base,
+        "content_type": "text",
+        "content_source": {"type": "inline", "text": text},
+    }
+    results[f"pipeline_text[{_label(size)}]"] = measure(
+        lambda: pipeline.run(text_payload), repeat, size_bytes=size
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = Path(tmp) / "lecture.wav"
+        _silent_wav(media)
+        video_payload = {
+            **base,
+            "content_type": "video",
+            "content_source": {"type": "local", "path": str(media)},
+        }
+        results[f"pipeline_video[{_label(size)}]"] = measure(
+            lambda: pipeline.run(video_payload), repeat, size_bytes=size
+        )
+
+    return results
+
+
+# ------------------------------
+# Baseline comparison
+# ------------------------------
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[Dict[str, Any]]:
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        ratio = result["p50_ms"] / before["p50_ms"] if before["p50_ms"] else 1.0
+        rows.append(
+            {
+                "name": name,
+                "baseline_p50_ms": before["p50_ms"],
+                "p50_ms": result["p50_ms"],
+                "ratio": ratio,
+                "regressed": ratio > 1.0 + threshold,
+            }
+        )
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        default="1KB,100KB,1MB",
+        help="Comma-separated transcript sizes, e.g. 1KB,1MB,50MB",
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per benchmark")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Fake LLM seconds per call")
+    parser.add_argument("--asr-latency", type=float, default=0.0, help="Fake ASR seconds per file")
+    parser.add_argument("--e2e-size", default="64KB", help="Transcript size for end-to-end runs")
+    parser.add_argument("--skip-e2e", action="store_true", help="Only run the stage benchmarks")
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="Compare against a saved results JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed p50 slowdown")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+
+    results: Dict[str, Any] = {}
+    results.update(bench_text_stages(sizes, args.repeat))
+    results.update(bench_llm_parsing(args.repeat))
+    results.update(bench_assembly(args.repeat))
+    if not args.skip_e2e:
+        results.update(
+            bench_end_to_end(
+                max(3, args.repeat // 4),
+                args.llm_latency,
+                args.asr_latency,
+                parse_size(args.e2e_size),
+            )
+        )
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "llm_latency_s": args.llm_latency,
+            "asr_latency_s": args.asr_latency,
+        },
+        "results": results,
+    }
+
+    status = 0
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        report["comparison"] = compare(report, baseline, args.threshold)
+        regressions = [row["name"] for row in report["comparison"] if row["regressed"]]
+        report["regressions"] = regressions
+        status = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    print(output)
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
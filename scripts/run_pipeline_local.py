@@ -0,0 +1,393 @@
+"""
+Offline assessment generation for a whole directory of course content.
+
+Walks the raw data directory (data/raw/<course_id>/<module_id>.<ext>),
+prepares every file on one process pool (ASR for media, cleaning and
+sectioning for all) and generates questions on a second pool, each with
+its own worker count. Transcripts and sections are written under
+data/processed/local, assessments to data/outputs/<course_id>/.
+
+A checkpoint manifest records each finished stage, so an interrupted
+run resumes where it stopped: files whose size/mtime and stage settings
+are unchanged skip the stages already done.
+
+Usage:
+    python scripts/run_pipeline_local.py
+    python scripts/run_pipeline_local.py --asr-workers 2 --llm-workers 4
+    python scripts/run_pipeline_local.py --force      # ignore the checkpoint
+
+Exits with status 1 when any file failed; rerunning retries only those.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add parent directory to path so app module can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core import settings
+from app.core.logging import setup_logging
+from app.models.section import Section
+from app.models.transcript import Transcript, TranscriptSegment
+from app.services.assessment_pipeline_service import AssessmentPipeline
+from app.services.asr_service import ASRService
+from app.services.media_service import detect_container
+from app.services.transcript_cache import get_transcript_cache
+
+logger = logging.getLogger("run_pipeline_local")
+
+TEXT_SUFFIXES = {".txt", ".md"}
+STAGES = ("transcribe", "section", "generate")
+MANIFEST_VERSION = 1
+
+
+# ------------------------------
+# Work items
+# ------------------------------
+def discover(raw_dir: Path, default_course: str) -> List[Dict[str, Any]]:
+    """
+    Every text or media file under raw_dir, as a work item. The first
+    directory level is the course_id, the rest of the path the module_id.
+    """
+    items = []
+    for path in sorted(raw_dir.rglob("*")):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+
+        if path.suffix.lower() in TEXT_SUFFIXES:
+            content_type = "text"
+        elif detect_container(path):
+            content_type = "video"
+        else:
+            logger.warning(f"Skipping unrecognised file {path}")
+            continue
+
+        rel = path.relative_to(raw_dir)
+        parts = rel.with_suffix("").parts
+        course_id, module_id = (
+            (parts[0], "/".join(parts[1:])) if len(parts) > 1 else (default_course, parts[0])
+        )
+        stat = path.stat()
+        items.append(
+            {
+                "key": rel.as_posix(),
+                "path": str(path),
+                "course_id": course_id,
+                "module_id": module_id,
+                "content_type": content_type,
+                "fingerprint": f"{stat.st_size}:{stat.st_mtime_ns}",
+            }
+        )
+    return items
+
+
+def stage_configs(total_questions: int) -> Dict[str, Dict[str, Any]]:
+    """Settings that change a stage's output; a change invalidates it."""
+    return {
+        "transcribe": {"asr_model": settings.ASR_MODEL_NAME},
+        "section": {
+            "strategy": settings.CHUNK_STRATEGY,
+            "max_tokens": settings.CHUNK_MAX_TOKENS,
+            "max_context_tokens": settings.CHUNK_MAX_CONTEXT_TOKENS,
+        },
+        "generate": {"llm_model": settings.LLM_MODEL_NAME, "total_questions": total_questions},
+    }
+
+
+def artifact_paths(item: Dict[str, Any], processed_dir: Path, output_dir: Path) -> Dict[str, str]:
+    stem = Path(item["course_id"], item["module_id"])
+    return {
+        "transcribe": str(processed_dir / "transcripts" / stem.with_suffix(".json")),
+        "section": str(processed_dir / "sections" / stem.with_suffix(".json")),
+        "generate": str(output_dir / stem.with_suffix(".json")),
+    }
+
+
+# ------------------------------
+# Checkpoint manifest
+# ------------------------------
+class Manifest:
+    """
+    Per-file stage completion, saved atomically after every change so a
+    killed run loses at most the stages that were in flight.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.items: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            data = json.loads(path.read_text())
+            if data.get("version") == MANIFEST_VERSION:
+                self.items = data.get("items", {})
+
+    def pending_stages(self, item: Dict[str, Any], configs: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Stages still to run: the first stale or missing one and all after it."""
+        entry = self.items.get(item["key"])
+        if not entry or entry.get("fingerprint") != item["fingerprint"]:
+            return list(STAGES)
+
+        done = entry.get("stages", {})
+        for i, stage in enumerate(STAGES):
+            record = done.get(stage)
+            if (
+                record is None
+                or record.get("config") != configs[stage]
+                or not Path(record["path"]).exists()
+            ):
+                return list(STAGES[i:])
+        return []
+
+    def start(self, item: Dict[str, Any], stages: List[str]) -> None:
+        entry = self.items.get(item["key"])
+        if not entry or entry.get("fingerprint") != item["fingerprint"]:
+            entry = {"fingerprint": item["fingerprint"], "stages": {}}
+        for stage in stages:
+            entry["stages"].pop(stage, None)
+        entry.pop("error", None)
+        self.items[item["key"]] = entry
+
+    def complete(self, item: Dict[str, Any], stage: str, path: str, config: Dict[str, Any]) -> None:
+        self.items[item["key"]]["stages"][stage] = {
+            "path": path,
+            "config": config,
+            "completed_at": time.time(),
+        }
+
+    def fail(self, item: Dict[str, Any], error: str) -> None:
+        self.items[item["key"]]["error"] = error
+
+    def save(self) -> None:
+        _write_json(self.path, {"version": MANIFEST_VERSION, "items": self.items})
+
+
+def _write_json(path: Path, data: Any) -> None:
+    # Write then rename, so a crash never leaves a truncated file behind
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+# ------------------------------
+# Workers (run in child processes)
+# ------------------------------
+_worker_pipeline: Optional[AssessmentPipeline] = None
+
+
+def _init_worker(role: str, workers: int) -> None:
+    global _worker_pipeline
+    setup_logging()
+
+    if role == "asr":
+        try:
+            import torch
+
+            # Split the cores between workers instead of oversubscribing them
+            torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+        except ImportError:
+            pass
+
+    # Pool workers are daemonic and can't start the chunked-ASR pool of their own
+    _worker_pipeline = AssessmentPipeline(
+        asr_service=ASRService(cache=get_transcript_cache(), chunked=False)
+    )
+
+
+def _prepare(item: Dict[str, Any], stages: List[str], paths: Dict[str, str]) -> Dict[str, Any]:
+    """Transcribe (or clean) and section one file, writing both artifacts."""
+    pipeline = _worker_pipeline
+    details: Dict[str, Any] = {}
+
+    if "transcribe" in stages:
+        if item["content_type"] == "video":
+            audio_path, media_hash = pipeline.media.prepare(item["path"])
+            transcript = pipeline.cleaner.clean_transcript(
+                pipeline.asr_service.transcribe_to_transcript(audio_path, media_hash=media_hash)
+            )
+        else:
+            with open(item["path"], "r", encoding="utf-8", errors="replace") as f:
+                transcript = pipeline.cleaner.to_transcript(f)
+        if not transcript.segments:
+            raise ValueError("Content is empty after cleaning")
+        _write_json(Path(paths["transcribe"]), [asdict(s) for s in transcript.segments])
+    else:
+        segments = json.loads(Path(paths["transcribe"]).read_text())
+        transcript = Transcript(segments=[TranscriptSegment(**s) for s in segments])
+
+    sections, original_count = pipeline.build_sections(transcript)
+    _write_json(
+        Path(paths["section"]),
+        {"original_count": original_count, "sections": [asdict(s) for s in sections]},
+    )
+    details["sections"] = len(sections)
+    return details
+
+
+def _generate(
+    item: Dict[str, Any], paths: Dict[str, str], total_questions: int
+) -> Dict[str, Any]:
+    """Generate questions for one file's saved sections."""
+    data = json.loads(Path(paths["section"]).read_text())
+    sections = [Section(**s) for s in data["sections"]]
+    payload = {
+        "course_id": item["course_id"],
+        "module_id": item["module_id"],
+        "total_questions": total_questions,
+    }
+    result = _worker_pipeline.generate(
+        payload, item["content_type"], sections, data["original_count"]
+    )
+    _write_json(Path(paths["generate"]), result)
+    return {"questions": result["metadata"]["total_questions"]}
+
+
+# ------------------------------
+# Driver
+# ------------------------------
+def run(
+    items: List[Dict[str, Any]],
+    manifest: Manifest,
+    processed_dir: Path,
+    output_dir: Path,
+    asr_workers: int,
+    llm_workers: int,
+    total_questions: int,
+    force: bool = False,
+) -> Dict[str, int]:
+    configs = stage_configs(total_questions)
+    counts = {"completed": 0, "skipped": 0, "failed": 0}
+
+    prepare_pool = ProcessPoolExecutor(
+        max_workers=asr_workers, initializer=_init_worker, initargs=("asr", asr_workers)
+    )
+    generate_pool = ProcessPoolExecutor(
+        max_workers=llm_workers, initializer=_init_worker, initargs=("llm", llm_workers)
+    )
+    futures: Dict[Future, Tuple[str, Dict[str, Any], List[str]]] = {}
+
+    def submit_generate(item: Dict[str, Any], paths: Dict[str, str]) -> None:
+        future = generate_pool.submit(_generate, item, paths, total_questions)
+        futures[future] = ("generate", item, ["generate"])
+
+    try:
+        for item in items:
+            stages = list(STAGES) if force else manifest.pending_stages(item, configs)
+            if not stages:
+                counts["skipped"] += 1
+                continue
+
+            manifest.start(item, stages)
+            paths = artifact_paths(item, processed_dir, output_dir)
+            if stages == ["generate"]:
+                submit_generate(item, paths)
+            else:
+                prep_stages = [s for s in stages if s != "generate"]
+                future = prepare_pool.submit(_prepare, item, prep_stages, paths)
+                futures[future] = ("prepare", item, prep_stages)
+        manifest.save()
+
+        logger.info(
+            f"{len(futures)} files to process, {counts['skipped']} already done "
+            f"({asr_workers} ASR workers, {llm_workers} LLM workers)"
+        )
+
+        # Files move to the LLM pool as soon as their sections are ready
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, item, stages = futures.pop(future)
+                paths = artifact_paths(item, processed_dir, output_dir)
+                try:
+                    details = future.result()
+                except Exception as e:
+                    logger.error(f"{item['key']}: {kind} failed: {e}")
+                    manifest.fail(item, f"{kind}: {e}")
+                    manifest.save()
+                    counts["failed"] += 1
+                    continue
+
+                for stage in stages:
+                    manifest.complete(item, stage, paths[stage], configs[stage])
+                manifest.save()
+
+                if kind == "prepare":
+                    logger.info(f"{item['key']}: {details['sections']} sections")
+                    submit_generate(item, paths)
+                else:
+                    logger.info(f"{item['key']}: {details['questions']} questions")
+                    counts["completed"] += 1
+    finally:
+        # On interrupt, drop queued work; the manifest already holds what finished
+        prepare_pool.shutdown(wait=False, cancel_futures=True)
+        generate_pool.shutdown(wait=False, cancel_futures=True)
+
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--raw-dir", type=Path, default=settings.RAW_DIR, help="Input directory")
+    parser.add_argument("--output-dir", type=Path, default=settings.OUTPUTS_DIR, help="Assessment JSON output")
+    parser.add_argument(
+        "--processed-dir",
+        type=Path,
+        default=settings.PROCESSED_DIR / "local",
+        help="Intermediate transcripts, sections and the checkpoint manifest",
+    )
+    parser.add_argument(
+        "--asr-workers", type=int, default=settings.ASR_WORKERS, help="Processes for ASR and sectioning"
+    )
+    parser.add_argument(
+        "--llm-workers",
+        type=int,
+        # Each worker already runs LLM_REQUEST_CONCURRENCY sections at once
+        default=max(1, settings.LLM_MAX_CONCURRENCY // settings.LLM_REQUEST_CONCURRENCY),
+        help="Processes for question generation",
+    )
+    parser.add_argument("--total-questions", type=int, default=10, help="Questions per file")
+    parser.add_argument("--course-id", default="default", help="course_id for files directly in --raw-dir")
+    parser.add_argument("--force", action="store_true", help="Rerun every stage, ignoring the checkpoint")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+
+    if not args.raw_dir.is_dir():
+        parser.error(f"Raw directory not found: {args.raw_dir}")
+
+    items = discover(args.raw_dir, args.course_id)
+    manifest = Manifest(args.processed_dir / "manifest.json")
+
+    started = time.perf_counter()
+    try:
+        counts = run(
+            items,
+            manifest,
+            args.processed_dir,
+            args.output_dir,
+            max(1, args.asr_workers),
+            max(1, args.llm_workers),
+            args.total_questions,
+            force=args.force,
+        )
+    except KeyboardInterrupt:
+        manifest.save()
+        logger.warning("Interrupted; rerun to resume from the checkpoint")
+        return 130
+
+    logger.info(
+        f"Done in {time.perf_counter() - started:.1f}s: {counts['completed']} completed, "
+        f"{counts['skipped']} skipped, {counts['failed']} failed"
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+# Add parent directory to path so app module can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.transcript import Transcript, TranscriptSegment
+from app.pipelines.text_pipeline import TextPipeline
+from app.services.chunking_service import SemanticChunker, TokenChunker
+from app.utils.text_utils import estimate_tokens
+
+if __name__ == "__main__":
+    paragraph = (
+        "Photosynthesis converts light energy into chemical energy. "
+        "It takes place in the chloroplasts of plant cells. "
+        "Chlorophyll absorbs mostly blue and red light. "
+        "The light reactions produce ATP and NADPH. "
+        "The Calvin cycle uses them to fix carbon dioxide into sugars. "
+    )
+    raw_text = "\n\n".join(paragraph * 4 for _ in range(6))
+
+    # ------------------------------
+    # Token budget
+    # ------------------------------
+    chunker = TokenChunker(max_tokens=120, overlap_tokens=20, min_tokens=40)
+    pipeline = TextPipeline(chunker=chunker)
+    sections = pipeline.run(raw_text)
+
+    for section in sections:
+        tokens = estimate_tokens(section.content)
+        print(section.section_id, tokens, "tokens")
+        assert tokens <= 120, f"{section.section_id} exceeds the budget"
+    print("-" * 50)
+
+    # ------------------------------
+    # Growing to fit max_sections
+    # ------------------------------
+    fitted = pipeline.run(raw_text, max_sections=5)
+    print(f"{len(sections)} sections at the base budget, {len(fitted)} when fitted to 5")
+    assert len(fitted) <= 5
+    print("-" * 50)
+
+    # ------------------------------
+    # Timestamp gaps as boundaries
+    # ------------------------------
+    transcript = Transcript(
+        segments=[
+            TranscriptSegment("The first topic starts here.", start=0.0, end=2.0),
+            TranscriptSegment("It keeps going for a while.", start=2.1, end=4.0),
+            TranscriptSegment("After a long pause, a new topic.", start=9.0, end=11.0),
+        ]
+    )
+    # The budget can't hold all three, so the cut lands on the pause
+    timed = TokenChunker(
+        max_tokens=16, overlap_tokens=4, min_tokens=5, max_gap_seconds=2.0
+    ).chunk(transcript)
+    for section in timed:
+        print(section.section_id, section.start, section.end, section.content)
+    assert len(timed) == 2 and timed[1].start == 9.0
+    print("-" * 50)
+
+    # ------------------------------
+    # Semantic boundaries at topic shifts
+    # ------------------------------
+    biology = (
+        "Photosynthesis converts sunlight in chloroplasts using chlorophyll. "
+        "Chloroplasts use chlorophyll to produce glucose during photosynthesis. "
+    )
+    history = (
+        "The French revolution began in Paris at the Bastille. "
+        "Revolutionaries in Paris overthrew the French monarchy. "
+    )
+    topics_text = biology * 5 + history * 5 + biology * 5
+    semantic = SemanticChunker(max_tokens=150, min_tokens=20, overlap_tokens=0)
+    marked = semantic.mark_topics(TextPipeline().cleaner.to_transcript(topics_text))
+    starts = [i for i, s in enumerate(marked.segments) if s.paragraph_start]
+    print("Topic shifts before sentences", starts)
+    assert starts == [10, 20]
+
+    for section in semantic.chunk(marked):
+        print(section.section_id, section.content[:60])
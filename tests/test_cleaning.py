@@ -1,3 +1,4 @@
+import io
 import sys
 from pathlib import Path
 
@@ -54,3 +55,12 @@ if __name__ == "__main__":
         print(section.section_id)
         print(section.content)
         print("-" * 50)
+
+    # Streaming input gives the same segments as the full string
+    cleaner = pipeline.cleaner
+    from_string = [s.text for s in cleaner.iter_segments(raw_text)]
+    from_file = [s.text for s in cleaner.iter_segments(io.StringIO(raw_text))]
+    pieces = (raw_text[i:i + 7] for i in range(0, len(raw_text), 7))
+    from_pieces = [s.text for s in cleaner.iter_segments(pieces)]
+    assert from_string == from_file == from_pieces
+    print(f"{len(from_string)} segments from string, file and 7-char pieces")
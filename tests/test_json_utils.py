@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+
+# Add parent directory to path so app module can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.json_utils import (
+    QuestionStreamParser,
+    parse_questions_payload,
+    parse_sections_payload,
+)
+
+QUESTION = (
+    '{"question": "What do mitochondria produce?", '
+    '"options": ["Energy", "Proteins", "DNA", "Water"], '
+    '"correct_answer": "A", "explanation": "Stated in the text."}'
+)
+
+if __name__ == "__main__":
+    # ------------------------------
+    # Clean output, wrapped in reasoning and a code fence
+    # ------------------------------
+    wrapped = (
+        "<think>The user wants {questions}. Let me think...</think>\n"
+        f'```json\n{{"questions": [{QUESTION}, {QUESTION}]}}\n```\nHope this helps!'
+    )
+    data, complete = parse_questions_payload(wrapped)
+    print("wrapped:", complete, len(data["questions"]))
+    assert complete and len(data["questions"]) == 2
+
+    # ------------------------------
+    # One broken question, then truncation
+    # ------------------------------
+    broken = (
+        f'{{"questions": [{QUESTION}, {{"question": "Missing comma" "options": []}}, '
+        f'{QUESTION}, {{"question": "Cut off mid-'
+    )
+    data, complete = parse_questions_payload(broken)
+    print("broken:", complete, len(data["questions"]))
+    assert not complete and len(data["questions"]) == 2
+
+    # ------------------------------
+    # Unterminated reasoning only
+    # ------------------------------
+    data, complete = parse_questions_payload("<think>I should write {questions} but")
+    assert not complete and data["questions"] == []
+
+    # ------------------------------
+    # Batched answer with one broken section
+    # ------------------------------
+    batched = (
+        f'{{"sections": {{"S1": {{"questions": [{QUESTION}, {{"bad": }}]}}, '
+        f'"S2": {{"questions": [{QUESTION}, {QUESTION}]}}}}}}'
+    )
+    sections, complete = parse_sections_payload(batched, ["S1", "S2"])
+    counts = {sid: len(part["questions"]) for sid, part in sections.items()}
+    print("batched:", complete, counts)
+    assert not complete and counts == {"S1": 1, "S2": 2}
+
+    # ------------------------------
+    # Streamed output, fed a few characters at a time
+    # ------------------------------
+    streamed = (
+        "<think>Plan: write {two} questions</think>\n```json\n"
+        f'{{"questions": [{QUESTION}, {{"question": "Has a }}}} brace", "bad": }}, '
+        f'{QUESTION}]}}'
+        "\n```\nLet me know if you want more questions about {topics}!"
+    )
+    parser = QuestionStreamParser()
+    arrivals = []
+    for i in range(0, len(streamed), 7):
+        for q in parser.feed(streamed[i:i + 7]):
+            arrivals.append(i)
+        if parser.closed:
+            break
+    print("streamed:", len(arrivals), "questions, closed after", i + 7, "of", len(streamed))
+    assert len(arrivals) == 2 and parser.closed and i + 7 < len(streamed)
@@ -0,0 +1,210 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path so app module can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core import settings
+from app.core.exceptions import LLMBackendError
+from app.services.llm_client import GenerationOptions, LLMBackend
+from app.services.llm_router import CLOSED, OPEN, LLMRouter, RetryBudget
+
+
+class FakeBackend(LLMBackend):
+    """
+    Answers with its own name after `delay` seconds, or fails while `down`.
+    """
+
+    model_name = "fake"
+
+    def __init__(self, name, delay=0.0, down=False):
+        self.name = name
+        self.delay = delay
+        self.down = down
+        self.calls = 0
+
+    def generate(self, prompt, options=None, system=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.down:
+            raise LLMBackendError(f"{self.name} is down")
+        return self.name
+
+    def generate_stream(self, prompt, options=None, system=None, on_open=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.down:
+            raise LLMBackendError(f"{self.name} is down")
+        for i in range(5):
+            self.pieces = i + 1
+            yield f"{self.name}{i} "
+            time.sleep(0.01)
+
+    def health_check(self):
+        return not self.down
+
+
+class SilentBackend(FakeBackend):
+    """
+    Accepts a stream, sends `first` (if any) and then nothing until aborted.
+    """
+
+    def __init__(self, name, first=None):
+        super().__init__(name)
+        self.first = first
+        self.aborted = threading.Event()
+        self.released_at = None
+
+    def generate_stream(self, prompt, options=None, system=None, on_open=None):
+        self.calls += 1
+        if on_open is not None:
+            on_open(self.aborted.set)
+        try:
+            if self.first:
+                yield self.first
+            if not self.aborted.wait(timeout=10):
+                yield "too late"
+            raise LLMBackendError(f"{self.name} aborted")
+        finally:
+            self.released_at = time.perf_counter()
+
+
+def make_router(*backends, ratio=1.0, threshold=2, cooldown=60.0):
+    return LLMRouter(
+        list(backends),
+        names=[b.name for b in backends],
+        failure_threshold=threshold,
+        cooldown_seconds=cooldown,
+        retry_budget=RetryBudget(ratio, min_per_second=0.0, capacity=2.0),
+    )
+
+
+if __name__ == "__main__":
+    # ------------------------------
+    # Least outstanding requests
+    # ------------------------------
+    slow, fast = FakeBackend("slow", delay=0.2), FakeBackend("fast", delay=0.01)
+    router = make_router(slow, fast)
+    threads = [threading.Thread(target=router.generate, args=("p",)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    # One call is still running on each; the next goes to the idle node
+    results = [router.generate("p") for _ in range(4)]
+    for t in threads:
+        t.join()
+    print("least-loaded:", results, router.status())
+    assert results.count("fast") >= 3
+
+    # ------------------------------
+    # Retry elsewhere + circuit breaker
+    # ------------------------------
+    bad, good = FakeBackend("bad", down=True), FakeBackend("good")
+    router = make_router(bad, good)
+    # Both nodes start idle: "bad" is picked first and fails over to "good"
+    assert router.generate("p") == "good"
+    assert router.generate("p") == "good"
+    print("breaker:", router.status())
+    assert router.status()["bad"]["state"] == OPEN
+    calls = bad.calls
+    for _ in range(5):
+        assert router.generate("p") == "good"
+    assert bad.calls == calls, "ejected node must not receive calls"
+
+    # Half-open trial after the cooldown readmits a recovered node
+    router.cooldown_seconds = 0.0
+    bad.down = False
+    for _ in range(3):
+        router.generate("p")
+    assert router.status()["bad"]["state"] == CLOSED
+
+    # ------------------------------
+    # Health checks
+    # ------------------------------
+    good.down = True
+    router.check_health()
+    assert not router.status()["good"]["healthy"]
+    assert all(router.generate("p") == "bad" for _ in range(3))
+
+    # ------------------------------
+    # Retry budget
+    # ------------------------------
+    first, second = FakeBackend("first", down=True), FakeBackend("second", down=True)
+    router = make_router(first, second, ratio=0.0, threshold=100)
+    failures = 0
+    for _ in range(4):
+        try:
+            router.generate("p")
+        except LLMBackendError:
+            failures += 1
+    # Capacity 2, no refill: only the first two calls were retried
+    print("retry budget:", first.calls + second.calls, "attempts for 4 calls")
+    assert failures == 4 and first.calls + second.calls == 6
+
+    # ------------------------------
+    # Hedging
+    # ------------------------------
+    settings.LLM_HEDGE_INITIAL_DELAY_SECONDS = 0.1
+    settings.LLM_HEDGE_MIN_DELAY_SECONDS = 0.01
+    hedged = GenerationOptions(hedge=True)
+
+    # A stuck first node: the hedge on the second answers first
+    stuck, healthy = FakeBackend("stuck", delay=0.5), FakeBackend("healthy", delay=0.01)
+    router = make_router(stuck, healthy)
+    start = time.perf_counter()
+    output = "".join(router.generate_stream("p", options=hedged))
+    elapsed = time.perf_counter() - start
+    print(f"hedged stream: {output!r} in {elapsed:.2f}s")
+    assert output.startswith("healthy0") and elapsed < 0.4
+    # The losing stream stops after its first piece
+    time.sleep(0.6)
+    assert stuck.calls == 1 and stuck.pieces == 1
+
+    # A backend that never sends a byte is aborted as soon as the hedge
+    # leads, not when its stream would next yield
+    silent, healthy = SilentBackend("silent"), FakeBackend("healthy", delay=0.01)
+    router = make_router(silent, healthy)
+    stream = router.generate_stream("p", options=hedged)
+    assert next(stream).startswith("healthy0")
+    led = time.perf_counter()
+    assert silent.aborted.wait(timeout=1.0)
+    time.sleep(0.05)
+    print(f"silent loser released {silent.released_at - led:.3f}s after the lead")
+    assert silent.released_at - led < 0.5
+    assert router.status()["silent"]["in_flight"] == 0
+    # Not the backend's fault: no breaker penalty
+    assert router.status()["silent"]["state"] == CLOSED
+    stream.close()
+
+    # The caller stopping early aborts a leader stuck mid-stream too
+    stalled = SilentBackend("stalled", first="stalled0 ")
+    router = make_router(stalled, healthy)
+    stream = router.generate_stream("p", options=hedged)
+    assert next(stream) == "stalled0 "
+    stream.close()
+    closed = time.perf_counter()
+    assert stalled.aborted.wait(timeout=1.0)
+    time.sleep(0.05)
+    assert stalled.released_at - closed < 0.5
+    assert router.status()["stalled"]["in_flight"] == 0
+
+    # A fast primary is never duplicated
+    calls = healthy.calls + stuck.calls
+    router = make_router(healthy, stuck)
+    assert "".join(router.generate_stream("p", options=hedged)).startswith("healthy0")
+    time.sleep(0.2)
+    assert healthy.calls + stuck.calls == calls + 1
+
+    # Non-streamed calls are not hedged: a loser could not be cancelled
+    calls = healthy.calls + stuck.calls
+    router = make_router(stuck, healthy)
+    assert router.generate("p", options=hedged) == "stuck"
+    assert healthy.calls + stuck.calls == calls + 1
+
+    # Budget: with no tokens left, slow streams just wait
+    router = make_router(stuck, healthy)
+    router.hedge_budget = RetryBudget(0.0, min_per_second=0.0, capacity=0.0)
+    assert "".join(router.generate_stream("p", options=hedged)).startswith("stuck0")
+    print("hedge budget respected")
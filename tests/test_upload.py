@@ -0,0 +1,89 @@
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path so app module can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import assessment
+from app.core import settings
+from app.services.llm_assessment_service import LLMAssessmentService
+from app.services.llm_client import LLMBackend
+
+
+class FixedLLM(LLMBackend):
+    """
+    Answers every call with two distinct valid questions.
+    """
+
+    model_name = "fixed"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, options=None, system=None):
+        self.calls += 1
+        return json.dumps({
+            "questions": [
+                {
+                    "question": f"Which statement about topic {self.calls}-{i} is true?",
+                    "options": [f"Fact {self.calls}{i}", "Wrong one", "Wrong two", "Wrong three"],
+                    "correct_answer": "A",
+                    "explanation": "Stated in the text.",
+                }
+                for i in range(2)
+            ]
+        })
+
+
+if __name__ == "__main__":
+    assessment.llm_service = LLMAssessmentService(llm_client=FixedLLM())
+    app = FastAPI()
+    app.include_router(assessment.router, prefix="/api/v1")
+    client = TestClient(app)
+
+    transcript = (
+        "Supervised learning uses labeled data to train models. "
+        "It is widely used for classification tasks. "
+        "Unsupervised learning finds patterns in unlabeled data."
+    )
+    response = client.post(
+        "/api/v1/generate-assessment/upload",
+        params={"course_id": "C1", "module_id": "M1", "total_questions": 2},
+        files={"file": ("lesson.txt", transcript.encode(), "text/plain")},
+    )
+    print(response.status_code, response.text[:300])
+    assert response.status_code == 200
+
+    body = response.json()
+    assert body["course_id"] == "C1" and body["module_id"] == "M1"
+    assert body["metadata"]["content_type"] == "text"
+    assert body["sections"] and body["questions"]
+    assert body["questions"][0]["prompt_version"] == "section@v2"
+
+    # The JSON route builds the same response shape
+    response = client.post(
+        "/api/v1/generate-assessment",
+        json={
+            "course_id": "C1",
+            "module_id": "M2",
+            "content_type": "text",
+            "content_source": {"type": "inline", "text": transcript},
+            "total_questions": 2,
+            "include_timings": True,
+        },
+    )
+    print(response.status_code, sorted(response.json()))
+    assert response.status_code == 200
+    assert response.json()["module_id"] == "M2"
+    assert "timings_ms" in response.json()["metadata"]
+
+    # Oversized batch bodies are refused before being buffered
+    settings.BATCH_MAX_BYTES = 64
+    oversized = b"\n".join(json.dumps({"course_id": f"C{i}"}).encode() for i in range(10))
+    response = client.post("/api/v1/generate-assessment/batch", content=oversized)
+    print(response.status_code, response.json())
+    assert response.status_code == 413
@@ -0,0 +1,154 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path so app module can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core import settings
+from app.models.section import Section
+from app.services.llm_assessment_service import LLMAssessmentService
+from app.services.llm_client import LLMBackend
+from app.services.validation_service import QuestionValidator
+
+
+def make_question(stem, options=None, answer="A"):
+    return {
+        "question": stem,
+        "options": options or ["Energy", "Proteins", "DNA", "Water"],
+        "correct_answer": answer,
+        "explanation": "Stated in the section.",
+    }
+
+
+class ScriptedLLM(LLMBackend):
+    """
+    Answers from a fixed list of question batches, one per call.
+    """
+
+    model_name = "scripted"
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.prompts = []
+
+    def generate(self, prompt, options=None, system=None):
+        self.prompts.append(prompt)
+        batch = self.batches.pop(0) if self.batches else []
+        return json.dumps({"questions": batch})
+
+
+if __name__ == "__main__":
+    validator = QuestionValidator()
+
+    # ------------------------------
+    # Rules
+    # ------------------------------
+    cases = {
+        "valid": make_question("What do mitochondria produce in the cell?"),
+        "short stem": make_question("Why?"),
+        "3 options": make_question("What do mitochondria produce?", ["a", "b", "c"]),
+        "duplicate options": make_question(
+            "What do mitochondria produce?", ["Energy", "energy.", "DNA", "Water"]
+        ),
+        "near-duplicate options": make_question(
+            "What do mitochondria produce?", ["Proteins", "Protein", "DNA", "Water"]
+        ),
+        "all of the above": make_question(
+            "What do mitochondria produce?", ["Energy", "DNA", "Water", "All of the above"]
+        ),
+        "bad answer": make_question("What do mitochondria produce?", answer="E"),
+        "answer as text": make_question("What do mitochondria produce?", answer="DNA"),
+        "labelled options": make_question(
+            "What do mitochondria produce?",
+            ["A. Energy", "B. Proteins", "C. DNA", "D. Water"],
+            answer="(b)",
+        ),
+    }
+    for name, raw in cases.items():
+        q, reason = validator.validate(raw)
+        print(f"{name:24} ->", reason or f"ok {q['correct_answer']} {q['options']}")
+
+    assert validator.validate(cases["valid"])[1] is None
+    assert validator.validate(cases["short stem"])[1] == "stem_length"
+    assert validator.validate(cases["3 options"])[1] == "structure"
+    assert validator.validate(cases["duplicate options"])[1] == "options"
+    assert validator.validate(cases["near-duplicate options"])[1] == "options"
+    assert validator.validate(cases["all of the above"])[1] == "options"
+    assert validator.validate(cases["bad answer"])[1] == "answer"
+    assert validator.validate(cases["answer as text"])[0]["correct_answer"] == "C"
+    labelled = validator.validate(cases["labelled options"])[0]
+    assert labelled["options"][0] == "Energy" and labelled["correct_answer"] == "B"
+    print("-" * 50)
+
+    # ------------------------------
+    # Near-duplicates (MinHash)
+    # ------------------------------
+    index = validator.new_index()
+    assert index.add(
+        "What organelle produces energy for the cell through respiration? Mitochondria"
+    )
+    assert not index.add(
+        "Which organelle produces the energy for a cell by respiration? Mitochondria"
+    )
+    # Same template, different fact
+    assert index.add("What is the role of the nucleus? Storing DNA")
+    assert index.add("What is the role of the ribosome? Making proteins")
+    print("Reworded question detected as a near-duplicate")
+    print("-" * 50)
+
+    # ------------------------------
+    # Targeted regeneration
+    # ------------------------------
+    sections = [
+        Section(section_id="S1", title="Cells", content="Mitochondria produce energy."),
+        Section(section_id="S2", title="Genes", content="DNA is stored in the nucleus."),
+    ]
+    llm = ScriptedLLM(
+        [
+            # S1: one good question, one invalid
+            [make_question("What do mitochondria produce for the cell?"), make_question("?")],
+            # S2: a reworded copy of S1's question and one good question
+            [
+                make_question("What do the mitochondria produce for the cell?"),
+                make_question("Where is DNA stored inside the cell?"),
+            ],
+            # Regeneration rounds: one question each
+            [make_question("Which process in mitochondria releases energy?")],
+            [make_question("Which organelle holds most of the DNA?")],
+        ]
+    )
+    service = LLMAssessmentService(llm_client=llm)
+    questions = service.generate_questions(
+        sections, questions_per_section=2, max_concurrency=1, use_cache=False
+    )
+
+    for q in questions:
+        print(q.question_id, q.question)
+
+    assert [q.question_id for q in questions] == ["S1-Q1", "S1-Q2", "S2-Q1", "S2-Q2"]
+    assert len(llm.prompts) == 4
+    # Regeneration asks only for the missing question and lists what to avoid
+    assert "Generate exactly 1 NEW" in llm.prompts[2]
+    assert "What do mitochondria produce for the cell?" in llm.prompts[2]
+
+    # ------------------------------
+    # Prompt layout + versions
+    # ------------------------------
+    # Static template text first, so calls share a cacheable prefix
+    prefix = service.prompts["section"].prefix
+    assert len(os.path.commonprefix(llm.prompts[:2])) >= len(prefix)
+    assert llm.prompts[0].index(prefix) == 0
+    assert questions[0].prompt_version == "section@v2"
+    assert questions[1].prompt_version == "regenerate@v2"
+    print("Prompt prefix shared:", len(prefix), "chars")
+
+    # PROMPT_VERSION switches every template back to the original prompts
+    settings.PROMPT_VERSION = "v1"
+    original = LLMAssessmentService(llm_client=ScriptedLLM([]))
+    settings.PROMPT_VERSION = "v2"
+    rendered = original._build_prompt(sections[0], 2)
+    assert rendered.version == "section@v1" and not rendered.system
+    assert rendered.prompt.startswith("You are an assessment generator.\n\nSECTION ID: S1")
+    assert original._build_batch_prompt(sections, 1).version == "section_batch@v1"